@@ -0,0 +1,77 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+# startup cost of the astronomy catalogs, parsing the text sources against
+# loading the snapshot built from them. uses data/catalog.txt and
+# data/HYG.csv if they're there, or made up catalogs the same size, along
+# with data/NGC.csv and data/constellations.json
+#
+#   python -m benchmarks.astro_snapshot
+import os
+import shutil
+import tempfile
+import time
+from typing import Callable, TypeVar
+
+from benchmarks.catalogs import dso_lines, hyg_csv
+from libs.astro_data import AstronomyClient
+from libs.astro_data.snapshot import build, load, parse
+
+T = TypeVar("T")
+
+
+def _time(name: str, run: Callable[[], T], repeat: int = 3) -> T:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<36} {best * 1000:>10.1f} ms")
+    return result
+
+
+def _sources(target: str):
+    with open(os.path.join(target, "catalog.txt"), "w") as fp:
+        fp.writelines(dso_lines("data/catalog.txt"))
+    with open(os.path.join(target, "HYG.csv"), "w") as fp:
+        fp.write(hyg_csv("data/HYG.csv"))
+    for name in ("NGC.csv", "constellations.json"):
+        shutil.copy(os.path.join("data", name), target)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as data:
+        _sources(data)
+        snapshot = os.path.join(data, "snapshot")
+        parsed = _time("parse text sources", lambda: parse(data), 1)
+        _time("build snapshot", lambda: build(data, snapshot), 1)
+        loaded = _time("load snapshot", lambda: load(data, snapshot))
+        _time(
+            "load snapshot, checksum sources",
+            lambda: load(data, snapshot, verify=True),
+        )
+        size = sum(entry.stat().st_size for entry in os.scandir(snapshot))
+        print(
+            f"{len(loaded.dsos)} dsos, {len(loaded.stars)} stars,"
+            f" {size / 2**20:.1f} MB on disk"
+        )
+        # the indexes AstronomyClient builds on top are the same either way
+        _time("client from parsed catalogs", lambda: AstronomyClient(*parsed))
+        _time("client from snapshot", lambda: AstronomyClient(*loaded))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+# lookups of every messier, ngc, ic and catalog id in the dso catalog, the
+# old linear scans against the indexes AstronomyClient builds at load time.
+# uses data/catalog.txt if it's there, or a made up catalog the same size
+#
+#   python -m benchmarks.catalog_lookup [catalog.txt]
+import random
+import sys
+import time
+from typing import Callable, List, Optional
+
+from benchmarks.catalogs import LegacyDSO, dso_lines, legacy_dsos
+from libs.astro_data.api import DSO_CATALOGS, build_dso_index
+from libs.astro_data.catalog import DsoCatalog
+
+
+def _scan(
+    dsos: List[LegacyDSO], catalog: str
+) -> Callable[[int], Optional[LegacyDSO]]:
+    # what AstronomyClient.m and .ngc used to do
+    def lookup(number: int) -> Optional[LegacyDSO]:
+        for dso in dsos:
+            if getattr(dso, catalog) == number:
+                return dso
+        return None
+
+    return lookup
+
+
+def _time(lookup: Callable[[int], Optional[object]], numbers: List[int]):
+    start = time.perf_counter()
+    for number in numbers:
+        lookup(number)
+    return (time.perf_counter() - start) / len(numbers)
+
+
+def main(path: Optional[str]):
+    lines = dso_lines(path)
+    legacy = legacy_dsos(lines)
+    dsos = DsoCatalog.from_lines(lines)
+    start = time.perf_counter()
+    index = build_dso_index(dsos)
+    print(
+        f"{len(dsos)} objects, index built in "
+        f"{(time.perf_counter() - start) * 1000:.1f} ms"
+    )
+    for catalog in DSO_CATALOGS:
+        rows = index[catalog]
+        numbers = [number for number in rows if number]
+        if not numbers:
+            continue
+
+        def lookup(number: int):
+            row = rows.get(number)
+            return dsos[row] if row is not None else None
+
+        # the scans take a while over the big catalogs, a sample will do
+        sample = random.Random(1).sample(numbers, min(len(numbers), 200))
+        before = _time(_scan(legacy, catalog), sample)
+        after = _time(lookup, numbers)
+        assert all(
+            _scan(legacy, catalog)(n).id == lookup(n).id for n in sample[:20]
+        )
+        print(
+            f"{catalog:<4} {len(numbers):>6} numbers"
+            f" {before * 1e6:>10.1f} us {after * 1e6:>8.3f} us"
+            f" {before / after:>10.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else "data/catalog.txt")
@@ -0,0 +1,132 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+# memory held by the star and dso catalogs and a few whole catalog queries,
+# the per object lists the catalogs used to be parsed into against the
+# columnar StarCatalog and DsoCatalog. uses data/catalog.txt and
+# data/HYG.csv if they're there, or made up catalogs the same size
+#
+#   python -m benchmarks.catalog_memory [catalog.txt] [HYG.csv]
+import gc
+import sys
+import time
+import tracemalloc
+from io import StringIO
+from typing import Callable, Optional, Tuple, TypeVar
+
+import numpy as np
+
+from benchmarks.catalogs import dso_lines, hyg_csv, legacy_dsos, legacy_stars
+from libs.astro_data.catalog import DsoCatalog, StarCatalog
+
+T = TypeVar("T")
+
+
+def _resident(build: Callable[[], T]) -> Tuple[T, int]:
+    # what's still allocated once the catalog is built, parsing garbage
+    # doesn't count
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def _time(query: Callable[[], object], repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        query()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _row(name: str, before: float, after: float, unit: str):
+    print(
+        f"{name:<34} {before:>10.1f} {unit} {after:>10.1f} {unit}"
+        f" {before / after:>8.1f}x"
+    )
+
+
+def main(catalog_path: Optional[str], hyg_path: Optional[str]):
+    lines = dso_lines(catalog_path)
+    hyg = hyg_csv(hyg_path)
+
+    old_dsos, old_dso_size = _resident(lambda: legacy_dsos(lines))
+    dsos, dso_size = _resident(lambda: DsoCatalog.from_lines(lines))
+    old_stars, old_star_size = _resident(lambda: legacy_stars(StringIO(hyg)))
+    stars, star_size = _resident(lambda: StarCatalog.read_hyg(StringIO(hyg)))
+    print(f"{len(dsos)} dsos, {len(stars)} stars")
+    print(f"{'':<34} {'before':>13} {'after':>13}")
+    _row("dso catalog", old_dso_size / 2 ** 20, dso_size / 2 ** 20, "MB")
+    _row("star catalog", old_star_size / 2 ** 20, star_size / 2 ** 20, "MB")
+
+    iau = stars.constellations[0]
+    assert len(stars.in_constellation(iau)) == sum(
+        star.constellation == iau for star in old_stars
+    )
+    _row(
+        "stars in a constellation",
+        _time(lambda: [s for s in old_stars if s.constellation == iau]) * 1e3,
+        _time(lambda: stars.in_constellation(iau)) * 1e3,
+        "ms",
+    )
+    _row(
+        "stars brighter than mag 6",
+        _time(lambda: [s for s in old_stars if s.mag < 6]) * 1e3,
+        _time(lambda: stars.rows(np.flatnonzero(stars.mag < 6))) * 1e3,
+        "ms",
+    )
+    _row(
+        "brightest 100 stars",
+        _time(lambda: sorted(old_stars, key=lambda s: s.mag)[:100]) * 1e3,
+        _time(lambda: stars.rows(np.argsort(stars.mag)[:100])) * 1e3,
+        "ms",
+    )
+    _row(
+        "dsos by type",
+        _time(lambda: [d for d in old_dsos if d.type == "PN"]) * 1e3,
+        _time(
+            lambda: dsos.rows(
+                np.flatnonzero(dsos.column("type") == dsos.types.index("PN"))
+            )
+        )
+        * 1e3,
+        "ms",
+    )
+    _row(
+        "mean dso b magnitude",
+        _time(lambda: sum(d.magnitude.b for d in old_dsos) / len(old_dsos))
+        * 1e3,
+        _time(lambda: dsos.column("bmag").mean()) * 1e3,
+        "ms",
+    )
+    # what every caller still going through the views pays
+    _row(
+        "read ra of every star",
+        _time(lambda: [s.ra for s in old_stars], 3) * 1e3,
+        _time(lambda: [s.ra for s in stars], 3) * 1e3,
+        "ms",
+    )
+
+
+if __name__ == "__main__":
+    main(
+        sys.argv[1] if len(sys.argv) > 1 else "data/catalog.txt",
+        sys.argv[2] if len(sys.argv) > 2 else "data/HYG.csv",
+    )
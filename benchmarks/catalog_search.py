@@ -0,0 +1,92 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+# name lookups over a catalog the size of the real one (119k stars, a few
+# hundred of them named, 88 constellations, a few thousand dso common
+# names): the old star() scan against the search index, and search latency
+# for exact, prefix and misspelled queries
+#
+#   python -m benchmarks.catalog_search
+import random
+import timeit
+from io import StringIO
+from typing import List, Optional
+
+from benchmarks.catalogs import (
+    CONSTELLATIONS,
+    LegacyStar,
+    dso_lines,
+    hyg_csv,
+    legacy_stars,
+    word,
+)
+from libs.astro_data.api import build_search_index
+from libs.astro_data.catalog import DsoCatalog, StarCatalog
+
+DSO_NAMES = 6_000
+
+
+class _Constellation:
+    # just the bits the search index reads
+    def __init__(self, iau: str, english_name: str, native_name: str):
+        self.iau = iau
+        self.english_name = english_name
+        self.native_name = native_name
+
+
+def _scan(stars: List[LegacyStar], name: str) -> Optional[LegacyStar]:
+    # what AstronomyClient.star used to do
+    for star in stars:
+        if star.proper and star.proper.lower() == name.lower():
+            return star
+    return None
+
+
+def _report(name: str, fn, number: int):
+    seconds = min(timeit.repeat(fn, number=number, repeat=5)) / number
+    print(f"{name:<28} {seconds * 1e6:>10.1f} us")
+
+
+def main():
+    rng = random.Random(0)
+    hyg = hyg_csv()
+    legacy = legacy_stars(StringIO(hyg))
+    stars = StarCatalog.read_hyg(StringIO(hyg))
+    constellations = [
+        _Constellation(f"C{i:02}", word(rng), word(rng))
+        for i in range(CONSTELLATIONS)
+    ]
+    dsos = DsoCatalog.from_lines(dso_lines())
+    for row in range(DSO_NAMES):
+        name = f"{word(rng)} {rng.choice(('Nebula', 'Cluster'))}"
+        dsos.notes[row] = (name, "", "", "")
+
+    index = build_search_index(stars, constellations, dsos)
+    print(f"{len(index)} names indexed")
+
+    name = next(star.proper for star in reversed(legacy) if star.proper)
+    typo = name[:2] + name[3] + name[2] + name[4:]
+    _report("star() scan", lambda: _scan(legacy, name), 20)
+    _report(f"exact {name!r}", lambda: index.exact(name, "star"), 10_000)
+    _report(f"search {name!r}", lambda: index.search(name), 1_000)
+    _report(f"search {name[:3]!r}", lambda: index.search(name[:3]), 1_000)
+    _report(f"search {typo!r}", lambda: index.search(typo), 1_000)
+    _report("search 'nebu'", lambda: index.search("nebu"), 1_000)
+    _report("complete 'a'", lambda: index.complete("a"), 1_000)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+# made up star and dso catalogs the size of the real ones for the astro
+# benchmarks, and the per object classes the catalogs used to be parsed
+# into, to compare the columnar catalogs against
+import math
+import os
+import random
+from dataclasses import dataclass
+from typing import List, Optional, TextIO
+
+import pandas as pd
+
+# roughly what stellarium and hyg ship
+CATALOG_SIZE = 94_660
+NGC_COUNT = 7_840
+IC_COUNT = 5_386
+MESSIER_COUNT = 110
+TYPES = ("G", "GC", "OC", "PN", "EN", "RN", "SNR", "HII")
+STAR_COUNT = 119_614
+NAMED_STARS = 450
+CONSTELLATIONS = 88
+SYLLABLES = (
+    "al ar be ca de el gen ha is ka lu ma ni or pol ra sa ta u ve za "
+    "neb ux rig tor cen dra lyr aqu mir"
+).split()
+
+
+def word(rng: random.Random) -> str:
+    return "".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))).title()
+
+
+def _dso_line(rng: random.Random, i: int) -> str:
+    # stellarium puts 0 in the catalogs an object isn't in
+    ngc = i if i <= NGC_COUNT else 0
+    ic = i - NGC_COUNT if NGC_COUNT < i <= NGC_COUNT + IC_COUNT else 0
+    m = i // 70 if i <= NGC_COUNT and i % 70 == 0 else 0
+    fields = [
+        i,
+        rng.uniform(0, 360),
+        math.degrees(math.asin(rng.uniform(-1, 1))),
+        rng.uniform(2, 20),
+        rng.uniform(2, 20),
+        rng.choice(TYPES),
+        "",
+        rng.uniform(0, 60),
+        rng.uniform(0, 60),
+        rng.uniform(0, 180),
+        0,
+        0,
+        0,
+        0,
+        "",
+        "",
+        ngc,
+        ic,
+        m if m <= MESSIER_COUNT else 0,
+        # the rest of the columns aren't read
+        "",
+    ]
+    return "\t".join(map(str, fields)) + "\n"
+
+
+def dso_lines(path: Optional[str] = None) -> List[str]:
+    # data/catalog.txt if it's there, otherwise a made up one
+    if path and os.path.exists(path):
+        with open(path) as fp:
+            return fp.readlines()
+    rng = random.Random(0)
+    return [_dso_line(rng, i) for i in range(1, CATALOG_SIZE + 1)]
+
+
+def hyg_csv(path: Optional[str] = None) -> str:
+    # data/HYG.csv if it's there, otherwise a made up one, stars spread
+    # evenly over the sphere
+    if path and os.path.exists(path):
+        with open(path) as fp:
+            return fp.read()
+    rng = random.Random(0)
+    named = set(rng.sample(range(1, STAR_COUNT + 1), NAMED_STARS))
+    codes = [f"C{i:02}" for i in range(CONSTELLATIONS)]
+    rows = ["id,hip,proper,ra,dec,mag,con", "0,,Sol,0,0,-26.7,"]
+    for i in range(1, STAR_COUNT + 1):
+        rows.append(
+            f"{i},{i if rng.random() < 0.9 else ''},"
+            f"{word(rng) if i in named else ''},"
+            f"{rng.uniform(0, 24)},"
+            f"{math.degrees(math.asin(rng.uniform(-1, 1)))},"
+            f"{rng.uniform(-1, 12)},{rng.choice(codes)}"
+        )
+    return "\n".join(rows) + "\n"
+
+
+class LegacyDSO:
+    # what DSO used to be, one object (and five nested ones) per row
+    def __init__(self, line: str):
+        split = line.split("\t")
+
+        self.id = int(split[0])
+        self.location = _Pair(float(split[1]), float(split[2]))
+        self.magnitude = _Pair(float(split[3]), float(split[4]))
+        self.type = split[5]
+        self.morph_type = split[6]
+        self.size = _Pair(float(split[7]), float(split[8]))
+        self.angle = float(split[9])
+        self.redshift = _Pair(float(split[10]), float(split[11]))
+        self.parallax = _Pair(float(split[12]), float(split[13]))
+
+        self.ngc = int(split[16]) if split[16] else None
+        self.ic = int(split[17]) if split[17] else None
+        self.m = int(split[18]) if split[18] else None
+
+        self.common_names = ""
+        self.ned_notes = ""
+        self.open_ngc_notes = ""
+        self.constellation = ""
+
+
+@dataclass
+class _Pair:
+    a: float
+    b: float
+
+
+@dataclass
+class LegacyStar:
+    ra: float
+    dec: float
+    proper: str
+    mag: float
+    constellation: str
+    hipparcos: int
+
+
+def legacy_dsos(lines: List[str]) -> List[LegacyDSO]:
+    return [
+        LegacyDSO(line)
+        for line in lines
+        if (line and not line.startswith("#"))
+    ]
+
+
+def legacy_stars(fp: TextIO) -> List[LegacyStar]:
+    pdata = pd.read_csv(fp)
+    return [
+        LegacyStar(
+            line.ra,
+            line.dec,
+            line.proper if isinstance(line.proper, str) else None,
+            line.mag,
+            line.con if isinstance(line.con, str) else None,
+            line.hip,
+        )
+        for line in pdata.itertuples()
+        if line.id != 0
+    ]
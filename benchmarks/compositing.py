@@ -0,0 +1,263 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+# per-step and end to end timings for the weather map compositing, the old
+# PIL path (four pastes into a 512x512 mosaic, crop, point(lambda), paste)
+# against the numpy path in libs.helpers
+#
+#   python -m benchmarks.compositing [iterations]
+import math
+import sys
+import timeit
+from io import BytesIO
+from typing import List, Tuple
+
+import numpy as np
+from PIL import Image
+
+from libs.decoded_tiles import decoded_tiles
+from libs.helpers import (
+    LAYER_ALPHA,
+    composite_weather_map,
+    load_image,
+    plan_tiles,
+    stitch_tiles,
+    tile_array,
+)
+from libs.map_render import render_weather_map
+
+LAT, LON, ZOOM = 41.88, -87.63, 8
+# plain png, like the old path, see benchmarks.encoders for the others
+PNG_ONLY = (("png",), 1 << 30)
+
+
+# the old path, kept here to measure against
+def _get_tiles(
+    lat: float, lon: float, zoom: int
+) -> Tuple[Tuple[int, int, int, int], Tuple[int, int]]:  # noqa e124
+    n = 2.0 ** zoom
+    x = (lon + 180.0) / 360.0 * n
+    y = (
+        (
+            1.0
+            - math.log(
+                math.tan(math.radians(lat)) + (1 / math.cos(math.radians(lat)))
+            )
+            / math.pi
+        )
+        / 2.0
+        * n
+    )
+    # x and y are float coords here, grab whatever other tiles i need
+    # other bounds
+    x2 = x - 1 if x - int(x) < 0.5 else x + 1
+    y2 = y - 1 if y - int(y) < 0.5 else y + 1
+
+    # make sure they're always in the right order
+    x1, x2 = (int(x), int(x2)) if x < x2 else (int(x2), int(x))
+    y1, y2 = (int(y), int(y2)) if y < y2 else (int(y2), int(y))
+
+    # map tiles are 256x256 so grab the coords the location is on the pic
+    center_x = max(x1, x2)
+    center_y = max(y1, y2)
+    x_pos = int(256 + (x - int(center_x)) * 256)
+    y_pos = int(256 + (y - int(center_y)) * 256)
+    return (x1, y1, x2, y2), (x_pos, y_pos)
+
+
+def _mosaic_tiles(tiles: Tuple[int, int, int, int]) -> List[Tuple[int, int]]:
+    # the order _assemble_mosaic pastes them in
+    return [
+        (tiles[0], tiles[1]),
+        (tiles[0], tiles[3]),
+        (tiles[2], tiles[1]),
+        (tiles[2], tiles[3]),
+    ]
+
+
+def _assemble_mosaic(
+    images: List[Image.Image], location: Tuple[int, int]
+) -> Image.Image:
+    mosaic = Image.new("RGBA", (512, 512))
+    mosaic.paste(images[0], (0, 0))
+    mosaic.paste(images[1], (0, 256))
+    mosaic.paste(images[2], (256, 0))
+    mosaic.paste(images[3], (256, 256))
+    mosaic = mosaic.crop(
+        [
+            location[0] - 128,
+            location[1] - 128,
+            location[0] + 128,
+            location[1] + 128,
+        ]
+    )
+    return mosaic
+
+
+def _tile(fmt: str, seed: int, size: int = 256) -> bytes:
+    rng = np.random.default_rng(seed)
+    # smooth-ish noise so the encoders see something tile shaped
+    small = rng.integers(0, 256, (32, 32, 4), dtype=np.uint8)
+    img = Image.fromarray(small, "RGBA").resize((size, size), Image.BILINEAR)
+    buf = BytesIO()
+    if fmt == "jpg":
+        img.convert("RGB").save(buf, format="jpeg", quality=85)
+    else:
+        img.save(buf, format="png")
+    return buf.getvalue()
+
+
+def _tiles(coords, fmt: str, salt: int, size: int = 256) -> List[bytes]:
+    # the same coordinates always get the same tile
+    return [_tile(fmt, hash((x, y, salt)) & 0xFFFF, size) for x, y in coords]
+
+
+def _pil_composite(
+    radar: List[Image.Image],
+    satellite: List[Image.Image],
+    hillshade: List[Image.Image],
+    location: Tuple[int, int],
+) -> Image.Image:
+    map_img = Image.alpha_composite(
+        _assemble_mosaic(satellite, location),
+        _assemble_mosaic(hillshade, location),
+    )
+    layer_img = _assemble_mosaic(radar, location)
+    alpha = layer_img.split()[3].point(lambda i: i / 1.4)
+    map_img.paste(layer_img, (0, 0), mask=alpha)
+    return map_img
+
+
+def _pil_render(radar, satellite, hillshade, location) -> bytes:
+    img = _pil_composite(
+        [load_image(t) for t in radar],
+        [load_image(t, "RGBA") for t in satellite],
+        [load_image(t, "RGBA") for t in hillshade],
+        location,
+    )
+    buf = BytesIO()
+    img.save(buf, format="png")
+    return buf.getvalue()
+
+
+def _cold_render(layers) -> bytes:
+    # every tile decoded from scratch, like a render on a fresh worker
+    decoded_tiles.clear()
+    return render_weather_map(*layers, *PNG_ONLY)
+
+
+def _report(name: str, old, new, number: int):
+    before = min(timeit.repeat(old, number=number, repeat=5)) / number
+    after = min(timeit.repeat(new, number=number, repeat=5)) / number
+    print(
+        f"{name:<16} {before * 1e6:>9.1f} us {after * 1e6:>9.1f} us"
+        f" {before / after:>7.2f}x"
+    )
+
+
+def main(number: int):
+    tiles, location = _get_tiles(LAT, LON, ZOOM)
+    coords = _mosaic_tiles(tiles)
+    radar = _tiles(coords, "png", 0)
+    satellite = _tiles(coords, "jpg", 1)
+    hillshade = _tiles(coords, "png", 2)
+
+    plan = plan_tiles(LAT, LON, ZOOM)
+    layers = [
+        (plan, _tiles(plan.tiles, fmt, salt))
+        for fmt, salt in (("png", 0), ("jpg", 1), ("png", 2))
+    ]
+    decoded = [(p, [tile_array(t) for t in data]) for p, data in layers]
+
+    radar_img = [load_image(t) for t in radar]
+    sat_img = [load_image(t, "RGBA") for t in satellite]
+    hill_img = [load_image(t, "RGBA") for t in hillshade]
+
+    layer_img = _assemble_mosaic(radar_img, location)
+    layer_arr = stitch_tiles(*decoded[0])
+    canvas = np.empty_like(layer_arr)
+    mask = np.empty(layer_arr.shape[:2], np.uint8)
+
+    assert np.array_equal(
+        np.asarray(_pil_composite(radar_img, sat_img, hill_img, location)),
+        np.asarray(composite_weather_map(*decoded)),
+    )
+
+    print(f"{'':<16} {'pil':>12} {'numpy':>12} {'speedup':>8}")
+    _report(
+        "mosaic + crop",
+        lambda: _assemble_mosaic(radar_img, location),
+        lambda: stitch_tiles(*decoded[0], canvas),
+        number,
+    )
+    _report(
+        "layer alpha",
+        lambda: layer_img.split()[3].point(lambda i: i / 1.4),
+        lambda: np.take(LAYER_ALPHA, layer_arr[..., 3], out=mask),
+        number,
+    )
+    _report(
+        "composite",
+        lambda: _pil_composite(radar_img, sat_img, hill_img, location),
+        lambda: composite_weather_map(*decoded),
+        number,
+    )
+    _report(
+        "decode + encode",
+        lambda: _pil_render(radar, satellite, hillshade, location),
+        lambda: _cold_render(layers),
+        max(1, number // 10),
+    )
+    _report(
+        "  hot tiles",
+        lambda: _pil_render(radar, satellite, hillshade, location),
+        lambda: render_weather_map(*layers, *PNG_ONLY),
+        max(1, number // 10),
+    )
+
+    # bigger maps only go through the tile engine
+    print()
+    for size, scale, tile_size in (
+        ((1024, 768), 1.0, 256),
+        ((1024, 768), 2.0, 256),
+        ((1024, 768), 2.0, 512),
+    ):
+        sat_plan = plan_tiles(LAT, LON, ZOOM, size, scale, tile_size)
+        big = [
+            (p, _tiles(p.tiles, fmt, salt, p.tile_size))
+            for p, fmt, salt in (
+                (plan_tiles(LAT, LON, ZOOM, size, scale), "png", 0),
+                (sat_plan, "jpg", 1),
+                (plan_tiles(LAT, LON, ZOOM, size, scale), "png", 2),
+            )
+        ]
+        cold = min(
+            timeit.repeat(lambda: _cold_render(big), number=1, repeat=3)
+        )
+        hot = min(
+            timeit.repeat(
+                lambda: render_weather_map(*big, *PNG_ONLY), number=1, repeat=3
+            )
+        )
+        print(
+            f"{size[0]}x{size[1]} @{scale:g}x, {tile_size}px satellite: "
+            f"{len(sat_plan.tiles)} satellite tiles at z{sat_plan.zoom}, "
+            f"{cold * 1000:.1f} ms, {hot * 1000:.1f} ms with hot tiles"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,110 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+# event-loop lag during a burst of map renders served from the disk cache,
+# comparing blocking reads + BytesIO decode on the loop (the old path) with
+# DiskCache.read_async handing PIL an mmap off the loop
+#
+#   python -m benchmarks.disk_cache_loop_lag [renders]
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from io import BytesIO
+from typing import List
+
+from PIL import Image
+
+from libs.disk_cache import DiskCache
+from libs.helpers import gather_bounded, load_image
+
+TILES_PER_RENDER = 12
+TICK = 0.005
+
+
+def _make_tiles(cache: DiskCache, count: int):
+    for i in range(count):
+        img = Image.frombytes("RGBA", (256, 256), os.urandom(256 * 256 * 4))
+        buf = BytesIO()
+        img.save(buf, format="png")
+        cache.put(f"/tile/{i}.png", buf.getvalue())
+
+
+async def _heartbeat(lags: List[float], stop: asyncio.Event):
+    # how late each tick fires is how long something else held the loop
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+
+
+async def _blocking_tile(cache: DiskCache, i: int) -> Image.Image:
+    buf = BytesIO()
+    buf.write(cache.get(f"/tile/{i}.png"))
+    buf.seek(0)
+    img = Image.open(buf)
+    img.load()
+    return img
+
+
+async def _async_tile(cache: DiskCache, i: int) -> Image.Image:
+    return await cache.read_async(f"/tile/{i}.png", load_image)
+
+
+async def _burst(cache: DiskCache, tile, renders: int):
+    lags: List[float] = []
+    stop = asyncio.Event()
+    beat = asyncio.ensure_future(_heartbeat(lags, stop))
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            gather_bounded(
+                tile(cache, (r + t) % TILES_PER_RENDER)
+                for t in range(TILES_PER_RENDER)
+            )
+            for r in range(renders)
+        )
+    )
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+    return elapsed, lags
+
+
+async def main(renders: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = DiskCache(tmp)
+        _make_tiles(cache, TILES_PER_RENDER)
+        print(f"{renders} renders x {TILES_PER_RENDER} cached tiles")
+        for name, tile in (
+            ("blocking on loop", _blocking_tile),
+            ("read_async + mmap", _async_tile),
+        ):
+            elapsed, lags = await _burst(cache, tile, renders)
+            lags = lags or [0.0]
+            print(
+                f"{name:<18} total {elapsed * 1000:>8.1f} ms  "
+                f"lag mean {statistics.mean(lags) * 1000:>7.2f} ms  "
+                f"max {max(lags) * 1000:>7.2f} ms  "
+                f"ticks {len(lags)}"
+            )
+        cache.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20))
@@ -0,0 +1,80 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+# output size and encode time of every map encoder, on a synthetic weather
+# map at a few sizes, plus which one encode_within picks for a few budgets
+#
+#   python -m benchmarks.encoders [repeats]
+import sys
+import timeit
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+
+from libs.encoders import ENCODERS, DEFAULT_ORDER, encode_within, extension_for
+from libs.helpers import LAYER_ALPHA
+
+SIZES = ((256, 256), (512, 512), (1024, 768), (2048, 1536))
+
+
+def _weather_map(size, opaque: bool = False) -> Image.Image:
+    # a blurry "satellite" basemap with a translucent weather blob on top,
+    # close enough to what the renderer produces for encoders to chew on
+    rng = np.random.default_rng(0)
+    small = rng.integers(0, 256, (size[1] // 16, size[0] // 16, 3), np.uint8)
+    img = Image.fromarray(small, "RGB").resize(size, Image.BICUBIC)
+    img = img.filter(ImageFilter.DETAIL).convert("RGBA")
+    if opaque:
+        return img
+    layer = Image.new("RGBA", size)
+    draw = ImageDraw.Draw(layer)
+    w, h = size
+    draw.ellipse((w // 5, h // 4, w * 3 // 4, h * 3 // 4), (40, 90, 255, 180))
+    draw.ellipse((w // 3, h // 3, w * 2 // 3, h * 2 // 3), (255, 60, 40, 220))
+    layer = layer.filter(ImageFilter.GaussianBlur(w // 40))
+    mask = Image.fromarray(LAYER_ALPHA[np.asarray(layer)[..., 3]], "L")
+    img.paste(layer, (0, 0), mask=mask)
+    return img
+
+
+def main(repeats: int):
+    for size in SIZES:
+        for opaque in (False, True):
+            img = _weather_map(size, opaque)
+            print(f"{size[0]}x{size[1]}{' opaque' if opaque else ''}")
+            for name, encoder in ENCODERS.items():
+                if encoder.opaque_only and not opaque:
+                    continue
+                data = encoder.encode(img)
+                seconds = min(
+                    timeit.repeat(
+                        lambda: encoder.encode(img), number=1, repeat=repeats
+                    )
+                )
+                print(
+                    f"  {name:<16} {len(data) / 1024:>9.1f} KiB"
+                    f" {seconds * 1000:>9.1f} ms"
+                )
+            for budget in (64, 256, 1024):
+                data = encode_within(img, budget * 1024, DEFAULT_ORDER)
+                print(
+                    f"  budget {budget:>5} KiB -> {extension_for(data)}"
+                    f" {len(data) / 1024:.1f} KiB"
+                )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
@@ -0,0 +1,94 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+# requests/sec against a local stub server, comparing a fresh ClientSession
+# per request (the old behaviour) with the shared HTTPClient
+#
+#   python -m benchmarks.http_client [requests] [concurrency]
+import asyncio
+import sys
+import time
+
+import aiohttp
+from aiohttp import web
+from yarl import URL
+
+from libs.http import HTTPClient
+
+PAYLOAD = b'{"cod": 200, "name": "Chicago"}'
+
+
+async def _stub_server() -> web.AppRunner:
+    async def handler(_request: web.Request) -> web.Response:
+        return web.Response(body=PAYLOAD, content_type="application/json")
+
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    return runner
+
+
+async def _per_request(url: URL):
+    async with aiohttp.ClientSession() as sess:
+        async with sess.get(url) as resp:
+            await resp.read()
+
+
+async def _run(fetch, url: URL, requests: int, concurrency: int) -> float:
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            await fetch(url)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return requests / (time.perf_counter() - start)
+
+
+async def main(requests: int, concurrency: int):
+    runner = await _stub_server()
+    port = runner.addresses[0][1]
+    url = URL.build(scheme="http", host="127.0.0.1", port=port, path="/x")
+
+    http = HTTPClient()
+
+    async def shared(u: URL):
+        async with http.get(u) as resp:
+            await resp.read()
+
+    try:
+        before = await _run(_per_request, url, requests, concurrency)
+        after = await _run(shared, url, requests, concurrency)
+    finally:
+        await http.close()
+        await runner.cleanup()
+
+    print(f"{requests} requests, concurrency {concurrency}")
+    print(f"session per request: {before:>10.1f} req/s")
+    print(f"shared HTTPClient:   {after:>10.1f} req/s")
+    print(f"speedup:             {after / before:>10.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(
+        main(
+            int(sys.argv[1]) if len(sys.argv) > 1 else 2000,
+            int(sys.argv[2]) if len(sys.argv) > 2 else 16,
+        )
+    )
@@ -0,0 +1,132 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+# region queries over a catalog the size of the real one, the old
+# star_in_bounds filter (and the same kind of filter for cones and nearest
+# neighbours) against the SkyIndex grid
+#
+#   python -m benchmarks.sky_index
+import math
+import timeit
+from io import StringIO
+from typing import List
+
+from benchmarks.catalogs import LegacyStar, dso_lines, hyg_csv, legacy_stars
+from libs.astro_data.catalog import DsoCatalog, StarCatalog
+from libs.astro_data.sky_index import SkyIndex
+
+
+def _separation(ra1: float, dec1: float, ra2: float, dec2: float) -> float:
+    ra1, dec1, ra2, dec2 = map(math.radians, (ra1, dec1, ra2, dec2))
+    cos = math.sin(dec1) * math.sin(dec2) + math.cos(dec1) * math.cos(
+        dec2
+    ) * math.cos(ra1 - ra2)
+    return math.degrees(math.acos(max(-1.0, min(1.0, cos))))
+
+
+def _filter_box(stars: List[LegacyStar], ra, dec) -> List[LegacyStar]:
+    # what star_in_bounds used to do
+    bounds = [[min(ra), max(ra)], [min(dec), max(dec)]]
+    return list(
+        filter(
+            lambda star: bounds[0][0] < star.ra < bounds[0][1]
+            and bounds[1][0] < star.dec < bounds[1][1],
+            stars,
+        )
+    )
+
+
+def _filter_cone(stars: List[LegacyStar], ra, dec, radius) -> List[LegacyStar]:
+    return [
+        star
+        for star in stars
+        if _separation(star.ra * 15, star.dec, ra, dec) <= radius
+    ]
+
+
+def _filter_nearest(stars: List[LegacyStar], ra, dec, k) -> List[LegacyStar]:
+    return sorted(
+        stars, key=lambda star: _separation(star.ra * 15, star.dec, ra, dec)
+    )[:k]
+
+
+def _report(name: str, old, new, number: int):
+    before = min(timeit.repeat(old, number=1, repeat=3)) if old else None
+    after = min(timeit.repeat(new, number=number, repeat=5)) / number
+    print(
+        f"{name:<32}"
+        + (f" {before * 1e3:>9.1f} ms" if before else f" {'-':>12}")
+        + f" {after * 1e6:>9.1f} us"
+        + (f" {before / after:>8.0f}x" if before else "")
+    )
+
+
+def main():
+    hyg = hyg_csv()
+    stars = legacy_stars(StringIO(hyg))
+    catalog = StarCatalog.read_hyg(StringIO(hyg))
+    dsos = DsoCatalog.from_lines(dso_lines())
+    star_index = SkyIndex(catalog.ra * 15, catalog.dec, catalog)
+    dso_index = SkyIndex(dsos.column("ra"), dsos.column("dec"), dsos)
+    print(f"{len(star_index)} stars, {len(dso_index)} dsos")
+
+    # orion's belt, in hours for the old filter and degrees for the index
+    assert len(_filter_box(stars, (5, 6), (-10, 0))) == len(
+        star_index.box((75, 90), (-10, 0))
+    )
+    _report(
+        "box 1h x 10 deg",
+        lambda: _filter_box(stars, (5, 6), (-10, 0)),
+        lambda: star_index.box((75, 90), (-10, 0)),
+        200,
+    )
+    _report(
+        "box across 0h",
+        None,
+        lambda: star_index.box((345, 15), (-10, 10)),
+        200,
+    )
+    assert len(_filter_cone(stars, 83.8, -5.4, 2)) == len(
+        star_index.cone(83.8, -5.4, 2)
+    )
+    _report(
+        "cone 2 deg",
+        lambda: _filter_cone(stars, 83.8, -5.4, 2),
+        lambda: star_index.cone(83.8, -5.4, 2),
+        1000,
+    )
+    _report(
+        "cone 5 deg around the pole",
+        lambda: _filter_cone(stars, 0, 88, 5),
+        lambda: star_index.cone(0, 88, 5),
+        200,
+    )
+    _report(
+        "10 nearest stars",
+        lambda: _filter_nearest(stars, 83.8, -5.4, 10),
+        lambda: star_index.nearest(83.8, -5.4, 10),
+        1000,
+    )
+    _report(
+        "10 nearest dsos",
+        None,
+        lambda: dso_index.nearest(10.68, 41.27, 10),
+        1000,
+    )
+
+
+if __name__ == "__main__":
+    main()
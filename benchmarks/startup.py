@@ -0,0 +1,165 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+# where startup time goes: what importing each module main.py imports costs
+# in a fresh interpreter (python -X importtime, dependencies included), the
+# heavy libraries that are now only imported on first use, and what making
+# each lazily loaded subsystem costs when it finally happens
+#
+#   python -m benchmarks.startup
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, Optional
+
+from benchmarks.catalogs import dso_lines, hyg_csv
+
+# what main.py imports before the bot connects, and the modules tanjun loads
+STARTUP = (
+    "dotenv",
+    "bot",
+    "bot.converters",
+    "libs.astro_data",
+    "libs.astro_data.snapshot",
+    "libs.astronomy",
+    "libs.cache",
+    "libs.http",
+    "libs.lazy",
+    "libs.nasa",
+    "libs.prefetch",
+    "libs.render_pool",
+    "module_services.geocoding",
+    "hikari",
+    "tanjun",
+    "bot.impl",
+    "module_services.bot",
+    "module_services.weather",
+    "modules.astronomy",
+    "modules.settings",
+    "modules.weather",
+)
+# imported at startup until they were deferred to first use
+DEFERRED = ("pandas", "skyfield.api", "dateparser")
+
+
+_IMPORT = """
+import sys
+for name in sys.argv[1:]:
+    try:
+        __import__(name)
+    except ImportError:
+        print(name, file=sys.stderr)
+"""
+
+
+def _import_time(*modules: str) -> Dict[str, Optional[float]]:
+    # cumulative import time in ms of every module the imports pulled in,
+    # in import order so a module shared by two is counted for the first.
+    # None for the ones that couldn't be imported
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _IMPORT, *modules],
+        capture_output=True,
+        text=True,
+    )
+    times: Dict[str, Optional[float]] = {}
+    for line in result.stderr.splitlines():
+        if line in modules:
+            times[line] = None
+        elif line.startswith("import time:") and "[us]" not in line:
+            _, cumulative, name = line[len("import time:") :].split("|")
+            times.setdefault(name.strip(), int(cumulative) / 1000)
+    return times
+
+
+def _show(name: str, ms: Optional[float], note: str = ""):
+    value = f"{ms:>10.1f} ms" if ms is not None else f"{'-':>13}"
+    print(f"{name:<34} {value} {note}")
+
+
+def _time(name: str, run: Callable[[], object]):
+    start = time.perf_counter()
+    try:
+        run()
+    except Exception as e:
+        _show(name, None, f"({type(e).__name__}: {e})")
+        return
+    _show(name, (time.perf_counter() - start) * 1000)
+
+
+def _catalogs(target: str):
+    # the real sources where there are some, made up ones the same size
+    # otherwise
+    with open(os.path.join(target, "catalog.txt"), "w") as fp:
+        fp.writelines(dso_lines("data/catalog.txt"))
+    with open(os.path.join(target, "HYG.csv"), "w") as fp:
+        fp.write(hyg_csv("data/HYG.csv"))
+    for name in ("NGC.csv", "constellations.json"):
+        shutil.copy(os.path.join("data", name), target)
+
+
+def main():
+    print("imports, each in a fresh interpreter")
+    for module in STARTUP:
+        times = _import_time(module)
+        heavy = [name for name in DEFERRED if name in times]
+        if times.get(module) is None:
+            _show(module, None, "(couldn't be imported)")
+            continue
+        _show(
+            module,
+            times[module],
+            f"(imports {', '.join(heavy)})" if heavy else "",
+        )
+    everything = _import_time(*STARTUP)
+    missing = [name for name in STARTUP if everything.get(name) is None]
+    _show(
+        "all of the above",
+        sum(everything.get(name) or 0 for name in STARTUP),
+        f"(without {', '.join(missing)})" if missing else "",
+    )
+
+    print("\nonly imported on first use now")
+    for module in DEFERRED:
+        _show(module, _import_time(module).get(module))
+
+    print("\nloaded lazily, after connecting or on first use")
+    from bot.converters import parse_datetime
+    from libs.astro_data import AstronomyClient
+    from libs.astro_data.snapshot import load_catalogs, parse
+    from libs.astronomy import AstronomyEventAPI
+
+    with tempfile.TemporaryDirectory() as data:
+        _catalogs(data)
+        snapshot = os.path.join(data, "snapshot")
+        _time(
+            "astronomy catalogs, text",
+            lambda: AstronomyClient(*parse(data)),
+        )
+        # the first one writes the snapshot
+        load_catalogs(data, snapshot)
+        _time(
+            "astronomy catalogs, snapshot",
+            lambda: AstronomyClient(*load_catalogs(data, snapshot)),
+        )
+    _time("ephemerides (de440.bsp)", AstronomyEventAPI)
+    _time("dateparser, first parse", lambda: parse_datetime("today"))
+
+
+if __name__ == "__main__":
+    main()
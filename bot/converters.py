@@ -16,8 +16,10 @@ OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
 """
 from datetime import datetime
 
-import dateparser
-
 
 def parse_datetime(value: str) -> datetime:
+    # dateparser takes a good while to import, main.py warms it up once the
+    # bot is connected
+    import dateparser
+
     return dateparser.parse(value)
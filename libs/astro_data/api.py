@@ -15,110 +15,149 @@ COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER I
 OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
 import json
-from functools import lru_cache
-from typing import TextIO, Optional, Tuple, Iterable, List
-
-import pandas as pd
+from typing import TextIO, Optional, Tuple, Iterable, List, Dict
 
+from libs.astro_data.catalog import DsoCatalog, StarCatalog
 from libs.astro_data.models import DSO, Star, Constellation
+from libs.astro_data.search import SearchHit, SearchIndex
+from libs.astro_data.sky_index import SkyIndex
+
+# catalogs dsos can be looked up in, named after the DSO attribute holding
+# the number. "id" is the stellarium catalog's own numbering
+DSO_CATALOGS = ("m", "ngc", "ic", "id")
+
+
+def build_dso_index(dsos: DsoCatalog) -> Dict[str, Dict[int, int]]:
+    # number -> row for each catalog. built back to front so the first row
+    # with a number wins, same as the linear scans this replaced. 0 is
+    # stellarium's "not in this catalog"
+    rows = range(len(dsos) - 1, -1, -1)
+    return {
+        catalog: {
+            number: row
+            for number, row in zip(dsos.column(catalog)[::-1].tolist(), rows)
+            if number > 0
+        }
+        for catalog in DSO_CATALOGS
+    }
+
+
+def build_search_index(
+    stars: StarCatalog,
+    constellations: Iterable[Constellation],
+    dsos: DsoCatalog,
+) -> SearchIndex:
+    index = SearchIndex()
+    for star in stars.named():
+        index.add(star.proper, "star", star)
+    for constellation in constellations:
+        for name in (
+            constellation.iau,
+            constellation.english_name,
+            constellation.native_name,
+        ):
+            index.add(name, "constellation", constellation)
+    for dso in dsos.named():
+        for name in dso.common_names.split(","):
+            index.add(name.strip(), "dso", dso)
+    index.build()
+    return index
 
 
 class AstronomyClient:
     constellations: List[Constellation] = []
 
     def __init__(
-        self, dso_fp: TextIO, ngc_fp: TextIO, hyg_fp: TextIO, con_fp: TextIO
+        self,
+        dsos: DsoCatalog,
+        stars: StarCatalog,
+        constellations: List[dict],
     ):
-        self.dsos = [
-            DSO(line)
-            for line in dso_fp.readlines()
-            if (line and not line.startswith("#"))
-        ]
-
-        pdata = pd.read_csv(hyg_fp)
-
-        self.stars = [
-            Star(
-                line.ra,
-                line.dec,
-                line.proper if isinstance(line.proper, str) else None,
-                line.mag,
-                line.con if isinstance(line.con, str) else None,
-                line.hip,
-            )
-            for line in pdata.itertuples()
-            if line.id != 0
-        ]
+        # the catalogs come from read() or a snapshot, see
+        # libs/astro_data/snapshot.py
+        self.dsos = dsos
+        self.stars = stars
 
-        self._hipparcos_mapping = {star.hipparcos: star for star in self.stars}
+        self._hipparcos_mapping = {
+            hip: row for row, hip in enumerate(self.stars.hip.tolist()) if hip
+        }
 
         self.constellations = AstronomyClient.constellations = [
             Constellation(constellation, self)
-            for constellation in json.load(con_fp)["constellations"]
+            for constellation in constellations
         ]
 
-        # parse openngc dataset
-        dataset = {
-            line.split(";")[0]: line.split(";")[1:]
-            for line in ngc_fp.readlines()[1:]
-        }
+        self._dso_index = build_dso_index(self.dsos)
+        self.search_index = build_search_index(
+            self.stars, self.constellations, self.dsos
+        )
+        # star ra is in hours, the indexes want degrees
+        self.star_index = SkyIndex(
+            self.stars.ra * 15, self.stars.dec, self.stars
+        )
+        self.dso_index = SkyIndex(
+            self.dsos.column("ra"), self.dsos.column("dec"), self.dsos
+        )
+
+    @classmethod
+    def read(
+        cls, dso_fp: TextIO, ngc_fp: TextIO, hyg_fp: TextIO, con_fp: TextIO
+    ) -> "AstronomyClient":
+        """
+        Parse stellarium's catalog.txt, OpenNGC's NGC.csv, HYG.csv and
+        constellations.json.
+        """
+        dsos = DsoCatalog.read(dso_fp)
+        dsos.read_open_ngc(ngc_fp)
+        return cls(
+            dsos,
+            StarCatalog.read_hyg(hyg_fp),
+            json.load(con_fp)["constellations"],
+        )
 
-        for dso in self.dsos:
-            if line := dataset.get(f"NGC{dso.ngc:>04}", None):
-                dso.common_names = line[-3].strip('"')
-                dso.ned_notes = line[-2].strip('"')
-                dso.open_ngc_notes = line[-1].strip('"')
-                dso.constellation = line[3]
-            elif line := dataset.get(f"IC{dso.ngc:>04}", None):
-                dso.common_names = line[-3].strip('"')
-                dso.ned_notes = line[-2].strip('"')
-                dso.open_ngc_notes = line[-1].strip('"')
-                dso.constellation = line[3]
+    def lookup(self, catalog: str, number: int) -> Optional[DSO]:
+        try:
+            index = self._dso_index[catalog]
+        except KeyError:
+            raise ValueError(f"unknown catalog {catalog!r}") from None
+        row = index.get(number, None)
+        return self.dsos[row] if row is not None else None
 
     def m(self, number: int) -> Optional[DSO]:
-        for dso in self.dsos:
-            if dso.m == number:
-                return dso
-        else:
-            return None
+        return self.lookup("m", number)
 
     def ngc(self, number: int) -> Optional[DSO]:
-        for dso in self.dsos:
-            if dso.ngc == number:
-                return dso
-        else:
-            return None
+        return self.lookup("ngc", number)
+
+    def ic(self, number: int) -> Optional[DSO]:
+        return self.lookup("ic", number)
 
     def hipparcos(self, number: int) -> Optional[Star]:
-        return self._hipparcos_mapping.get(number, None)
+        row = self._hipparcos_mapping.get(number, None)
+        return self.stars[row] if row is not None else None
 
-    @lru_cache(maxsize=1024)
     def constellation(self, search_term: str) -> Optional[Constellation]:
-        search_term = search_term.lower()
-        for constellation in self.constellations:
-            if constellation.iau.lower() == search_term:
-                return constellation
-        for constellation in self.constellations:
-            if (
-                search_term in constellation.native_name
-                or search_term in constellation.english_name
-            ):
-                return constellation
-        return None
+        # iau code or either name, or failing that the closest one
+        constellation = self.search_index.exact(search_term, "constellation")
+        if constellation is None:
+            hits = self.search_index.search(search_term, 1, "constellation")
+            constellation = hits[0].item if hits else None
+        return constellation
 
     def star(self, name: str) -> Optional[Star]:
-        for star in self.stars:
-            if star.proper and star.proper.lower() == name.lower():
-                return star
-        else:
-            return None
+        return self.search_index.exact(name, "star")
+
+    def search(
+        self, query: str, limit: int = 10, kind: Optional[str] = None
+    ) -> List[SearchHit]:
+        # stars, constellations and dso common names, see SearchIndex
+        return self.search_index.search(query, limit, kind)
+
+    def complete(self, query: str, limit: int = 25) -> List[str]:
+        return self.search_index.complete(query, limit)
 
     def star_in_bounds(
         self, ra: Tuple[float, float], dec: Tuple[float, float]
     ) -> Iterable[Star]:
-        bounds = [[min(ra), max(ra)], [min(dec), max(dec)]]
-        return filter(
-            lambda star: bounds[0][0] < star.ra < bounds[0][1]
-            and bounds[1][0] < star.dec < bounds[1][1],
-            self.stars,
-        )
+        # ra in hours, east from ra[0] to ra[1] so (23, 1) crosses 0h
+        return self.star_index.box((ra[0] * 15, ra[1] * 15), dec)
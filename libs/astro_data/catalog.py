@@ -0,0 +1,298 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+import csv
+from io import StringIO
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    TextIO,
+    Tuple,
+)
+
+import numpy as np
+
+from libs.astro_data.models import DSO, Star
+
+# stellarium catalog.txt columns read into the dso table, by position
+_DSO_COLUMNS = {
+    0: "id",
+    1: "ra",
+    2: "dec",
+    3: "bmag",
+    4: "vmag",
+    7: "major",
+    8: "minor",
+    9: "angle",
+    10: "z",
+    11: "z_err",
+    12: "plx",
+    13: "plx_err",
+    16: "ngc",
+    17: "ic",
+    18: "m",
+}
+_DSO_TEXT = {5: "type", 6: "morph_type"}
+# stellarium puts 0 in the id columns of catalogs an object isn't in; empty
+# ones are read as 0 too, and the object views hand out None for it
+_DSO_IDS = ("id", "ngc", "ic", "m")
+
+
+def _categorical(
+    values: Sequence[Optional[str]],
+) -> Tuple[np.ndarray, List[str]]:
+    import pandas as pd
+
+    codes, names = pd.factorize(pd.Series(values, dtype=object))
+    return codes.astype(np.int16), [str(name) for name in names]
+
+
+class StarCatalog:
+    """
+    The HYG star table as columns: ra (hours), dec, mag and hipparcos
+    number in numpy arrays, constellation as a code into ``constellations``
+    and proper names in a dict since only a few hundred stars have one.
+
+    Indexing gives a ``Star`` view of that row; views compare equal when
+    they point at the same row.
+    """
+
+    def __init__(
+        self,
+        ra: np.ndarray,
+        dec: np.ndarray,
+        mag: np.ndarray,
+        hip: np.ndarray,
+        constellation: np.ndarray,
+        constellations: List[str],
+        proper: Dict[int, str],
+    ):
+        self.ra = ra
+        self.dec = dec
+        self.mag = mag
+        # 0 where a star has no hipparcos number
+        self.hip = hip
+        # -1 where a star isn't in a constellation
+        self.constellation = constellation
+        self.constellations = constellations
+        self._constellation_codes = {
+            name.lower(): code for code, name in enumerate(constellations)
+        }
+        self.proper = proper
+
+    @classmethod
+    def from_columns(
+        cls,
+        ra: Sequence[float],
+        dec: Sequence[float],
+        mag: Sequence[float],
+        hip: Sequence[Optional[int]],
+        constellation: Sequence[Optional[str]],
+        proper: Sequence[Optional[str]],
+    ) -> "StarCatalog":
+        codes, names = _categorical(constellation)
+        return cls(
+            np.asarray(ra, np.float64),
+            np.asarray(dec, np.float64),
+            np.asarray(mag, np.float64),
+            np.array([h or 0 for h in hip], np.int32),
+            codes,
+            names,
+            {row: name for row, name in enumerate(proper) if name},
+        )
+
+    @classmethod
+    def read_hyg(cls, fp: TextIO) -> "StarCatalog":
+        # pandas is only imported to parse, a snapshot loads without it and
+        # it takes longer to import than the snapshot takes to load
+        import pandas as pd
+
+        data = pd.read_csv(
+            fp,
+            usecols=["id", "ra", "dec", "proper", "mag", "con", "hip"],
+        )
+        # id 0 is the sun
+        data = data[data["id"] != 0].reset_index(drop=True)
+        codes, names = pd.factorize(data["con"])
+        proper = data["proper"]
+        return cls(
+            data["ra"].to_numpy(np.float64),
+            data["dec"].to_numpy(np.float64),
+            data["mag"].to_numpy(np.float64),
+            data["hip"].fillna(0).to_numpy(np.int32),
+            codes.astype(np.int16),
+            [str(name) for name in names],
+            {
+                int(row): name
+                for row, name in proper[proper.notna()].items()
+                if isinstance(name, str)
+            },
+        )
+
+    def __len__(self) -> int:
+        return len(self.ra)
+
+    def __getitem__(self, row: int) -> Star:
+        return Star(self, int(row))
+
+    def __iter__(self) -> Iterator[Star]:
+        return (Star(self, row) for row in range(len(self)))
+
+    def rows(self, rows: Iterable[int]) -> List[Star]:
+        if isinstance(rows, np.ndarray):
+            # python ints index the columns a good bit faster
+            rows = rows.tolist()
+        return [Star(self, row) for row in rows]
+
+    def named(self) -> List[Star]:
+        return self.rows(sorted(self.proper))
+
+    def in_constellation(self, iau: str) -> List[Star]:
+        code = self._constellation_codes.get(iau.lower())
+        if code is None:
+            return []
+        return self.rows(np.flatnonzero(self.constellation == code))
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            column.nbytes
+            for column in (
+                self.ra,
+                self.dec,
+                self.mag,
+                self.hip,
+                self.constellation,
+            )
+        )
+
+
+class DsoCatalog:
+    """
+    The stellarium deep sky catalog as one numpy record array, with the
+    type and morphological type as codes into lookup tables. The OpenNGC
+    text (common names, notes, constellation) only exists for some of the
+    objects and lives in a dict by row.
+
+    Indexing gives a ``DSO`` view of that row.
+    """
+
+    def __init__(
+        self,
+        table: np.ndarray,
+        types: List[str],
+        morph_types: List[str],
+    ):
+        self.table = table
+        self.types = types
+        self.morph_types = morph_types
+        # row -> (common names, ned notes, openngc notes, constellation)
+        self.notes: Dict[int, Tuple[str, str, str, str]] = {}
+
+    @classmethod
+    def read(cls, fp: TextIO) -> "DsoCatalog":
+        return cls.from_lines(fp.readlines())
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[str]) -> "DsoCatalog":
+        import pandas as pd
+
+        text = "".join(
+            line if line.endswith("\n") else line + "\n"
+            for line in lines
+            if (line and not line.startswith("#"))
+        )
+        data = pd.read_csv(
+            StringIO(text),
+            sep="\t",
+            header=None,
+            usecols=list(_DSO_COLUMNS) + list(_DSO_TEXT),
+            quoting=csv.QUOTE_NONE,
+            keep_default_na=False,
+            dtype=str,
+        )
+        table = np.zeros(
+            len(data),
+            [
+                (name, np.int32 if name in _DSO_IDS else np.float64)
+                for name in _DSO_COLUMNS.values()
+            ]
+            + [(name, np.int16) for name in _DSO_TEXT.values()],
+        )
+        for column, name in _DSO_COLUMNS.items():
+            values = data[column].str.strip()
+            if name in _DSO_IDS:
+                table[name] = pd.to_numeric(values.replace("", "0")).to_numpy()
+            else:
+                table[name] = pd.to_numeric(values).to_numpy()
+        types, morph_types = [], []
+        for (column, name), names in zip(
+            _DSO_TEXT.items(), (types, morph_types)
+        ):
+            codes, uniques = pd.factorize(data[column])
+            table[name] = codes
+            names.extend(str(unique) for unique in uniques)
+        return cls(table, types, morph_types)
+
+    def read_open_ngc(self, fp: TextIO):
+        """
+        Common names, notes and constellation from OpenNGC's NGC.csv for
+        the objects it has a row for.
+        """
+        reader = csv.reader(fp, delimiter=";")
+        next(reader, None)
+        # name -> (common names, ned notes, openngc notes, constellation)
+        dataset = {
+            line[0]: (line[-3], line[-2], line[-1], line[4])
+            for line in reader
+            if line
+        }
+        for row, (ngc, ic) in enumerate(
+            zip(self.column("ngc").tolist(), self.column("ic").tolist())
+        ):
+            notes = dataset.get(f"NGC{ngc:>04}") or dataset.get(f"IC{ic:>04}")
+            if notes:
+                self.notes[row] = notes
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def __getitem__(self, row: int) -> DSO:
+        return DSO(self, int(row))
+
+    def __iter__(self) -> Iterator[DSO]:
+        return (DSO(self, row) for row in range(len(self)))
+
+    def rows(self, rows: Iterable[int]) -> List[DSO]:
+        if isinstance(rows, np.ndarray):
+            rows = rows.tolist()
+        return [DSO(self, row) for row in rows]
+
+    def named(self) -> List[DSO]:
+        return self.rows(
+            row for row in sorted(self.notes) if self.notes[row][0]
+        )
+
+    def column(self, name: str) -> np.ndarray:
+        return self.table[name]
+
+    @property
+    def nbytes(self) -> int:
+        return self.table.nbytes
@@ -17,10 +17,11 @@ OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
 import itertools
 from dataclasses import dataclass
 from functools import cached_property
-from typing import List, TYPE_CHECKING, Tuple, Iterable, Set
+from typing import List, TYPE_CHECKING, Tuple, Iterable, Set, Optional
 
 if TYPE_CHECKING:
     from libs.astro_data import AstronomyClient
+    from libs.astro_data.catalog import DsoCatalog, StarCatalog
 
 _TYPE_MAPPINGS = {
     "G": "Galaxy",
@@ -107,27 +108,101 @@ class _Parallax:
 
 
 class DSO:
-    def __init__(self, line: str):
-        split = line.split("\t")
-
-        self.id = int(split[0])
-        self.location = _Location(float(split[1]), float(split[2]))
-        self.magnitude = _Magnitude(float(split[3]), float(split[4]))
-        self.type = split[5]
-        self.morph_type = split[6]
-        self.size = _Size(float(split[7]), float(split[8]))
-        self.angle = float(split[9])
-        self.redshift = _Redshift(float(split[10]), float(split[11]))
-        self.parallax = _Parallax(float(split[12]), float(split[13]))
-
-        self.ngc = int(split[16]) if split[16] else None
-        self.ic = int(split[17]) if split[17] else None
-        self.m = int(split[18]) if split[18] else None
-
-        self.common_names = ""
-        self.ned_notes = ""
-        self.open_ngc_notes = ""
-        self.constellation = ""
+    """
+    One row of a DsoCatalog. The nested location, magnitude, etc. objects
+    are made when asked for, nothing is stored per object.
+    """
+
+    __slots__ = ("catalog", "row")
+
+    def __init__(self, catalog: "DsoCatalog", row: int):
+        self.catalog = catalog
+        self.row = row
+
+    def _get(self, name: str):
+        return self.catalog.table[name][self.row].item()
+
+    def _id(self, name: str) -> Optional[int]:
+        value = self._get(name)
+        return value if value > 0 else None
+
+    def _note(self, i: int) -> str:
+        notes = self.catalog.notes.get(self.row)
+        return notes[i] if notes else ""
+
+    @property
+    def id(self) -> Optional[int]:
+        return self._id("id")
+
+    @property
+    def location(self) -> _Location:
+        return _Location(self._get("ra"), self._get("dec"))
+
+    @property
+    def magnitude(self) -> _Magnitude:
+        return _Magnitude(self._get("bmag"), self._get("vmag"))
+
+    @property
+    def type(self) -> str:
+        return self.catalog.types[self._get("type")]
+
+    @property
+    def morph_type(self) -> str:
+        return self.catalog.morph_types[self._get("morph_type")]
+
+    @property
+    def size(self) -> _Size:
+        return _Size(self._get("major"), self._get("minor"))
+
+    @property
+    def angle(self) -> float:
+        return self._get("angle")
+
+    @property
+    def redshift(self) -> _Redshift:
+        return _Redshift(self._get("z"), self._get("z_err"))
+
+    @property
+    def parallax(self) -> _Parallax:
+        return _Parallax(self._get("plx"), self._get("plx_err"))
+
+    @property
+    def ngc(self) -> Optional[int]:
+        return self._id("ngc")
+
+    @property
+    def ic(self) -> Optional[int]:
+        return self._id("ic")
+
+    @property
+    def m(self) -> Optional[int]:
+        return self._id("m")
+
+    @property
+    def common_names(self) -> str:
+        return self._note(0)
+
+    @property
+    def ned_notes(self) -> str:
+        return self._note(1)
+
+    @property
+    def open_ngc_notes(self) -> str:
+        return self._note(2)
+
+    @property
+    def constellation(self) -> str:
+        return self._note(3)
+
+    def __eq__(self, other) -> bool:
+        return (
+            isinstance(other, DSO)
+            and self.catalog is other.catalog
+            and self.row == other.row
+        )
+
+    def __hash__(self) -> int:
+        return hash((id(self.catalog), self.row))
 
     def __str__(self) -> str:
         return (
@@ -145,22 +220,67 @@ class DSO:
     def pretty_type(self) -> str:
         return _TYPE_MAPPINGS[self.type.upper()]
 
+    @property
+    def designation(self) -> str:
+        if self.m:
+            return f"M{self.m:>04}"
+        if self.ngc:
+            return f"NGC{self.ngc:>04}"
+        if self.ic:
+            return f"IC{self.ic:>04}"
+        return f"#{self.id}"
+
 
-@dataclass
 class Star:
-    ra: float
-    dec: float
-    proper: str
-    mag: float
-    constellation: str
-    hipparcos: int
+    """One row of a StarCatalog, ra in hours."""
+
+    __slots__ = ("catalog", "row")
+
+    def __init__(self, catalog: "StarCatalog", row: int):
+        self.catalog = catalog
+        self.row = row
+
+    @property
+    def ra(self) -> float:
+        return self.catalog.ra[self.row].item()
+
+    @property
+    def dec(self) -> float:
+        return self.catalog.dec[self.row].item()
+
+    @property
+    def proper(self) -> Optional[str]:
+        return self.catalog.proper.get(self.row)
+
+    @property
+    def mag(self) -> float:
+        return self.catalog.mag[self.row].item()
+
+    @property
+    def constellation(self) -> Optional[str]:
+        code = self.catalog.constellation[self.row]
+        return self.catalog.constellations[code] if code >= 0 else None
+
+    @property
+    def hipparcos(self) -> Optional[int]:
+        return self.catalog.hip[self.row].item() or None
 
     @property
     def ra_deg(self) -> float:
         return (self.ra - 24 if self.ra > 12 else self.ra) * 15
 
-    def __hash__(self):
-        return f"{self.hipparcos}{self.ra}{self.dec}"
+    def __eq__(self, other) -> bool:
+        return (
+            isinstance(other, Star)
+            and self.catalog is other.catalog
+            and self.row == other.row
+        )
+
+    def __hash__(self) -> int:
+        return hash((id(self.catalog), self.row))
+
+    def __repr__(self) -> str:
+        return f"<Star {self}>"
 
     def __str__(self):
         return self.proper or f"hip{self.hipparcos}"
@@ -192,7 +312,7 @@ class Constellation:
         for line in constellation["lines"]:
             if line[0] == "thin":
                 thin = True
-                line.pop(0)
+                line = line[1:]
             else:
                 thin = False
             self.lines.append(
@@ -220,12 +340,7 @@ class Constellation:
         return filter(lambda star: star.proper, self)
 
     def __iter__(self) -> Iterable[Star]:
-        for star in self.__parent_client.stars:
-            if (
-                star.constellation
-                and star.constellation.lower() == self.iau.lower()
-            ):
-                yield star
+        return iter(self.__parent_client.stars.in_constellation(self.iau))
 
     @cached_property
     def bounds(self) -> Tuple[Tuple[float, float], Tuple[float, float]]:
@@ -0,0 +1,179 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+import re
+import unicodedata
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+_NOT_WORD = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(name: str) -> str:
+    # case, accents and punctuation don't count: "alpha  cen." finds
+    # "Alpha Cen" and "nunki" finds "Nūnki"
+    name = unicodedata.normalize("NFKD", name.casefold())
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    return _NOT_WORD.sub(" ", name).strip()
+
+
+def trigrams(name: str) -> List[str]:
+    padded = f"  {name} "
+    return [padded[i : i + 3] for i in range(len(padded) - 2)]
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    name: str
+    kind: str
+    item: Any
+    score: float
+
+
+class SearchIndex:
+    """
+    Names of stars, constellations and deep sky objects, looked up by exact
+    name, by the start of any word in the name, or by trigram similarity when
+    the query has a typo in it.
+
+    Everything is built once by ``add`` and ``build``; a query is a dict
+    lookup, a bisect into the sorted word starts and, for typos, one numpy
+    pass over the trigram postings, so it's cheap enough to run on every
+    keystroke of an autocomplete.
+    """
+
+    # trigram similarity a match needs to be returned at all
+    min_similarity = 0.3
+
+    def __init__(self):
+        self._entries: List[Tuple[str, str, Any, str]] = []
+        self._exact: Dict[Tuple[str, Optional[str]], int] = {}
+        self._trigrams: Dict[str, List[int]] = {}
+        self._trigram_counts: List[int] = []
+        self._postings: Dict[str, np.ndarray] = {}
+        self._gram_counts = np.zeros(0, np.float32)
+        # (word onwards, entry) for every word start in every name
+        self._prefixes: List[Tuple[str, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, name: str, kind: str, item: Any):
+        key = normalize(name)
+        if not key:
+            return
+        i = len(self._entries)
+        self._entries.append((name, kind, item, key))
+        # first one in wins, same as the scans this replaced
+        self._exact.setdefault((key, kind), i)
+        self._exact.setdefault((key, None), i)
+        grams = set(trigrams(key))
+        self._trigram_counts.append(len(grams))
+        for gram in grams:
+            self._trigrams.setdefault(gram, []).append(i)
+        for match in re.finditer(r"\b\w", key):
+            self._prefixes.append((key[match.start() :], i))
+
+    def build(self):
+        self._prefixes.sort()
+        # posting lists as arrays so a query can count shared trigrams for
+        # every name at once
+        self._postings = {
+            gram: np.array(entries, np.int32)
+            for gram, entries in self._trigrams.items()
+        }
+        self._gram_counts = np.array(self._trigram_counts, np.float32)
+
+    def exact(self, name: str, kind: Optional[str] = None) -> Optional[Any]:
+        i = self._exact.get((normalize(name), kind))
+        return self._entries[i][2] if i is not None else None
+
+    def _hit(self, i: int, score: float) -> SearchHit:
+        name, kind, item, _ = self._entries[i]
+        return SearchHit(name, kind, item, score)
+
+    def _similar(self, key: str) -> List[Tuple[int, float]]:
+        # jaccard similarity of the trigram sets, for every name sharing at
+        # least one trigram with the key
+        grams = set(trigrams(key))
+        postings = [self._postings[g] for g in grams if g in self._postings]
+        if not postings:
+            return []
+        shared = np.bincount(
+            np.concatenate(postings), minlength=len(self._entries)
+        )
+        similarity = shared / (len(grams) + self._gram_counts - shared)
+        close = np.flatnonzero(similarity >= self.min_similarity)
+        return list(zip(close.tolist(), similarity[close].tolist()))
+
+    def search(
+        self, query: str, limit: int = 10, kind: Optional[str] = None
+    ) -> List[SearchHit]:
+        """
+        Best matches for ``query``, best first: the exact name, then names
+        with a word starting with the query (shorter names first), then if
+        there was no exact match, similar names.
+        """
+        key = normalize(query)
+        if not key or limit <= 0:
+            return []
+        scores: Dict[int, float] = {}
+        exact = self._exact.get((key, kind))
+        if exact is not None:
+            scores[exact] = 3.0
+        for j in range(
+            bisect_left(self._prefixes, (key,)), len(self._prefixes)
+        ):
+            tail, i = self._prefixes[j]
+            if not tail.startswith(key) or len(scores) >= limit * 2:
+                break
+            if kind is None or self._entries[i][1] == kind:
+                name_key = self._entries[i][3]
+                score = 2.0 + len(key) / len(name_key)
+                if score > scores.get(i, 0):
+                    scores[i] = score
+        if exact is None and len(scores) < limit and len(key) >= 3:
+            for i, similarity in self._similar(key):
+                if i not in scores and (
+                    kind is None or self._entries[i][1] == kind
+                ):
+                    scores[i] = similarity
+        hits = []
+        seen = set()
+        for i, score in sorted(
+            scores.items(), key=lambda hit: (-hit[1], self._entries[hit[0]][0])
+        ):
+            # an object only shows up once, under its best matching name
+            item = id(self._entries[i][2])
+            if item not in seen:
+                seen.add(item)
+                hits.append(self._hit(i, score))
+                if len(hits) == limit:
+                    break
+        return hits
+
+    def complete(
+        self, query: str, limit: int = 25, kind: Optional[str] = None
+    ) -> List[str]:
+        # discord takes at most 25 autocomplete choices
+        names = []
+        for hit in self.search(query, limit, kind):
+            if hit.name not in names:
+                names.append(hit.name)
+        return names
@@ -0,0 +1,206 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+import math
+from typing import Generic, List, Optional, Sequence, Tuple, TypeVar
+
+import numpy as np
+
+T = TypeVar("T")
+
+# whole sky in square degrees
+_SKY_AREA = 4 * math.pi * (180 / math.pi) ** 2
+
+
+def unit_vectors(ra: np.ndarray, dec: np.ndarray) -> np.ndarray:
+    ra, dec = np.radians(ra), np.radians(dec)
+    cos_dec = np.cos(dec)
+    return np.stack(
+        [cos_dec * np.cos(ra), cos_dec * np.sin(ra), np.sin(dec)], axis=-1
+    )
+
+
+class SkyIndex(Generic[T]):
+    """
+    Objects on the sky bucketed into a grid of roughly equal area cells:
+    declination bands ``cell`` degrees tall, each cut into as many right
+    ascension cells as fit around it, so cells don't get any smaller near
+    the poles. Queries only look at the cells they overlap, then test those
+    objects exactly against their unit vectors.
+
+    Everything is in degrees, right ascension included.
+    """
+
+    def __init__(
+        self,
+        ra: Sequence[float],
+        dec: Sequence[float],
+        items: Sequence[T],
+        cell: float = 1.0,
+    ):
+        ra = np.mod(np.asarray(ra, np.float64), 360)
+        dec = np.clip(np.asarray(dec, np.float64), -90, 90)
+        self.cell = cell
+        self._bands = math.ceil(180 / cell)
+        centers = -90 + (np.arange(self._bands) + 0.5) * cell
+        self._band_cells = np.maximum(
+            1, np.floor(360 * np.cos(np.radians(centers)) / cell)
+        ).astype(np.int64)
+        self._band_start = np.concatenate([[0], np.cumsum(self._band_cells)])
+        cells = self._cell_of(ra, dec)
+        order = np.argsort(cells, kind="stable")
+        # items are only looked up for results, so a catalog handing out
+        # row views doesn't have to make one for every object up front
+        self.items = items
+        self._order = order
+        self.ra = ra[order]
+        self.dec = dec[order]
+        self._vectors = unit_vectors(self.ra, self.dec)
+        # objects in cell c are [_starts[c], _starts[c + 1])
+        self._starts = np.searchsorted(
+            cells[order], np.arange(self._band_start[-1] + 1)
+        )
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _band(self, dec: np.ndarray) -> np.ndarray:
+        return np.minimum(
+            ((dec + 90) // self.cell).astype(np.int64), self._bands - 1
+        )
+
+    def _cell_of(self, ra: np.ndarray, dec: np.ndarray) -> np.ndarray:
+        band = self._band(dec)
+        width = 360 / self._band_cells[band]
+        return self._band_start[band] + np.minimum(
+            (ra // width).astype(np.int64), self._band_cells[band] - 1
+        )
+
+    def _candidates(
+        self,
+        ra: Optional[Tuple[float, float]],
+        dec_min: float,
+        dec_max: float,
+    ) -> np.ndarray:
+        # rows of every cell overlapping the region. ra runs east from
+        # ra[0] to ra[1], wrapping through 0h if ra[0] > ra[1]; None is
+        # every right ascension
+        slices = []
+        for band in range(
+            int(self._band(np.float64(dec_min))),
+            int(self._band(np.float64(dec_max))) + 1,
+        ):
+            count = int(self._band_cells[band])
+            offset = int(self._band_start[band])
+            if ra is None:
+                ranges = [(0, count - 1)]
+            else:
+                width = 360 / count
+                first = min(int(ra[0] // width), count - 1)
+                last = min(int(ra[1] // width), count - 1)
+                if ra[0] <= ra[1]:
+                    ranges = [(first, last)]
+                elif first <= last:
+                    # both ends land in one cell (or wrap past each other
+                    # in a narrow polar band), so the wrap covers them all
+                    ranges = [(0, count - 1)]
+                else:
+                    ranges = [(first, count - 1), (0, last)]
+            for first, last in ranges:
+                lo = self._starts[offset + first]
+                hi = self._starts[offset + last + 1]
+                if lo < hi:
+                    slices.append(np.arange(lo, hi))
+        if not slices:
+            return np.zeros(0, np.int64)
+        return np.concatenate(slices)
+
+    def box(
+        self, ra: Tuple[float, float], dec: Tuple[float, float]
+    ) -> List[T]:
+        """
+        Everything with ``dec[0] <= dec <= dec[1]`` and right ascension from
+        ``ra[0]`` east to ``ra[1]``; ``ra[0] > ra[1]`` crosses 0h, so
+        ``(350, 10)`` is a 20 degree wide box.
+        """
+        dec_min, dec_max = max(min(dec), -90), min(max(dec), 90)
+        span = None
+        if abs(ra[1] - ra[0]) < 360:
+            span = (ra[0] % 360, ra[1] % 360)
+        rows = self._candidates(span, dec_min, dec_max)
+        r, d = self.ra[rows], self.dec[rows]
+        inside = (d >= dec_min) & (d <= dec_max)
+        if span is not None and span[0] <= span[1]:
+            inside &= (r >= span[0]) & (r <= span[1])
+        elif span is not None:
+            inside &= (r >= span[0]) | (r <= span[1])
+        return [self.items[i] for i in self._order[rows[inside]].tolist()]
+
+    def _cone_rows(
+        self, ra: float, dec: float, radius: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        # rows within radius and their separations, unsorted
+        radius = min(radius, 180.0)
+        dec_min, dec_max = dec - radius, dec + radius
+        span = None
+        # round a pole every right ascension is in play
+        if dec_min > -90 and dec_max < 90:
+            ratio = math.sin(math.radians(radius)) / math.cos(
+                math.radians(max(abs(dec_min), abs(dec_max)))
+            )
+            if ratio < 1:
+                half = math.degrees(math.asin(ratio))
+                span = ((ra - half) % 360, (ra + half) % 360)
+        rows = self._candidates(span, max(dec_min, -90), min(dec_max, 90))
+        center = unit_vectors(np.float64(ra), np.float64(dec))
+        cos_sep = self._vectors[rows] @ center
+        inside = cos_sep >= math.cos(math.radians(radius))
+        rows = rows[inside]
+        separation = np.degrees(np.arccos(np.clip(cos_sep[inside], -1, 1)))
+        return rows, separation
+
+    def _with_separation(
+        self, rows: np.ndarray, separation: np.ndarray
+    ) -> List[Tuple[T, float]]:
+        return [
+            (self.items[i], sep)
+            for i, sep in zip(self._order[rows].tolist(), separation.tolist())
+        ]
+
+    def cone(
+        self, ra: float, dec: float, radius: float
+    ) -> List[Tuple[T, float]]:
+        # everything within radius degrees, closest first, with separations
+        rows, separation = self._cone_rows(ra, dec, radius)
+        order = np.argsort(separation, kind="stable")
+        return self._with_separation(rows[order], separation[order])
+
+    def nearest(self, ra: float, dec: float, k: int) -> List[Tuple[T, float]]:
+        # the k closest, growing a cone until it holds at least k of them
+        k = min(k, len(self.items))
+        if k <= 0:
+            return []
+        radius = min(
+            180.0,
+            2 * math.sqrt(k * _SKY_AREA / len(self.items) / math.pi),
+        )
+        while True:
+            rows, separation = self._cone_rows(ra, dec, radius)
+            if len(rows) >= k or radius >= 180:
+                break
+            radius = min(180.0, radius * 2)
+        order = np.argsort(separation, kind="stable")[:k]
+        return self._with_separation(rows[order], separation[order])
@@ -0,0 +1,266 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from libs.astro_data.catalog import DsoCatalog, StarCatalog
+
+_logger = logging.getLogger(__name__)
+
+# bump when the files written below change, older snapshots get rebuilt
+SNAPSHOT_VERSION = 1
+# what each source is called in the manifest -> file in the data directory
+SOURCES = {
+    "dsos": "catalog.txt",
+    "open_ngc": "NGC.csv",
+    "stars": "HYG.csv",
+    "constellations": "constellations.json",
+}
+_STAR_COLUMNS = ("ra", "dec", "mag", "hip", "constellation")
+
+
+class Catalogs(NamedTuple):
+    dsos: DsoCatalog
+    stars: StarCatalog
+    constellations: List[dict]
+
+
+def _paths(data_dir: str) -> Dict[str, str]:
+    return {
+        name: os.path.join(data_dir, file) for name, file in SOURCES.items()
+    }
+
+
+def _digest(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _sources(data_dir: str) -> Dict[str, dict]:
+    sources = {}
+    for name, path in _paths(data_dir).items():
+        stat = os.stat(path)
+        sources[name] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "blake2b": _digest(path),
+        }
+    return sources
+
+
+def _fresh(recorded: dict, path: str, verify: bool) -> bool:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return False
+    if stat.st_size != recorded["size"]:
+        return False
+    # an untouched file isn't hashed again unless asked to, one with a new
+    # mtime (a fresh checkout, a copy) is
+    if stat.st_mtime_ns == recorded["mtime_ns"] and not verify:
+        return True
+    return _digest(path) == recorded["blake2b"]
+
+
+def parse(data_dir: str) -> Catalogs:
+    """Read the catalogs from the text sources in ``data_dir``."""
+    paths = _paths(data_dir)
+    with open(paths["dsos"]) as fp:
+        dsos = DsoCatalog.read(fp)
+    with open(paths["open_ngc"]) as fp:
+        dsos.read_open_ngc(fp)
+    with open(paths["stars"]) as fp:
+        stars = StarCatalog.read_hyg(fp)
+    with open(paths["constellations"]) as fp:
+        constellations = json.load(fp)["constellations"]
+    return Catalogs(dsos, stars, constellations)
+
+
+def save(catalogs: Catalogs, sources: Dict[str, dict], snapshot_dir: str):
+    """
+    Write ``catalogs`` to ``snapshot_dir``: a .npy file per array, the
+    strings in text.json, and manifest.json with the checksums of the
+    sources they were read from.
+    """
+    snapshot_dir = os.path.abspath(snapshot_dir)
+    parent = os.path.dirname(snapshot_dir)
+    os.makedirs(parent, exist_ok=True)
+    # built next to the old snapshot and swapped in, so a bot starting up
+    # meanwhile sees either the old one, the new one or none at all
+    tmp = tempfile.mkdtemp(dir=parent, prefix=".snapshot-")
+    try:
+        dsos, stars, constellations = catalogs
+        np.save(os.path.join(tmp, "dsos.npy"), dsos.table)
+        for name in _STAR_COLUMNS:
+            np.save(
+                os.path.join(tmp, f"stars-{name}.npy"), getattr(stars, name)
+            )
+        with open(os.path.join(tmp, "text.json"), "w") as fp:
+            json.dump(
+                {
+                    "dso_types": dsos.types,
+                    "dso_morph_types": dsos.morph_types,
+                    "dso_notes": [
+                        [row, *notes] for row, notes in dsos.notes.items()
+                    ],
+                    "star_constellations": stars.constellations,
+                    "star_names": list(stars.proper.items()),
+                    "constellations": constellations,
+                },
+                fp,
+            )
+        with open(os.path.join(tmp, "manifest.json"), "w") as fp:
+            json.dump(
+                {"version": SNAPSHOT_VERSION, "sources": sources},
+                fp,
+                indent=2,
+            )
+        old = None
+        if os.path.exists(snapshot_dir):
+            old = tempfile.mkdtemp(dir=parent, prefix=".snapshot-old-")
+            os.replace(snapshot_dir, os.path.join(old, "snapshot"))
+        os.replace(tmp, snapshot_dir)
+        if old:
+            shutil.rmtree(old, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+def _read(snapshot_dir: str) -> Catalogs:
+    def array(name: str) -> np.ndarray:
+        # mapped, pages are only read in as rows are used
+        return np.load(os.path.join(snapshot_dir, name), mmap_mode="r")
+
+    with open(os.path.join(snapshot_dir, "text.json")) as fp:
+        text = json.load(fp)
+    dsos = DsoCatalog(
+        array("dsos.npy"), text["dso_types"], text["dso_morph_types"]
+    )
+    dsos.notes = {row: tuple(notes) for row, *notes in text["dso_notes"]}
+    stars = StarCatalog(
+        *(array(f"stars-{name}.npy") for name in _STAR_COLUMNS),
+        text["star_constellations"],
+        {row: name for row, name in text["star_names"]},
+    )
+    return Catalogs(dsos, stars, text["constellations"])
+
+
+def load(
+    data_dir: str, snapshot_dir: str, verify: bool = False
+) -> Optional[Catalogs]:
+    """
+    The catalogs in ``snapshot_dir``, or None if there's no snapshot or any
+    of the sources in ``data_dir`` changed since it was built. ``verify``
+    checksums every source, not only the ones whose mtime moved.
+    """
+    try:
+        with open(os.path.join(snapshot_dir, "manifest.json")) as fp:
+            manifest = json.load(fp)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        _logger.warning("unreadable astro snapshot %s: %s", snapshot_dir, e)
+        return None
+    if manifest.get("version") != SNAPSHOT_VERSION:
+        _logger.info("astro snapshot %s is out of date", snapshot_dir)
+        return None
+    recorded = manifest.get("sources", {})
+    stale = [
+        SOURCES[name]
+        for name, path in _paths(data_dir).items()
+        if name not in recorded or not _fresh(recorded[name], path, verify)
+    ]
+    if stale:
+        _logger.info(
+            "astro snapshot %s is stale, %s changed",
+            snapshot_dir,
+            ", ".join(stale),
+        )
+        return None
+    try:
+        return _read(snapshot_dir)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        _logger.warning("unreadable astro snapshot %s: %s", snapshot_dir, e)
+        return None
+
+
+def build(data_dir: str, snapshot_dir: str) -> Catalogs:
+    """Parse the sources in ``data_dir`` and snapshot them."""
+    # checksummed before parsing, if a source changes halfway through the
+    # next load sees it and rebuilds
+    sources = _sources(data_dir)
+    catalogs = parse(data_dir)
+    save(catalogs, sources, snapshot_dir)
+    return catalogs
+
+
+def load_catalogs(data_dir: str, snapshot_dir: str) -> Catalogs:
+    """
+    The snapshot if it's current, otherwise the catalogs parsed from the
+    text sources, writing a new snapshot for next time if it can.
+    """
+    start = time.perf_counter()
+    catalogs = load(data_dir, snapshot_dir)
+    if catalogs is not None:
+        _logger.info(
+            "loaded astro snapshot in %.1f ms",
+            (time.perf_counter() - start) * 1000,
+        )
+        return catalogs
+    sources = _sources(data_dir)
+    catalogs = parse(data_dir)
+    try:
+        save(catalogs, sources, snapshot_dir)
+    except OSError:
+        _logger.warning(
+            "couldn't write astro snapshot %s", snapshot_dir, exc_info=True
+        )
+    _logger.info(
+        "parsed astro catalogs in %.1f ms",
+        (time.perf_counter() - start) * 1000,
+    )
+    return catalogs
+
+
+if __name__ == "__main__":
+    # python -m libs.astro_data.snapshot [data dir] [snapshot dir]
+    data = sys.argv[1] if len(sys.argv) > 1 else "data"
+    target = (
+        sys.argv[2]
+        if len(sys.argv) > 2
+        else os.getenv("ASTRO_SNAPSHOT", "data/snapshot")
+    )
+    start = time.perf_counter()
+    built = build(data, target)
+    print(
+        f"{len(built.dsos)} dsos, {len(built.stars)} stars,"
+        f" {len(built.constellations)} constellations written to {target}"
+        f" in {time.perf_counter() - start:.1f} s"
+    )
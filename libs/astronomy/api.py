@@ -15,17 +15,22 @@ COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER I
 OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
 from datetime import datetime
-from typing import Iterable
+from typing import TYPE_CHECKING, Iterable
 
 import pytz
-from skyfield import api, almanac
-from skyfield.timelib import Time
 
 from .models import SeasonTimes, MoonPhase
 
+if TYPE_CHECKING:
+    from skyfield.timelib import Time
+
 
 class AstronomyEventAPI:
     def __init__(self):
+        # skyfield (and numpy, jplephem, ...) is imported here and not at
+        # the top so importing this module doesn't pay for it
+        from skyfield import api
+
         self.eph = api.load_file("de440.bsp")
         self.timescale = api.load.timescale()
 
@@ -33,7 +38,9 @@ class AstronomyEventAPI:
     year_range = 1550, 2650
 
     def seasons(self, year: int) -> SeasonTimes:
-        t: Iterable[Time]
+        from skyfield import almanac
+
+        t: Iterable["Time"]
         t, _ = almanac.find_discrete(
             self.timescale.utc(year, 1, 1),
             self.timescale.utc(year, 12, 31),
@@ -43,6 +50,8 @@ class AstronomyEventAPI:
         return SeasonTimes(*(time.astimezone(pytz.utc) for time in t))
 
     def moon_phase(self, year: int, month: int, day: int) -> MoonPhase:
+        from skyfield import almanac
+
         return MoonPhase(
             almanac.moon_phase(
                 self.eph, self.timescale.utc(year, month, day)
@@ -0,0 +1,636 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+import asyncio
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+from ast import literal_eval
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, replace
+from datetime import timedelta
+from functools import partial
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+import aiohttp
+
+from libs.disk_cache import DiskCache
+from libs.negative_cache import NegativeCache, ScopedNegativeCache
+from libs.singleflight import SingleFlight
+from libs.sqlite_store import SQLiteStore
+
+_logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_MB = 1024 * 1024
+
+# every persisted entry starts with this and the time it was stored, so an
+# entry from an older format (or anything else that ended up in the cache
+# directory) is told apart and dropped instead of decoded
+_MAGIC = b"alm1"
+_HEADER = struct.Struct("!4sd")
+# a stored entry as the persistent tier hands it over
+_Buffer = Union[bytes, mmap.mmap]
+
+# failures that mean upstream is having a bad time rather than telling us no,
+# these are the ones it's worth serving an old value over
+UPSTREAM_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError)
+
+
+@dataclass(frozen=True)
+class NamespaceConfig:
+    # soft ttl, past this an entry is refreshed
+    ttl: timedelta
+    memory_bytes: int
+    # 0 turns the persistent tier off
+    disk_bytes: int
+    # "disk" for a DiskCache directory, "sqlite" for a single SQLiteStore file
+    backend: str = "disk"
+    # how many of the newest persisted entries to load into memory at startup
+    preload: int = 0
+    # until the hard ttl a stale entry is served right away and refreshed in
+    # the background, None means entries just expire at the soft ttl
+    hard_ttl: Optional[timedelta] = None
+    # how long past the hard ttl an entry is kept to fall back on when
+    # upstream errors out
+    grace: timedelta = timedelta(0)
+
+    @property
+    def retention(self) -> timedelta:
+        return (self.hard_ttl or self.ttl) + self.grace
+
+
+DEFAULT_NAMESPACES: Dict[str, NamespaceConfig] = {
+    "owm-conditions": NamespaceConfig(
+        timedelta(minutes=10),
+        8 * _MB,
+        32 * _MB,
+        hard_ttl=timedelta(minutes=30),
+        grace=timedelta(hours=2),
+    ),
+    "owm-pollution": NamespaceConfig(
+        timedelta(minutes=15),
+        4 * _MB,
+        16 * _MB,
+        hard_ttl=timedelta(hours=1),
+        grace=timedelta(hours=3),
+    ),
+    "owm-forecast": NamespaceConfig(
+        timedelta(minutes=15),
+        16 * _MB,
+        64 * _MB,
+        hard_ttl=timedelta(hours=1),
+        grace=timedelta(hours=6),
+    ),
+    "owm-tiles": NamespaceConfig(timedelta(minutes=15), 0, 256 * _MB),
+    "geocode": NamespaceConfig(timedelta(hours=12), 16 * _MB, 128 * _MB),
+    "geocode-places": NamespaceConfig(
+        timedelta(days=30),
+        32 * _MB,
+        256 * _MB,
+        backend="sqlite",
+        preload=100_000,
+    ),
+    "nws-points": NamespaceConfig(
+        timedelta(hours=12),
+        4 * _MB,
+        32 * _MB,
+        hard_ttl=timedelta(days=7),
+        grace=timedelta(days=30),
+    ),
+    "apod": NamespaceConfig(timedelta(hours=12), 4 * _MB, 16 * _MB),
+    "maptiler-tiles": NamespaceConfig(timedelta(days=7), 0, 1024 * _MB),
+    # finished map pngs, no longer lived than the radar tiles they're made of
+    "weather-maps": NamespaceConfig(
+        timedelta(minutes=15), 32 * _MB, 256 * _MB
+    ),
+}
+
+
+@dataclass
+class CacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    coalesced: int = 0
+    # soft-expired entries served while a refresh ran in the background
+    stale_hits: int = 0
+    # hard-expired entries served because upstream failed
+    stale_fallbacks: int = 0
+    # upstream calls skipped because the lookup is known to fail
+    negative_hits: int = 0
+    memory_bytes: int = 0
+    memory_entries: int = 0
+    disk_bytes: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        hits = self.memory_hits + self.disk_hits
+        return hits / (hits + self.misses) if hits + self.misses else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.hit_rate:.0%} hit rate ({self.memory_hits} memory, "
+            f"{self.disk_hits} disk, {self.misses} misses), "
+            f"{self.negative_hits} negative hits, "
+            f"{self.memory_bytes / _MB:.1f}/{self.disk_bytes / _MB:.1f} MB"
+        )
+
+
+@dataclass
+class _Entry:
+    value: Any
+    size: int
+    stored_at: float = field(default_factory=time.time)
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+
+class Staleness:
+    """
+    Collects how old the stale values served for one request were. Tasks
+    spawned by the request copy the context, so they share the collector.
+    """
+
+    def __init__(self):
+        self.age: Optional[float] = None
+
+    def note(self, age: float):
+        self.age = max(self.age or 0.0, age)
+
+    def __bool__(self) -> bool:
+        return self.age is not None
+
+
+_staleness: ContextVar[Optional[Staleness]] = ContextVar(
+    "staleness", default=None
+)
+
+
+@contextmanager
+def track_staleness() -> Iterator[Staleness]:
+    stale = Staleness()
+    token = _staleness.set(stale)
+    try:
+        yield stale
+    finally:
+        _staleness.reset(token)
+
+
+class CacheNamespace:
+    """
+    One named cache with an in-memory LRU in front of a persistent tier
+    (a DiskCache directory or a SQLiteStore file).
+
+    Regular namespaces store their values in the persistent tier as json:
+    ``model`` is a dataclass_json class, or for plain values (lists, dicts,
+    numbers) a callable the decoded json is passed through, ``tuple`` for
+    one. Raw namespaces hold ``bytes`` (map tiles) and store them as-is.
+    Entries that don't decode are treated as misses and deleted.
+
+    Namespaces with a ``hard_ttl`` serve stale-while-revalidate through
+    ``get_or_fetch``, and ``fetch`` falls back to a stale entry inside the
+    grace window when upstream fails, noting it in the current
+    ``track_staleness`` collector.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        config: NamespaceConfig,
+        base_path: str,
+        raw: bool = False,
+        negative: Optional[NegativeCache] = None,
+        model: Optional[Callable[[Any], Any]] = None,
+    ):
+        self.name = name
+        self.config = config
+        self.raw = raw
+        self.model = model
+        # failures worth remembering are registered per namespace, on
+        # ``negative.register``
+        self.negative: Optional[ScopedNegativeCache] = (
+            negative.scoped(name) if negative is not None else None
+        )
+        self._memory: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._memory_bytes = 0
+        self._stats = CacheStats()
+        self._inflight = SingleFlight()
+        self._pending: Set[asyncio.Future] = set()
+        self._refreshing: Set[asyncio.Future] = set()
+        self.disk: Optional[Union[DiskCache, SQLiteStore]] = None
+        if config.disk_bytes and config.backend == "sqlite":
+            self.disk = SQLiteStore(
+                os.path.join(base_path, f"{name}.sqlite3"),
+                config.retention,
+                max_bytes=config.disk_bytes,
+            )
+        elif config.disk_bytes:
+            self.disk = DiskCache(
+                os.path.join(base_path, name),
+                config.retention,
+                max_bytes=config.disk_bytes,
+            )
+        self._warming: Optional[asyncio.Future] = None
+
+    async def warmup(self):
+        """
+        Opens the persistent tier (indexing a DiskCache directory) and loads
+        the ``preload`` newest entries into memory, on the executor. Runs
+        once, on the first lookup or when the manager is warmed up after
+        startup, whichever comes first.
+        """
+        if self._warming is None:
+            self._warming = asyncio.ensure_future(self._warmup())
+        await asyncio.shield(self._warming)
+
+    async def _warmup(self):
+        if self.disk is None:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self.disk.open)
+            if not self.config.preload or not isinstance(
+                self.disk, SQLiteStore
+            ):
+                return
+            entries = await loop.run_in_executor(
+                None, self._preload, self.config.preload
+            )
+        except Exception:
+            # the disk tier raises again where it's used
+            _logger.exception("warming up %s failed", self.name)
+            return
+        # oldest first so the newest entries end up at the hot end of the
+        # lru, and nothing put since startup gets replaced by an older copy
+        for key, entry in reversed(entries):
+            if key not in self._memory:
+                self._memory_put(key, entry)
+        _logger.info("preloaded %s entries into %s", len(entries), self.name)
+
+    def _preload(self, limit: int) -> List[Tuple[Hashable, _Entry]]:
+        # runs on the executor, newest first
+        entries = []
+        for path, blob in self.disk.recent(limit):
+            entry = self._decode_or_drop(path, blob)
+            if entry is not None:
+                entries.append((literal_eval(path), entry))
+        return entries
+
+    def _encode(self, value: Any, stored_at: float) -> bytes:
+        if self.raw:
+            payload = value
+        elif hasattr(value, "to_json"):
+            payload = value.to_json().encode()
+        else:
+            payload = json.dumps(value).encode()
+        return _HEADER.pack(_MAGIC, stored_at) + payload
+
+    def _decode(self, blob: _Buffer) -> _Entry:
+        # blob can be a DiskCache mmap, so the payload is read through a
+        # view and copied out once. the views are released before the map
+        # is closed
+        with memoryview(blob) as view, view[_HEADER.size :] as payload:
+            magic, stored_at = _HEADER.unpack_from(view)
+            if magic != _MAGIC:
+                raise ValueError("not a cache entry")
+            if self.raw:
+                value = payload.tobytes()
+            elif hasattr(self.model, "from_json"):
+                value = self.model.from_json(payload.tobytes())
+            else:
+                value = json.loads(payload.tobytes())
+                if self.model is not None:
+                    value = self.model(value)
+            return _Entry(value, len(view), stored_at)
+
+    def _decode_or_drop(self, path: str, blob: _Buffer) -> Optional[_Entry]:
+        # anything that doesn't decode (an old format, a renamed model, a
+        # file that isn't ours) is a miss, and is deleted so it isn't read
+        # again
+        try:
+            return self._decode(blob)
+        except Exception as e:
+            _logger.info(
+                "dropping undecodable entry from %s: %r", self.name, e
+            )
+            self.disk.delete(path)
+            return None
+
+    @staticmethod
+    def _path(key: Hashable) -> str:
+        return repr(key)
+
+    def _expired(self, stored_at: float) -> bool:
+        return stored_at + self.config.retention.total_seconds() < time.time()
+
+    def _fresh(self, entry: _Entry) -> bool:
+        return entry.age < self.config.ttl.total_seconds()
+
+    def _revalidating(self, entry: _Entry) -> bool:
+        hard_ttl = self.config.hard_ttl
+        return hard_ttl is not None and entry.age < hard_ttl.total_seconds()
+
+    def _memory_get(self, key: Hashable) -> Optional[_Entry]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        if self._expired(entry.stored_at):
+            self._memory_drop(key)
+            return None
+        self._memory.move_to_end(key)
+        return entry
+
+    def _memory_drop(self, key: Hashable):
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= entry.size
+
+    def _memory_put(self, key: Hashable, entry: _Entry):
+        if entry.size > self.config.memory_bytes:
+            return
+        self._memory_drop(key)
+        self._memory[key] = entry
+        self._memory_bytes += entry.size
+        while self._memory_bytes > self.config.memory_bytes:
+            self._memory_drop(next(iter(self._memory)))
+            self._stats.evictions += 1
+
+    async def _lookup(self, key: Hashable) -> Optional[_Entry]:
+        # anything still inside the retention window, fresh or not
+        entry = self._memory_get(key)
+        if entry is not None or self.disk is None:
+            return entry
+        await self.warmup()
+        entry = self._memory_get(key)
+        if entry is not None:
+            return entry
+        path = self._path(key)
+        # decoded straight from the stored copy on the executor, without
+        # reading the whole entry into a bytes object first
+        entry = await self.disk.read_async(
+            path, partial(self._decode_or_drop, path)
+        )
+        if entry is None or self._expired(entry.stored_at):
+            return None
+        self._memory_put(key, entry)
+        return entry
+
+    async def contains(self, key: Hashable) -> bool:
+        # whether a lookup would find anything, without loading it or
+        # counting towards the stats
+        entry = self._memory.get(key)
+        if entry is not None and not self._expired(entry.stored_at):
+            return True
+        return self.disk is not None and await self.disk.exists_async(
+            self._path(key)
+        )
+
+    async def get(
+        self,
+        key: Hashable,
+        refresh: Optional[Callable[[], Awaitable[Any]]] = None,
+    ) -> Optional[Any]:
+        """
+        Fresh value for ``key``. Given ``refresh``, an entry between the soft
+        and hard ttl is returned as well and refreshed in the background.
+        """
+        in_memory = key in self._memory
+        entry = await self._lookup(key)
+        if entry is not None and (
+            self._fresh(entry)
+            or refresh is not None
+            and self._revalidating(entry)
+        ):
+            if in_memory:
+                self._stats.memory_hits += 1
+            else:
+                self._stats.disk_hits += 1
+            if not self._fresh(entry):
+                self._stats.stale_hits += 1
+                self._revalidate(key, refresh)
+            return entry.value
+        self._stats.misses += 1
+        return None
+
+    async def put(self, key: Hashable, value: Any):
+        stored_at = time.time()
+        blob = self._encode(value, stored_at)
+        self._memory_put(key, _Entry(value, len(blob), stored_at))
+        if self.disk is not None:
+            # write behind, the caller already has the value
+            task = asyncio.ensure_future(
+                self.disk.put_async(self._path(key), blob)
+            )
+            self._pending.add(task)
+            task.add_done_callback(self._persisted)
+
+    def _persisted(self, task: asyncio.Future):
+        self._pending.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            _logger.warning(
+                "persisting to %s failed", self.name, exc_info=task.exception()
+            )
+
+    async def _fetch(
+        self, key: Hashable, fetch: Callable[[], Awaitable[T]]
+    ) -> T:
+        async def run() -> T:
+            value = await fetch()
+            await self.put(key, value)
+            return value
+
+        return await self._inflight.do((self.name, key), run)
+
+    async def fetch(
+        self, key: Hashable, fetch: Callable[[], Awaitable[T]]
+    ) -> T:
+        # coalesced fetch-and-store that skips the lookup
+        if self.negative is not None:
+            error = self.negative.get(key)
+            if error is not None:
+                raise error.with_traceback(None)
+        try:
+            return await self._fetch(key, fetch)
+        except Exception as e:
+            if self.negative is not None and self.negative.remember(key, e):
+                raise
+            if not isinstance(e, UPSTREAM_ERRORS) or not self.config.grace:
+                raise
+            entry = await self._lookup(key)
+            if entry is None:
+                raise
+            _logger.warning(
+                "upstream failed for %s, serving %ds old value",
+                self.name,
+                entry.age,
+            )
+            self._stats.stale_fallbacks += 1
+            stale = _staleness.get()
+            if stale is not None:
+                stale.note(entry.age)
+            return entry.value
+
+    def _revalidate(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]):
+        if self._inflight.pending((self.name, key)):
+            return
+        task = asyncio.ensure_future(self._fetch(key, fetch))
+        self._refreshing.add(task)
+        task.add_done_callback(self._refreshed)
+
+    def _refreshed(self, task: asyncio.Future):
+        self._refreshing.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            # the stale entry stays put, the next lookup tries again
+            _logger.warning(
+                "refreshing %s failed", self.name, exc_info=task.exception()
+            )
+
+    async def get_or_fetch(
+        self, key: Hashable, fetch: Callable[[], Awaitable[T]]
+    ) -> T:
+        value = await self.get(key, refresh=fetch)
+        if value is not None:
+            return value
+        return await self.fetch(key, fetch)
+
+    @property
+    def stats(self) -> CacheStats:
+        self._stats.coalesced = self._inflight.coalesced[self.name]
+        if self.negative is not None:
+            self._stats.negative_hits = self.negative.saved
+        self._stats.memory_bytes = self._memory_bytes
+        self._stats.memory_entries = len(self._memory)
+        self._stats.disk_bytes = self.disk.total_bytes if self.disk else 0
+        return self._stats
+
+    async def close(self):
+        if self._warming is not None:
+            self._warming.cancel()
+        for task in self._refreshing:
+            task.cancel()
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        if self.disk is not None:
+            self.disk.close()
+
+
+class CacheManager:
+    """
+    Hands out cache namespaces and collects their stats in one place.
+
+    Namespace limits default to DEFAULT_NAMESPACES and can be overridden from
+    the environment, e.g. for ``owm-tiles``: ``CACHE_OWM_TILES_TTL``
+    (seconds), ``CACHE_OWM_TILES_MEMORY_MB`` and ``CACHE_OWM_TILES_DISK_MB``,
+    plus ``_HARD_TTL`` and ``_GRACE`` (seconds) for stale-while-revalidate.
+
+    All namespaces share one negative cache, bounded by
+    ``CACHE_NEGATIVE_ENTRIES``; clients register the failures worth
+    remembering on their namespace's ``negative``.
+    """
+
+    def __init__(
+        self,
+        base_path: Optional[str] = None,
+        namespaces: Optional[Dict[str, NamespaceConfig]] = None,
+    ):
+        self.base_path = base_path or os.getenv("CACHE_DIR", "/tmp/almanac")
+        self._configs = dict(DEFAULT_NAMESPACES)
+        self._configs.update(namespaces or {})
+        self._namespaces: Dict[str, CacheNamespace] = {}
+        self.negative = NegativeCache(
+            int(os.getenv("CACHE_NEGATIVE_ENTRIES", 10_000))
+        )
+
+    def _config_for(self, name: str) -> NamespaceConfig:
+        default = self._configs.get(
+            name, NamespaceConfig(timedelta(minutes=15), 4 * _MB, 0)
+        )
+        prefix = f"CACHE_{name.upper().replace('-', '_')}_"
+        ttl = os.getenv(prefix + "TTL")
+        memory = os.getenv(prefix + "MEMORY_MB")
+        disk = os.getenv(prefix + "DISK_MB")
+        hard_ttl = os.getenv(prefix + "HARD_TTL")
+        grace = os.getenv(prefix + "GRACE")
+        return replace(
+            default,
+            ttl=timedelta(seconds=float(ttl)) if ttl else default.ttl,
+            hard_ttl=timedelta(seconds=float(hard_ttl))
+            if hard_ttl
+            else default.hard_ttl,
+            grace=timedelta(seconds=float(grace)) if grace else default.grace,
+            memory_bytes=int(float(memory) * _MB)
+            if memory
+            else default.memory_bytes,
+            disk_bytes=int(float(disk) * _MB) if disk else default.disk_bytes,
+        )
+
+    def namespace(
+        self,
+        name: str,
+        raw: bool = False,
+        model: Optional[Callable[[Any], Any]] = None,
+    ) -> CacheNamespace:
+        if name not in self._namespaces:
+            self._namespaces[name] = CacheNamespace(
+                name,
+                self._config_for(name),
+                self.base_path,
+                raw=raw,
+                negative=self.negative,
+                model=model,
+            )
+        return self._namespaces[name]
+
+    def stats(self) -> Dict[str, CacheStats]:
+        return {name: ns.stats for name, ns in self._namespaces.items()}
+
+    def summary(self) -> str:
+        return "; ".join(
+            f"{name} {stats.summary()}"
+            for name, stats in sorted(self.stats().items())
+        )
+
+    async def warmup(self):
+        # one namespace at a time, so startup doesn't tie up the executor
+        for ns in list(self._namespaces.values()):
+            await ns.warmup()
+
+    async def close(self):
+        for ns in self._namespaces.values():
+            await ns.close()
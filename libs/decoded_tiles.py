@@ -0,0 +1,106 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+from libs.helpers import tile_array
+
+_MB = 1024 * 1024
+
+
+@dataclass
+class DecodedTileStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    bytes: int = 0
+    entries: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class DecodedTileCache:
+    """
+    Byte-bounded LRU of decoded RGBA tiles, so a tile that came out of the
+    disk cache doesn't get decoded and converted again on every render.
+
+    Entries are keyed on a digest of the encoded bytes rather than the tile
+    coordinates, so a refreshed tile can never be served from an old decode.
+    The arrays handed out are shared and read only.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._tiles: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        # render pool threads share the cache, process workers get their own
+        self._lock = threading.Lock()
+        self._stats = DecodedTileStats()
+
+    def get(self, data: bytes) -> np.ndarray:
+        key = hashlib.blake2b(data, digest_size=16).digest()
+        with self._lock:
+            arr = self._tiles.get(key)
+            if arr is not None:
+                self._tiles.move_to_end(key)
+                self._stats.hits += 1
+                return arr
+            self._stats.misses += 1
+        # decode outside the lock, two threads racing on the same tile just
+        # both decode it
+        arr = tile_array(data)
+        arr.flags.writeable = False
+        self._put(key, arr)
+        return arr
+
+    def _put(self, key: bytes, arr: np.ndarray):
+        if arr.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._tiles.pop(key, None)
+            if old is not None:
+                self._stats.bytes -= old.nbytes
+            self._tiles[key] = arr
+            self._stats.bytes += arr.nbytes
+            while self._stats.bytes > self.max_bytes:
+                _, evicted = self._tiles.popitem(last=False)
+                self._stats.bytes -= evicted.nbytes
+                self._stats.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._tiles.clear()
+            self._stats.bytes = 0
+
+    def stats(self) -> DecodedTileStats:
+        with self._lock:
+            self._stats.entries = len(self._tiles)
+            return DecodedTileStats(**vars(self._stats))
+
+
+# one per process, so with the process render pool every worker keeps its
+# own hot tiles
+decoded_tiles = DecodedTileCache(
+    int(float(os.getenv("DECODED_TILES_MB", 64)) * _MB)
+)
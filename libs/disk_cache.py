@@ -1,34 +1,301 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+import asyncio
+import hashlib
+import logging
+import mmap
 import os
-from datetime import timedelta, datetime
-from typing import Optional
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Optional, List, Tuple, Callable, TypeVar
+
+_logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Entry:
+    size: int
+    mtime: float
 
 
 class DiskCache:
-    def __init__(self, base_path: str, age_limit: Optional[timedelta] = None):
+    """
+    Size-bounded file store.
+
+    Files are sharded by the sha1 of their key (``ab/cd/abcd...``) and
+    tracked in an in-memory LRU index that's rebuilt from the directory the
+    first time it's needed (or by ``open``), so lookups never have to stat
+    the disk. Walking a big cache directory takes a while, so that first use
+    should be on the executor. Expired and over-budget entries are cleaned
+    up by a background sweeper.
+    """
+
+    def __init__(
+        self,
+        base_path: str,
+        age_limit: Optional[timedelta] = None,
+        max_bytes: Optional[int] = None,
+        sweep_interval: timedelta = timedelta(minutes=5),
+    ):
         self.base_path = base_path
         os.makedirs(base_path, exist_ok=True)
         self.age_limit = age_limit
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.total_bytes = 0
+        self._index: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._sweeper: Optional[asyncio.Task] = None
+        self._indexed = False
+        self._index_lock = threading.Lock()
+
+    @staticmethod
+    def _digest(path: str) -> str:
+        return hashlib.sha1(path.encode()).hexdigest()
+
+    def _file(self, digest: str) -> str:
+        return os.path.join(self.base_path, digest[:2], digest[2:4], digest)
+
+    def open(self):
+        # builds the index if nothing has yet, everything else waits on it
+        if self._indexed:
+            return
+        with self._index_lock:
+            if not self._indexed:
+                self._rebuild_index()
+                self._indexed = True
+
+    def _rebuild_index(self):
+        found: List[Tuple[str, _Entry]] = []
+        for root, _, files in os.walk(self.base_path):
+            for name in files:
+                full = os.path.join(root, name)
+                if name.endswith(".tmp"):
+                    # left over from a write that never finished
+                    _remove(full)
+                    continue
+                if len(name) != 40 or full != self._file(name):
+                    continue
+                try:
+                    stat = os.stat(full)
+                except FileNotFoundError:
+                    continue
+                found.append((name, _Entry(stat.st_size, stat.st_mtime)))
+        # oldest first, so the front of the index is the first to go
+        found.sort(key=lambda item: item[1].mtime)
+        with self._lock:
+            self._index = OrderedDict(found)
+            self.total_bytes = sum(entry.size for _, entry in found)
+        _logger.info(
+            "indexed %s entries (%s bytes) in %s",
+            len(found),
+            self.total_bytes,
+            self.base_path,
+        )
+
+    def _expired(self, entry: _Entry, now: float) -> bool:
+        return bool(
+            self.age_limit
+            and entry.mtime + self.age_limit.total_seconds() < now
+        )
+
+    def _drop(self, digest: str) -> Optional[_Entry]:
+        # caller holds the lock
+        entry = self._index.pop(digest, None)
+        if entry is not None:
+            self.total_bytes -= entry.size
+        return entry
 
     def exists(self, path: str) -> bool:
-        return os.path.exists(f"{self.base_path}/{path}")
+        self.open()
+        digest = self._digest(path)
+        with self._lock:
+            entry = self._index.get(digest)
+            return entry is not None and not self._expired(entry, time.time())
 
     def put(self, path: str, buf: bytes):
-        os.makedirs(f"{self.base_path}{os.path.dirname(path)}", exist_ok=True)
-        with open(f"{self.base_path}{path}", "wb") as fp:
-            fp.write(buf)
+        self.open()
+        digest = self._digest(path)
+        target = self._file(digest)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # write to a temp file and rename it into place so a reader never
+        # sees half a tile
+        fd, tmp = tempfile.mkstemp(
+            dir=os.path.dirname(target), prefix=digest, suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                fp.write(buf)
+            os.replace(tmp, target)
+        except BaseException:
+            _remove(tmp)
+            raise
+        with self._lock:
+            self._drop(digest)
+            self._index[digest] = _Entry(len(buf), time.time())
+            self.total_bytes += len(buf)
+        self._ensure_sweeper()
+
+    def _lookup(self, path: str) -> Optional[str]:
+        # returns the file for a live entry, bumping it in the lru
+        self.open()
+        digest = self._digest(path)
+        with self._lock:
+            entry = self._index.get(digest)
+            if entry is None:
+                return None
+            if not self._expired(entry, time.time()):
+                self._index.move_to_end(digest)
+                return self._file(digest)
+            self._drop(digest)
+        _remove(self._file(digest))
+        return None
+
+    def _forget(self, path: str):
+        # the file was removed from under us
+        with self._lock:
+            self._drop(self._digest(path))
+
+    def delete(self, path: str):
+        self.open()
+        digest = self._digest(path)
+        with self._lock:
+            self._drop(digest)
+        _remove(self._file(digest))
 
     def get(self, path: str) -> Optional[bytes]:
-        if not os.path.exists(f"{self.base_path}{path}"):
+        self._ensure_sweeper()
+        file = self._lookup(path)
+        if file is None:
             return None
-        if (
-            self.age_limit
-            and datetime.fromtimestamp(
-                os.path.getmtime(f"{self.base_path}{path}")
-            )
-            + self.age_limit
-            < datetime.now()
-        ):
-            os.remove(f"{self.base_path}{path}")
+        try:
+            with open(file, "rb") as fp:
+                return fp.read()
+        except FileNotFoundError:
+            self._forget(path)
+            return None
+
+    def read(self, path: str, fn: Callable[[mmap.mmap], T]) -> Optional[T]:
+        """
+        Memory-map an entry and hand the map to ``fn``, which can treat it as
+        a file or a buffer without the contents being copied into a bytes
+        object first. The map is closed once ``fn`` returns, so ``fn`` must
+        not hold on to it.
+        """
+        file = self._lookup(path)
+        if file is None:
             return None
-        with open(f"{self.base_path}{path}", "rb") as fp:
-            return fp.read()
+        try:
+            with open(file, "rb") as fp:
+                if os.fstat(fp.fileno()).st_size == 0:
+                    return None
+                with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return fn(mm)
+        except FileNotFoundError:
+            self._forget(path)
+            return None
+
+    # the async versions run on the default executor so disk io never
+    # blocks the event loop
+
+    async def exists_async(self, path: str) -> bool:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.exists, path
+        )
+
+    async def get_async(self, path: str) -> Optional[bytes]:
+        self._ensure_sweeper()
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.get, path
+        )
+
+    async def read_async(
+        self, path: str, fn: Callable[[mmap.mmap], T]
+    ) -> Optional[T]:
+        self._ensure_sweeper()
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.read, path, fn
+        )
+
+    async def put_async(self, path: str, buf: bytes):
+        await asyncio.get_running_loop().run_in_executor(
+            None, self.put, path, buf
+        )
+        self._ensure_sweeper()
+
+    def sweep(self) -> int:
+        self.open()
+        now = time.time()
+        victims = []
+        with self._lock:
+            for digest, entry in list(self._index.items()):
+                if self._expired(entry, now):
+                    self._drop(digest)
+                    victims.append(digest)
+            # index is in lru order, so evict from the front until we fit
+            while (
+                self.max_bytes is not None
+                and self.total_bytes > self.max_bytes
+                and self._index
+            ):
+                digest = next(iter(self._index))
+                self._drop(digest)
+                victims.append(digest)
+        for digest in victims:
+            _remove(self._file(digest))
+        return len(victims)
+
+    def _ensure_sweeper(self):
+        if self._sweeper is not None and not self._sweeper.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._sweeper = loop.create_task(self._sweep_forever())
+
+    async def _sweep_forever(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.sweep_interval.total_seconds())
+            try:
+                removed = await loop.run_in_executor(None, self.sweep)
+            except Exception:
+                _logger.exception("sweeping %s failed", self.base_path)
+                continue
+            if removed:
+                _logger.debug(
+                    "swept %s entries from %s", removed, self.base_path
+                )
+
+    def close(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,138 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from PIL import Image
+
+_logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Encoder:
+    name: str
+    format: str
+    options: Dict[str, Any] = field(default_factory=dict)
+    # quantize to this many colors first
+    colors: Optional[int] = None
+    # only for images without any transparency
+    opaque_only: bool = False
+
+    def encode(self, img: Image.Image) -> bytes:
+        if self.opaque_only:
+            img = img.convert("RGB")
+        if self.colors:
+            img = img.quantize(self.colors, method=Image.FASTOCTREE)
+        buf = BytesIO()
+        img.save(buf, format=self.format, **self.options)
+        return buf.getvalue()
+
+
+ENCODERS: Dict[str, Encoder] = {
+    encoder.name: encoder
+    for encoder in (
+        Encoder("png", "png"),
+        Encoder("png-palette", "png", colors=256),
+        Encoder("png-palette-64", "png", colors=64),
+        Encoder("webp-lossless", "webp", {"lossless": True}),
+        Encoder("webp-90", "webp", {"quality": 90}),
+        Encoder("webp-75", "webp", {"quality": 75}),
+        Encoder("webp-50", "webp", {"quality": 50}),
+        Encoder("jpeg-85", "jpeg", {"quality": 85}, opaque_only=True),
+        Encoder("jpeg-60", "jpeg", {"quality": 60}, opaque_only=True),
+    )
+}
+
+# best looking first, the first one that fits the budget wins
+DEFAULT_ORDER = ("webp-90", "png-palette", "webp-75", "jpeg-85", "webp-50")
+DEFAULT_BUDGET = 1024 * 1024
+
+
+def encoder_order() -> Tuple[str, ...]:
+    # MAP_ENCODERS=webp-90,png-palette,... overrides DEFAULT_ORDER
+    names = os.getenv("MAP_ENCODERS")
+    if not names:
+        return DEFAULT_ORDER
+    order = tuple(n.strip() for n in names.split(",") if n.strip())
+    unknown = set(order) - set(ENCODERS)
+    if unknown:
+        raise ValueError(f"unknown map encoders: {', '.join(unknown)}")
+    return order
+
+
+def byte_budget() -> int:
+    budget = os.getenv("MAP_BUDGET_KB")
+    return int(float(budget) * 1024) if budget else DEFAULT_BUDGET
+
+
+def _opaque(img: Image.Image) -> bool:
+    if img.mode not in ("RGBA", "LA", "PA"):
+        return True
+    return img.getchannel("A").getextrema()[0] == 255
+
+
+def encode_within(
+    img: Image.Image, budget: int, order: Sequence[str] = DEFAULT_ORDER
+) -> bytes:
+    """
+    Encodes with the first encoder in ``order`` whose output fits in
+    ``budget`` bytes, skipping opaque-only ones for images with alpha. If
+    nothing fits, the smallest attempt is returned.
+    """
+    opaque = _opaque(img)
+    smallest: Optional[bytes] = None
+    for name in order:
+        encoder = ENCODERS[name]
+        if encoder.opaque_only and not opaque:
+            continue
+        start = time.perf_counter()
+        data = encoder.encode(img)
+        _logger.debug(
+            "%s: %d bytes in %.1f ms",
+            name,
+            len(data),
+            (time.perf_counter() - start) * 1000,
+        )
+        if len(data) <= budget:
+            return data
+        if smallest is None or len(data) < len(smallest):
+            smallest = data
+    if smallest is None:
+        # only opaque encoders were allowed and the image isn't opaque
+        return ENCODERS["png"].encode(img)
+    return smallest
+
+
+_MAGIC = (
+    (b"\x89PNG", "png"),
+    (b"\xff\xd8", "jpg"),
+    (b"GIF8", "gif"),
+)
+
+
+def extension_for(data: bytes) -> str:
+    # the cache only keeps bytes, so work the format back out from them
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    for magic, ext in _MAGIC:
+        if data.startswith(magic):
+            return ext
+    return "bin"
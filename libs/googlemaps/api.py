@@ -15,32 +15,47 @@ COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER I
 OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
 import json
+from datetime import timedelta
 
-import aiohttp
-from expiringdict import ExpiringDict
 from yarl import URL
 
+from libs.cache import CacheManager
+from libs.googlemaps.errors import GeocodingError
 from libs.googlemaps.models import GeocodeResponse
+from libs.http import HTTPClient
+from libs.openweathermap.errors import CityNotFoundError
 
 
 class GoogleMapsAPI:
-    def __init__(self, token):
+    def __init__(self, token, http: HTTPClient, cache: CacheManager):
         self.token = token
-        self._cache = ExpiringDict(10000, 60 * 60 * 12)  # 12h
+        self.http = http
+        self._cache = cache.namespace("geocode", model=GeocodeResponse)
+        # ZERO_RESULTS, typos get retried
+        self._cache.negative.register(CityNotFoundError, timedelta(minutes=30))
 
     async def geocode(self, location: str) -> GeocodeResponse:
-        res = self._cache.get(location, None)
-        if res is not None:
-            return res
-        async with aiohttp.ClientSession() as sess:
-            async with sess.get(
-                url=URL.build(
-                    host="maps.googleapis.com",
-                    scheme="https",
-                    path="/maps/api/geocode/json",
-                    query={"address": location, "key": self.token},
-                )
-            ) as resp:
-                res = GeocodeResponse.from_json(await resp.read())
-                self._cache[location] = res
-                return res
+        return await self._cache.get_or_fetch(
+            location, lambda: self._fetch_geocode(location)
+        )
+
+    async def _fetch_geocode(self, location: str) -> GeocodeResponse:
+        async with self.http.get(
+            url=URL.build(
+                host="maps.googleapis.com",
+                scheme="https",
+                path="/maps/api/geocode/json",
+                query={"address": location, "key": self.token},
+            )
+        ) as resp:
+            resp.raise_for_status()
+            data = await resp.read()
+        body = json.loads(data)
+        status = body.get("status")
+        if status == "ZERO_RESULTS":
+            raise CityNotFoundError
+        if status != "OK":
+            # over quota, denied, google having trouble. none of these say
+            # anything about the location, so they aren't cached
+            raise GeocodingError(status, body.get("error_message", ""))
+        return GeocodeResponse.from_json(data)
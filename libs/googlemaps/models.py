@@ -23,11 +23,11 @@ from dataclasses_json import dataclass_json
 @dataclass_json
 @dataclass
 class Coordinates:
-    lat: int
-    lng: int
+    lat: float
+    lng: float
 
     @property
-    def lon(self) -> int:
+    def lon(self) -> float:
         return self.lng
 
 
@@ -1,59 +1,265 @@
+import asyncio
 import math
-from typing import Tuple, List
+import threading
+from dataclasses import dataclass
+from io import BytesIO
+from typing import (
+    Tuple,
+    List,
+    Awaitable,
+    Iterable,
+    TypeVar,
+    Optional,
+    Union,
+    BinaryIO,
+    Sequence,
+)
 
+import numpy as np
 from PIL import Image, ImageDraw
 
+T = TypeVar("T")
 
-def get_tiles(
-    lat: float, lon: float, zoom: int
-) -> Tuple[Tuple[int, int, int, int], Tuple[int, int]]:  # noqa e124
-    n = 2.0 ** zoom
-    x = (lon + 180.0) / 360.0 * n
-    y = (
-        (
-            1.0
-            - math.log(
-                math.tan(math.radians(lat)) + (1 / math.cos(math.radians(lat)))
-            )
-            / math.pi
-        )
-        / 2.0
-        * n
+# how many tile fetches a single render is allowed to have in flight
+TILE_CONCURRENCY = 8
+
+
+async def gather_bounded(
+    aws: Iterable[Awaitable[T]], limit: int = TILE_CONCURRENCY
+) -> List[T]:
+    sem = asyncio.Semaphore(limit)
+
+    async def run(aw: Awaitable[T]) -> T:
+        async with sem:
+            return await aw
+
+    return list(await asyncio.gather(*(run(aw) for aw in aws)))
+
+
+def load_image(
+    data: Union[bytes, BinaryIO], mode: Optional[str] = None
+) -> Image.Image:
+    # takes raw bytes or anything file-like (a DiskCache mmap for one), and
+    # fully loads it so the source can be closed afterwards
+    img: Image.Image = Image.open(
+        BytesIO(data) if isinstance(data, bytes) else data
     )
-    # x and y are float coords here, grab whatever other tiles i need
-    # other bounds
-    x2 = x - 1 if x - int(x) < 0.5 else x + 1
-    y2 = y - 1 if y - int(y) < 0.5 else y + 1
+    img.load()
+    if mode is not None and img.mode != mode:
+        img = img.convert(mode)
+    return img
+
+
+# mercator stops here, tiles don't go any further north or south
+_MAX_LATITUDE = 85.05112878
+
+
+@dataclass(frozen=True)
+class TilePlan:
+    """
+    Which tiles make up a map and where each one goes. ``zoom`` and
+    ``tile_size`` are the source tiles', ``canvas`` is what they're stitched
+    into and ``output`` what the canvas is resized to, when they differ.
+    """
+
+    zoom: int
+    tile_size: int
+    canvas: Tuple[int, int]
+    output: Tuple[int, int]
+    # (x, y) tile coordinates, and the canvas position of each one's top left
+    tiles: Tuple[Tuple[int, int], ...]
+    offsets: Tuple[Tuple[int, int], ...]
+
+
+def plan_tiles(
+    lat: float,
+    lon: float,
+    zoom: int,
+    size: Tuple[int, int] = (256, 256),
+    scale: float = 1.0,
+    tile_size: int = 256,
+    supersample: int = 1,
+    max_zoom: int = 22,
+) -> TilePlan:
+    """
+    Smallest set of tiles covering a ``size`` map centered on lat/lon at
+    ``zoom``, in 256px-tile zoom levels. ``scale`` multiplies the output
+    size (2 for retina), and the source zoom is raised until there are at
+    least ``scale * supersample`` source pixels per map pixel, so 512px tiles
+    are fetched one zoom level lower than 256px ones.
+    """
+    output = (round(size[0] * scale), round(size[1] * scale))
+    density = 256 * scale * supersample / tile_size
+    source = min(max_zoom, max(0, zoom + math.ceil(math.log2(density))))
+    n = 2 ** source
+    world = tile_size * n
+    # source pixels per output pixel
+    ratio = world / (256 * 2 ** zoom * scale)
+    canvas = (round(output[0] * ratio), round(output[1] * ratio))
+
+    lat = max(-_MAX_LATITUDE, min(_MAX_LATITUDE, lat))
+    center_x = (lon + 180.0) / 360.0 * world
+    center_y = (
+        (1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * world
+    )
+    left = math.floor(center_x - canvas[0] / 2)
+    top = math.floor(center_y - canvas[1] / 2)
+
+    tiles = []
+    offsets = []
+    for y in range(top // tile_size, (top + canvas[1] - 1) // tile_size + 1):
+        if not 0 <= y < n:
+            continue
+        for x in range(
+            left // tile_size, (left + canvas[0] - 1) // tile_size + 1
+        ):
+            # wrap around the antimeridian
+            tiles.append((x % n, y))
+            offsets.append((x * tile_size - left, y * tile_size - top))
+    return TilePlan(
+        source, tile_size, canvas, output, tuple(tiles), tuple(offsets)
+    )
+
+
+# weather layer opacity, the same table point(lambda i: i / 1.4) builds
+LAYER_ALPHA = np.round(np.arange(256) / 1.4).astype(np.uint8)
+
+_scratch = threading.local()
 
-    # make sure they're always in the right order
-    x1, x2 = (int(x), int(x2)) if x < x2 else (int(x2), int(x))
-    y1, y2 = (int(y), int(y2)) if y < y2 else (int(y2), int(y))
 
-    # map tiles are 256x256 so grab the coords the location is on the pic
-    center_x = max(x1, x2)
-    center_y = max(y1, y2)
-    x_pos = int(256 + (x - int(center_x)) * 256)
-    y_pos = int(256 + (y - int(center_y)) * 256)
-    return (x1, y1, x2, y2), (x_pos, y_pos)
+def _buffer(name: str, shape: Tuple[int, ...], dtype) -> np.ndarray:
+    # per thread scratch arrays, reused across renders so compositing
+    # doesn't allocate. render pool workers each get their own
+    bufs = _scratch.__dict__.setdefault("bufs", {})
+    buf = bufs.get(name)
+    if buf is None or buf.shape != shape or buf.dtype != dtype:
+        buf = bufs[name] = np.empty(shape, dtype)
+    return buf
 
 
-def assemble_mosaic(
-    images: List[Image.Image], location: Tuple[int, int]
+def tile_array(data: Union[bytes, BinaryIO]) -> np.ndarray:
+    return np.asarray(load_image(data, "RGBA"))
+
+
+def array_image(arr: np.ndarray, mode: str = "RGBA") -> Image.Image:
+    # zero copy, read only image over a contiguous uint8 array
+    return Image.frombuffer(
+        mode, (arr.shape[1], arr.shape[0]), arr, "raw", mode, 0, 1
+    )
+
+
+def stitch_tiles(
+    plan: TilePlan,
+    tiles: Sequence[np.ndarray],
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Copies the visible part of each tile straight onto the canvas, then
+    resizes it to the output size if the plan needs that. Anything no tile
+    covers (past the poles) is left transparent.
+    """
+    width, height = plan.canvas
+    if out is None:
+        out = np.empty((height, width, 4), np.uint8)
+    out.fill(0)
+    for (dx, dy), tile in zip(plan.offsets, tiles):
+        left, right = max(dx, 0), min(dx + tile.shape[1], width)
+        top, bottom = max(dy, 0), min(dy + tile.shape[0], height)
+        if left < right and top < bottom:
+            out[top:bottom, left:right] = tile[
+                top - dy : bottom - dy, left - dx : right - dx
+            ]
+    if plan.canvas == plan.output:
+        return out
+    return np.asarray(array_image(out).resize(plan.output, Image.LANCZOS))
+
+
+def _stitch_layer(
+    name: str, plan: TilePlan, tiles: Sequence[np.ndarray]
+) -> np.ndarray:
+    shape = (plan.canvas[1], plan.canvas[0], 4)
+    return stitch_tiles(plan, tiles, _buffer(name, shape, np.uint8))
+
+
+def composite_basemap(
+    satellite: Tuple[TilePlan, Sequence[np.ndarray]],
+    hillshade: Tuple[TilePlan, Sequence[np.ndarray]],
+) -> Image.Image:
+    # hillshade laid over the satellite imagery
+    sat = _stitch_layer("sat", *satellite)
+    hill = _stitch_layer("hill", *hillshade)
+    if sat.shape != hill.shape:
+        raise ValueError("map layers have different output sizes")
+    # the blends themselves are left to pillow, its c loops beat anything
+    # numpy can do here without going through uint16 temporaries
+    return Image.alpha_composite(array_image(sat), array_image(hill))
+
+
+def overlay_weather(
+    basemap: Image.Image, radar: Tuple[TilePlan, Sequence[np.ndarray]]
+) -> Image.Image:
+    # pastes the weather layer over the basemap at LAYER_ALPHA opacity, in
+    # place
+    weather = _stitch_layer("weather", *radar)
+    if weather.shape[1::-1] != basemap.size:
+        raise ValueError("map layers have different output sizes")
+    mask = np.take(
+        LAYER_ALPHA,
+        weather[..., 3],
+        out=_buffer("mask", weather.shape[:2], np.uint8),
+    )
+    basemap.paste(array_image(weather), (0, 0), mask=array_image(mask, "L"))
+    return basemap
+
+
+def composite_weather_map(
+    radar: Tuple[TilePlan, Sequence[np.ndarray]],
+    satellite: Tuple[TilePlan, Sequence[np.ndarray]],
+    hillshade: Tuple[TilePlan, Sequence[np.ndarray]],
 ) -> Image.Image:
-    mosaic = Image.new("RGBA", (512, 512))
-    mosaic.paste(images[0], (0, 0))
-    mosaic.paste(images[1], (0, 256))
-    mosaic.paste(images[2], (256, 0))
-    mosaic.paste(images[3], (256, 256))
-    mosaic = mosaic.crop(
-        [
-            location[0] - 128,
-            location[1] - 128,
-            location[0] + 128,
-            location[1] + 128,
-        ]
+    """
+    Stitches each layer into a scratch buffer, lays the hillshade over the
+    satellite imagery, then the weather layer at LAYER_ALPHA opacity over
+    that. The layers can come from different tile sizes and zooms as long as
+    their plans have the same output size.
+    """
+    return overlay_weather(composite_basemap(satellite, hillshade), radar)
+
+
+_GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash_cell(
+    lat: float, lon: float, precision: int
+) -> Tuple[str, float, float]:
+    # returns the geohash of the cell the point falls in, plus the cell's
+    # center so every point inside it can be looked up as the same place
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bit = 0
+    ch = 0
+    even = True
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            ch |= 1 << (4 - bit)
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        if bit < 4:
+            bit += 1
+        else:
+            chars.append(_GEOHASH_ALPHABET[ch])
+            bit = 0
+            ch = 0
+    return (
+        "".join(chars),
+        (lat_range[0] + lat_range[1]) / 2,
+        (lon_range[0] + lon_range[1]) / 2,
     )
-    return mosaic
 
 
 def dd_to_dms(dd: float) -> Tuple[int, int, float]:
@@ -0,0 +1,104 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Callable, Generic, Optional, TypeVar
+
+_logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Lazy(Generic[T]):
+    """
+    Stands in for something slow to set up (catalogs, ephemerides) until
+    it's first used. Attribute access goes through to the real object,
+    which ``factory`` makes on first access, so a Lazy can be handed out
+    wherever the object itself would be.
+
+    Whatever touches it first waits for it to be made, so code on the event
+    loop should ``await aget()`` instead, which makes it in the executor
+    (or waits on the ``warmup`` already doing that) without blocking the
+    loop. ``warmup`` it in the background once the bot is connected.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self._name = name
+        self._factory: Optional[Callable[[], T]] = factory
+        self._value: Optional[T] = None
+        self._lock = threading.Lock()
+        self._loading: Optional[asyncio.Future] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._factory is None
+
+    def get(self) -> T:
+        if self._factory is not None:
+            with self._lock:
+                # someone else might have made it while we waited
+                if self._factory is not None:
+                    start = time.perf_counter()
+                    self._value = self._factory()
+                    self._factory = None
+                    _logger.info(
+                        "loaded %s in %.1f ms",
+                        self._name,
+                        (time.perf_counter() - start) * 1000,
+                    )
+        return self._value
+
+    async def aget(self) -> T:
+        if self._factory is None:
+            return self._value
+        if self._loading is None:
+            self._loading = asyncio.get_running_loop().run_in_executor(
+                None, self.get
+            )
+            self._loading.add_done_callback(self._loaded)
+        # one caller giving up shouldn't cancel the load for the others
+        return await asyncio.shield(self._loading)
+
+    def _loaded(self, _: asyncio.Future):
+        # if it failed, the next aget tries again
+        self._loading = None
+
+    async def warmup(self) -> T:
+        return await self.aget()
+
+    def __getattr__(self, name: str):
+        # only called for what Lazy itself doesn't have. private names
+        # aren't passed through, so a half set up Lazy can't recurse
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.get(), name)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<Lazy {self._name} ({state})>"
+
+
+async def warmup(*lazies: Lazy):
+    """Load ``lazies`` one after the other off the event loop."""
+    for lazy in lazies:
+        try:
+            await lazy.warmup()
+        except Exception:
+            # left for first use to try again and raise where it matters
+            _logger.exception("warming up %r failed", lazy)
@@ -0,0 +1,354 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+import hashlib
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Any, Callable, Hashable, List, Optional, Sequence, Tuple
+
+from PIL import Image, features
+
+from libs.cache import CacheManager
+from libs.decoded_tiles import decoded_tiles
+from libs.encoders import byte_budget, encode_within, encoder_order
+from libs.helpers import (
+    TilePlan,
+    composite_basemap,
+    composite_weather_map,
+    overlay_weather,
+)
+from libs.render_pool import RenderPool
+
+_logger = logging.getLogger(__name__)
+
+# a layer's tile plan and its encoded tiles, in plan order
+Layer = Tuple[TilePlan, Sequence[bytes]]
+
+# discord's upload limit for bots without boosts
+UPLOAD_LIMIT = int(os.getenv("UPLOAD_LIMIT_MB", 8)) * 1024 * 1024
+
+# threads a loop's frames are drawn on, inside its one render pool job
+LOOP_FRAME_THREADS = int(os.getenv("LOOP_FRAME_THREADS", 4))
+
+
+def _decode(layer: Layer) -> Tuple[TilePlan, Sequence]:
+    plan, tiles = layer
+    return plan, [decoded_tiles.get(t) for t in tiles]
+
+
+def render_weather_map(
+    radar: Layer,
+    satellite: Layer,
+    hillshade: Layer,
+    encoders: Sequence[str],
+    budget: int,
+) -> bytes:
+    """
+    Composites a weather layer over the satellite + hillshade basemap and
+    encodes it with the first of ``encoders`` that fits in ``budget``.
+    """
+    # TODO use a vector layer to put on top maybe..?
+    map_img = composite_weather_map(
+        _decode(radar), _decode(satellite), _decode(hillshade)
+    )
+    return encode_within(map_img, budget, encoders)
+
+
+def render_loop_base(
+    satellite: Layer,
+    hillshade: Layer,
+    frames: Sequence[Layer],
+    colors: Optional[int],
+) -> Tuple[Image.Image, Optional[Image.Image]]:
+    """
+    The basemap every frame of a loop is drawn over, plus the palette all the
+    frames get quantized to, so colors stay put from one frame to the next.
+    The palette is built from every frame stacked into one image, radar
+    colors that only show up partway through the loop get an entry too.
+    ``colors`` of None means no palette (webp).
+    """
+    basemap = composite_basemap(_decode(satellite), _decode(hillshade))
+    if colors is None:
+        return basemap, None
+    width, height = basemap.size
+    sample = Image.new("RGB", (width, height * len(frames)))
+    for i, frame in enumerate(frames):
+        sample.paste(
+            overlay_weather(basemap.copy(), _decode(frame)).convert("RGB"),
+            (0, height * i),
+        )
+    return basemap, sample.quantize(colors, method=Image.FASTOCTREE)
+
+
+def render_loop_frame(
+    basemap: Image.Image, frame: Layer, palette: Optional[Image.Image]
+) -> Image.Image:
+    img = overlay_weather(basemap.copy(), _decode(frame)).convert("RGB")
+    if palette is None:
+        return img
+    # no dithering, dither noise differs between frames and defeats the
+    # gif encoder only storing what changed
+    return img.quantize(palette=palette, dither=Image.NONE)
+
+
+def _save_loop(frames: List[Image.Image], fmt: str, duration: int) -> bytes:
+    buf = BytesIO()
+    extra = (
+        # every frame keeps the previous one, so pillow only has to store
+        # the box that changed
+        {"disposal": 1, "optimize": False}
+        if fmt == "gif"
+        else {"minimize_size": True, "quality": 80}
+    )
+    frames[0].save(
+        buf,
+        format=fmt,
+        save_all=True,
+        # a generator so frames are handed over one at a time
+        append_images=(f for f in frames[1:]),
+        duration=duration,
+        loop=0,
+        **extra,
+    )
+    return buf.getvalue()
+
+
+def encode_loop(
+    frames: List[Image.Image],
+    fmt: str,
+    duration: int,
+    max_bytes: int = UPLOAD_LIMIT,
+) -> bytes:
+    """
+    Encodes the frames as an animated gif or webp. Over ``max_bytes`` it
+    drops every other frame, slowing the loop down to match, and then
+    halves the size until it fits.
+    """
+    while True:
+        data = _save_loop(frames, fmt, duration)
+        if len(data) <= max_bytes or frames[0].width <= 64:
+            return data
+        if len(frames) > 2:
+            frames = frames[::2]
+            duration *= 2
+        else:
+            frames = [
+                f.resize((f.width // 2, f.height // 2), Image.NEAREST)
+                for f in frames
+            ]
+        _logger.info(
+            "loop was %d bytes, retrying with %d %dpx frames",
+            len(data),
+            len(frames),
+            frames[0].width,
+        )
+
+
+def render_weather_loop(
+    frames: Sequence[Layer],
+    satellite: Layer,
+    hillshade: Layer,
+    fmt: str,
+    duration: int,
+) -> bytes:
+    """
+    A whole radar loop in one go: the basemap is decoded and composited
+    once, the frames are drawn over it in parallel on up to
+    ``LOOP_FRAME_THREADS`` threads (pillow and numpy let go of the GIL for
+    the heavy parts) and the lot is encoded with encode_loop.
+    """
+    basemap, palette = render_loop_base(
+        satellite, hillshade, frames, 256 if fmt == "gif" else None
+    )
+    threads = max(1, min(LOOP_FRAME_THREADS, len(frames)))
+    with ThreadPoolExecutor(threads, thread_name_prefix="loop") as frame_pool:
+        images = list(
+            frame_pool.map(
+                lambda frame: render_loop_frame(basemap, frame, palette),
+                frames,
+            )
+        )
+    return encode_loop(images, fmt, duration)
+
+
+def loop_format() -> str:
+    # webp loops are smaller, but not every pillow build can write them
+    fmt = os.getenv("LOOP_FORMAT", "gif")
+    if fmt == "webp" and not features.check("webp_anim"):
+        return "gif"
+    return fmt
+
+
+def tile_digest(*layers: Layer) -> str:
+    # identifies the exact tile contents a map was rendered from, so a
+    # refreshed radar tile gets a fresh render
+    h = hashlib.blake2b(digest_size=16)
+    for _, tiles in layers:
+        for tile in tiles:
+            h.update(len(tile).to_bytes(4, "big"))
+            h.update(tile)
+    return h.hexdigest()
+
+
+@dataclass
+class RenderStats:
+    hits: int = 0
+    misses: int = 0
+    # cpu time spent rendering, and an estimate of what hits saved
+    cpu_seconds: float = 0.0
+    saved_seconds: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    @property
+    def mean_render_seconds(self) -> float:
+        return self.cpu_seconds / self.misses if self.misses else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.hits} hits, {self.misses} renders "
+            f"({self.hit_rate:.0%} hit rate), {self.cpu_seconds:.1f}s cpu "
+            f"rendering, ~{self.saved_seconds:.1f}s saved by hits"
+        )
+
+
+def _timed(fn: Callable, *args) -> Tuple[Any, float]:
+    # runs in the render pool, so it has to stay picklable
+    start = time.thread_time()
+    res = fn(*args)
+    return res, time.thread_time() - start
+
+
+class MapRenderer:
+    """
+    Renders weather maps and loops, caching the finished images keyed on the
+    request and a digest of the tiles that went into them. Rendering itself
+    happens in the render pool, and maps are encoded with the first of
+    ``MAP_ENCODERS`` that fits in ``MAP_BUDGET_KB``.
+    """
+
+    def __init__(self, cache: CacheManager, pool: RenderPool):
+        self._cache = cache.namespace("weather-maps", raw=True)
+        self.pool = pool
+        self.stats = RenderStats()
+        self.encoders = encoder_order()
+        self.budget = byte_budget()
+
+    async def render(
+        self,
+        key: Tuple[Hashable, ...],
+        radar: Layer,
+        satellite: Layer,
+        hillshade: Layer,
+    ) -> bytes:
+        key = (
+            *key,
+            self.encoders,
+            self.budget,
+            radar[0],
+            satellite[0],
+            hillshade[0],
+            tile_digest(radar, satellite, hillshade),
+        )
+        png = await self._cache.get(key)
+        if png is not None:
+            self.stats.hits += 1
+            self.stats.saved_seconds += self.stats.mean_render_seconds
+            return png
+        return await self._cache.fetch(
+            key,
+            lambda: self._render(
+                radar, satellite, hillshade, self.encoders, self.budget
+            ),
+        )
+
+    async def render_loop(
+        self,
+        key: Tuple[Hashable, ...],
+        frames: List[Layer],
+        satellite: Layer,
+        hillshade: Layer,
+        fmt: str = "gif",
+        duration: int = 500,
+    ) -> bytes:
+        key = (
+            *key,
+            "loop",
+            fmt,
+            duration,
+            frames[0][0],
+            satellite[0],
+            hillshade[0],
+            tile_digest(*frames, satellite, hillshade),
+        )
+        data = await self._cache.get(key)
+        if data is not None:
+            self.stats.hits += 1
+            self.stats.saved_seconds += self.stats.mean_render_seconds
+            return data
+        return await self._cache.fetch(
+            key,
+            lambda: self._render_loop(
+                frames, satellite, hillshade, fmt, duration
+            ),
+        )
+
+    async def _run(self, fn: Callable, *args) -> Any:
+        res, cpu = await self.pool.run(_timed, fn, *args)
+        self.stats.cpu_seconds += cpu
+        return res
+
+    async def _render(self, *args) -> bytes:
+        start = self.stats.cpu_seconds
+        data = await self._run(render_weather_map, *args)
+        self.stats.misses += 1
+        _logger.debug(
+            "rendered weather map in %.1f ms, %d bytes, %.0f%% hit rate",
+            (self.stats.cpu_seconds - start) * 1000,
+            len(data),
+            self.stats.hit_rate * 100,
+        )
+        return data
+
+    async def _render_loop(
+        self,
+        frames: List[Layer],
+        satellite: Layer,
+        hillshade: Layer,
+        fmt: str,
+        duration: int,
+    ) -> bytes:
+        start = self.stats.cpu_seconds
+        # one job per loop, so a loop takes one worker and one queue slot
+        # like any other render, its frames fan out on threads inside it
+        data = await self._run(
+            render_weather_loop, frames, satellite, hillshade, fmt, duration
+        )
+        self.stats.misses += 1
+        _logger.debug(
+            "rendered %d frame loop in %.1f ms cpu, %d bytes",
+            len(frames),
+            (self.stats.cpu_seconds - start) * 1000,
+            len(data),
+        )
+        return data
@@ -14,83 +14,132 @@ WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEM
 COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
 OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
-from datetime import timedelta
-from io import BytesIO
+import os
+from typing import List, Optional, Tuple
 
-import aiohttp
-from PIL import Image
 from yarl import URL
 
-from libs.disk_cache import DiskCache
-from libs.helpers import get_tiles, assemble_mosaic
+from libs.cache import CacheManager
+from libs.helpers import (
+    gather_bounded,
+    plan_tiles,
+    TilePlan,
+)
+from libs.http import HTTPClient, USER_AGENT
+from libs.prefetch import TilePrefetcher, prefetch_targets
+
+
+# satellite tiles come in 256 or 512px, hillshades only in 256
+SATELLITE_PATHS = {256: "/maps/hybrid/256", 512: "/maps/hybrid"}
+HILLSHADE_PATH = "/tiles/hillshades"
 
 
 class MapTilerAPI:
-    def __init__(self, token: str):
+    def __init__(
+        self,
+        token: str,
+        http: HTTPClient,
+        cache: CacheManager,
+        tile_size: Optional[int] = None,
+        prefetcher: Optional[TilePrefetcher] = None,
+    ):
         self.token = token
-        self.satellite_disk_cache = DiskCache(
-            "/tmp/almanac/map-tiler", timedelta(days=7)
-        )
+        self.http = http
+        self.prefetcher = prefetcher
+        self._tile_cache = cache.namespace("maptiler-tiles", raw=True)
+        # 512px tiles cover the same map with a quarter of the requests
+        self.tile_size = tile_size or int(os.getenv("MAPTILER_TILE_SIZE", 512))
+        if self.tile_size not in SATELLITE_PATHS:
+            raise ValueError(f"unsupported tile size {self.tile_size}")
 
-    async def _map_tile(
+    async def _fetch_map_tile(
         self, x: int, y: int, zoom: int, path: str, ext: str
-    ) -> Image.Image:
-        resp = self.satellite_disk_cache.get(f"{path}/{zoom}/{x}/{y}.jpg")
-        buf = BytesIO()
-        if resp is not None:
-            buf.write(resp)
-            buf.seek(0)
-        else:
-            async with aiohttp.ClientSession() as sess:
-                async with sess.get(
-                    url=URL.build(
-                        scheme="https",
-                        host="api.maptiler.com",
-                        path=f"{path}/{zoom}/{x}/{y}.{ext}",
-                        query={"key": self.token},
-                    ),
-                    headers={
-                        "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
-                        "Chrome/91.0.4472.114 Safari/537.36"
-                    },
-                ) as resp:
-                    buf.write(await resp.read())
-            buf.seek(0)
-            self.satellite_disk_cache.put(
-                f"{path}/{zoom}/{x}/{y}.{ext}", buf.read()
-            )
-            buf.seek(0)
-        img: Image.Image = Image.open(buf)
-        img.load()
-        img = img.convert("RGBA")
-        return img
+    ) -> bytes:
+        async with self.http.get(
+            url=URL.build(
+                scheme="https",
+                host="api.maptiler.com",
+                path=f"{path}/{zoom}/{x}/{y}.{ext}",
+                query={"key": self.token},
+            ),
+            headers={"User-Agent": USER_AGENT},
+        ) as resp:
+            resp.raise_for_status()
+            return await resp.read()
 
-    async def get_map_image(
-        self, lat: float, lon: float, zoom: int
-    ) -> Image.Image:
-        tiles, location = get_tiles(lat, lon, zoom)
-        satellite_images = [
-            await self._map_tile(
-                tile[0], tile[1], zoom, "/maps/hybrid/256", "jpg"
-            )
-            for tile in [
-                (tiles[0], tiles[1]),
-                (tiles[0], tiles[3]),
-                (tiles[2], tiles[1]),
-                (tiles[2], tiles[3]),
-            ]
+    @property
+    def _layers(self) -> List[Tuple[str, str, int]]:
+        # path, extension and tile size of the satellite and hillshade layers
+        return [
+            (SATELLITE_PATHS[self.tile_size], "jpg", self.tile_size),
+            (HILLSHADE_PATH, "png", 256),
         ]
-        hillshade_images = [
-            await self._map_tile(
-                tile[0], tile[1], zoom, "/tiles/hillshades", "png"
-            )
-            for tile in [
-                (tiles[0], tiles[1]),
-                (tiles[0], tiles[3]),
-                (tiles[2], tiles[1]),
-                (tiles[2], tiles[3]),
-            ]
+
+    async def map_tiles(
+        self,
+        lat: float,
+        lon: float,
+        zoom: int,
+        size: Tuple[int, int] = (256, 256),
+        scale: float = 1.0,
+        supersample: int = 1,
+    ) -> Tuple[Tuple[TilePlan, List[bytes]], Tuple[TilePlan, List[bytes]]]:
+        # encoded satellite and hillshade tiles, each with its own plan since
+        # the tile sizes can differ
+        layers = self._layers
+        plans = [
+            plan_tiles(lat, lon, zoom, size, scale, tile_size, supersample)
+            for _, _, tile_size in layers
         ]
-        satellite_assembled = assemble_mosaic(satellite_images, location)
-        hillshade_assembled = assemble_mosaic(hillshade_images, location)
-        return Image.alpha_composite(satellite_assembled, hillshade_assembled)
+        if self.prefetcher is not None:
+            self.prefetcher.claim(
+                self._tile_cache,
+                [
+                    (path, plan.zoom, x, y)
+                    for (path, _, _), plan in zip(layers, plans)
+                    for x, y in plan.tiles
+                ],
+            )
+        data = await gather_bounded(
+            self._tile_cache.get_or_fetch(
+                (path, plan.zoom, x, y),
+                lambda x=x, y=y, z=plan.zoom, path=path, ext=ext: (
+                    self._fetch_map_tile(x, y, z, path, ext)
+                ),
+            )
+            for (path, ext, _), plan in zip(layers, plans)
+            for x, y in plan.tiles
+        )
+        split = len(plans[0].tiles)
+        return (plans[0], data[:split]), (plans[1], data[split:])
+
+    def prefetch_map(
+        self,
+        lat: float,
+        lon: float,
+        zoom: int,
+        size: Tuple[int, int] = (256, 256),
+        scale: float = 1.0,
+        supersample: int = 1,
+    ):
+        # queues the tiles around a map_tiles call, see
+        # OpenWeatherMapAPI.prefetch_radar
+        if self.prefetcher is None:
+            return
+        for path, ext, tile_size in self._layers:
+            targets = prefetch_targets(
+                lambda z, tile_size=tile_size: plan_tiles(
+                    lat, lon, z, size, scale, tile_size, supersample
+                ),
+                zoom,
+            )
+            for z, tiles in targets:
+                for x, y in tiles:
+                    self.prefetcher.schedule(
+                        "api.maptiler.com",
+                        self._tile_cache,
+                        (path, z, x, y),
+                        lambda x=x, y=y, z=z, path=path, ext=ext: (
+                            self._fetch_map_tile(x, y, z, path, ext)
+                        ),
+                    )
@@ -14,22 +14,21 @@ WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEM
 COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
 OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
-import json
 import os
 from datetime import datetime
 
-import aiohttp
-from expiringdict import ExpiringDict
 from yarl import URL
 
-from libs.googlemaps.models import GeocodeResponse
+from libs.cache import CacheManager
+from libs.http import HTTPClient
 from libs.nasa.models import APOD
 
 
 class NasaAPI:
-    def __init__(self):
+    def __init__(self, http: HTTPClient, cache: CacheManager):
         self.token = os.getenv("NASA")
-        self._apod_cache = ExpiringDict(10000, 60 * 60 * 12)  # 12h
+        self.http = http
+        self._apod_cache = cache.namespace("apod", model=APOD)
 
     def _route(self, path: str, **kwargs) -> URL:
         kwargs.update({"api_key": self.token})
@@ -41,15 +40,15 @@ class NasaAPI:
         )
 
     async def apod(self, date: datetime) -> APOD:
-        if (date.year, date.month, date.day) not in self._apod_cache:
-            async with aiohttp.ClientSession() as sess:
-                async with sess.get(
-                    url=self._route(
-                        "/planetary/apod",
-                        date=f"{date.year:0>4}-{date.month:0>2}-{date.day:0>2}",
-                    )
-                ) as resp:
-                    self._apod_cache[
-                        (date.year, date.month, date.day)
-                    ] = APOD.from_json(await resp.read())
-        return self._apod_cache[(date.year, date.month, date.day)]
+        return await self._apod_cache.get_or_fetch(
+            (date.year, date.month, date.day), lambda: self._fetch_apod(date)
+        )
+
+    async def _fetch_apod(self, date: datetime) -> APOD:
+        async with self.http.get(
+            url=self._route(
+                "/planetary/apod",
+                date=f"{date.year:0>4}-{date.month:0>2}-{date.day:0>2}",
+            )
+        ) as resp:
+            return APOD.from_json(await resp.read())
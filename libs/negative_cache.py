@@ -0,0 +1,137 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Dict, Hashable, Optional, Tuple, Type
+
+import aiohttp
+
+
+@dataclass(frozen=True)
+class _Failure:
+    error: BaseException
+    expires_at: float
+
+
+class NegativeCache:
+    """
+    Remembers lookups that failed for good (a misspelled city, a point
+    weather.gov doesn't cover) so retrying them doesn't go upstream again.
+
+    Only failures registered with ``register`` are remembered, each class
+    with its own ttl, and only for the namespace that registered them (a 404
+    means no such point to weather.gov, not to a tile server).
+    ``ClientResponseError`` rules can be narrowed down to one status code.
+    Cache namespaces get a ``scoped`` view of it as their ``negative``.
+    """
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._rules: Dict[
+            str, Dict[Tuple[Type[BaseException], Optional[int]], timedelta]
+        ] = {}
+        self._failures: "OrderedDict[Tuple[str, Hashable], _Failure]" = (
+            OrderedDict()
+        )
+        # upstream calls skipped per namespace
+        self.saved: Counter = Counter()
+        self.stored: Counter = Counter()
+
+    def register(
+        self,
+        namespace: str,
+        error: Type[BaseException],
+        ttl: timedelta,
+        status: Optional[int] = None,
+    ):
+        self._rules.setdefault(namespace, {})[error, status] = ttl
+
+    def scoped(self, namespace: str) -> "ScopedNegativeCache":
+        return ScopedNegativeCache(self, namespace)
+
+    def _ttl_for(
+        self, namespace: str, error: BaseException
+    ) -> Optional[timedelta]:
+        rules = self._rules.get(namespace)
+        if not rules:
+            return None
+        status = (
+            error.status
+            if isinstance(error, aiohttp.ClientResponseError)
+            else None
+        )
+        for cls in type(error).__mro__:
+            ttl = rules.get((cls, status)) or rules.get((cls, None))
+            if ttl is not None:
+                return ttl
+        return None
+
+    def remember(
+        self, namespace: str, key: Hashable, error: BaseException
+    ) -> bool:
+        ttl = self._ttl_for(namespace, error)
+        if ttl is None:
+            return False
+        self._failures.pop((namespace, key), None)
+        self._failures[namespace, key] = _Failure(
+            error, time.time() + ttl.total_seconds()
+        )
+        self.stored[namespace] += 1
+        while len(self._failures) > self.max_entries:
+            self._failures.popitem(last=False)
+        return True
+
+    def get(self, namespace: str, key: Hashable) -> Optional[BaseException]:
+        failure = self._failures.get((namespace, key))
+        if failure is None:
+            return None
+        if failure.expires_at < time.time():
+            del self._failures[namespace, key]
+            return None
+        self.saved[namespace] += 1
+        return failure.error
+
+    def __len__(self) -> int:
+        return len(self._failures)
+
+
+class ScopedNegativeCache:
+    """One namespace's rules and failures in a shared NegativeCache."""
+
+    def __init__(self, cache: NegativeCache, namespace: str):
+        self.cache = cache
+        self.namespace = namespace
+
+    def register(
+        self,
+        error: Type[BaseException],
+        ttl: timedelta,
+        status: Optional[int] = None,
+    ):
+        self.cache.register(self.namespace, error, ttl, status)
+
+    def remember(self, key: Hashable, error: BaseException) -> bool:
+        return self.cache.remember(self.namespace, key, error)
+
+    def get(self, key: Hashable) -> Optional[BaseException]:
+        return self.cache.get(self.namespace, key)
+
+    @property
+    def saved(self) -> int:
+        return self.cache.saved[self.namespace]
@@ -16,39 +16,135 @@ OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
 """
 from __future__ import annotations
 
+import asyncio
+import os
+from collections import Counter
 from datetime import timedelta
-from io import BytesIO
-from typing import Tuple
+from typing import (
+    Tuple,
+    Optional,
+    Dict,
+    Callable,
+    Awaitable,
+    TypeVar,
+    List,
+    Sequence,
+)
 
-import aiohttp
-from PIL import Image
-from expiringdict import ExpiringDict
 from yarl import URL
 
-from libs.disk_cache import DiskCache
-from libs.helpers import get_tiles, assemble_mosaic
+from libs.cache import CacheManager, CacheNamespace
+from libs.helpers import (
+    geohash_cell,
+    gather_bounded,
+    plan_tiles,
+    TilePlan,
+)
+from libs.http import HTTPClient
 from libs.openweathermap.errors import CityNotFoundError
 from libs.openweathermap.models import (
     CurrentConditionsResponse,
     CurrentPollutionIndexResponse,
 )
 from libs.openweathermap.response_models import OneCallAPIResponse
+from libs.prefetch import TilePrefetcher, prefetch_targets
+
+
+T = TypeVar("T")
+
+# geohash precision each kind of data is cached at. 6 is a ~1.2 x 0.6 km cell,
+# 5 is ~4.9 x 4.9 km, which is plenty for forecasts and air quality
+DEFAULT_RESOLUTIONS = {"conditions": 6, "forecast": 5, "pollution": 5}
+
+# weather maps 2.0 layer codes, the 2.0 api is the one that takes a time
+TIMED_LAYERS = {
+    "clouds": "CL",
+    "precipitation": "PR0",
+    "pressure": "APM",
+    "wind": "WND",
+    "temperature": "TA2",
+}
+
+
+async def _nothing() -> None:
+    return None
 
 
 class OpenWeatherMapAPI:
-    def __init__(self, token):
+    def __init__(
+        self,
+        token,
+        http: HTTPClient,
+        cache: CacheManager,
+        resolutions: Optional[Dict[str, int]] = None,
+        prefetcher: Optional[TilePrefetcher] = None,
+    ):
         self.token: str = token
-        self._condition_cache = ExpiringDict(
-            max_len=1000, max_age_seconds=15 * 60
-        )  # 15 mins
-        self._pollution_cache = ExpiringDict(
-            max_len=1000, max_age_seconds=15 * 60
-        )  # 15 mins
-        self._one_call_cache = ExpiringDict(
-            max_len=1000, max_age_seconds=15 * 60
-        )  # 15 mins
-        self.disk_cache = DiskCache(
-            "/tmp/almanac/weather-maps/", timedelta(minutes=15)
+        self.http = http
+        self.prefetcher = prefetcher
+        self.resolutions = {
+            kind: int(os.getenv(f"OWM_{kind.upper()}_PRECISION", default))
+            for kind, default in DEFAULT_RESOLUTIONS.items()
+        }
+        self.resolutions.update(resolutions or {})
+        self._condition_cache = cache.namespace(
+            "owm-conditions", model=CurrentConditionsResponse
+        )
+        self._pollution_cache = cache.namespace(
+            "owm-pollution", model=CurrentPollutionIndexResponse
+        )
+        self._one_call_cache = cache.namespace(
+            "owm-forecast", model=OneCallAPIResponse
+        )
+        self._tile_cache = cache.namespace("owm-tiles", raw=True)
+        # only the current weather endpoint says a city doesn't exist
+        self._condition_cache.negative.register(
+            CityNotFoundError, timedelta(minutes=30)
+        )
+        self._cell_hits: Counter = Counter()
+        self._cell_misses: Counter = Counter()
+
+    async def _cell_lookup(
+        self,
+        kind: str,
+        cache: CacheNamespace,
+        latitude: float,
+        longitude: float,
+        fetch: Callable[[float, float], Awaitable[T]],
+    ) -> T:
+        # every point inside a geohash cell shares one upstream response,
+        # fetched for the center of the cell
+        precision = self.resolutions[kind]
+        cell, latitude, longitude = geohash_cell(
+            latitude, longitude, precision
+        )
+        key = (precision, cell)
+
+        def fetch_cell() -> Awaitable[T]:
+            return fetch(round(latitude, 4), round(longitude, 4))
+
+        value = await cache.get(key, refresh=fetch_cell)
+        if value is not None:
+            self._cell_hits[kind, precision] += 1
+            return value
+        self._cell_misses[kind, precision] += 1
+        return await cache.fetch(key, fetch_cell)
+
+    def hit_rates(self) -> Dict[str, float]:
+        # keyed on "kind@precision"
+        return {
+            f"{kind}@{precision}": self._cell_hits[kind, precision]
+            / (
+                self._cell_hits[kind, precision]
+                + self._cell_misses[kind, precision]
+            )
+            for kind, precision in {*self._cell_hits, *self._cell_misses}
+        }
+
+    def hit_rate_summary(self) -> str:
+        rates = sorted(self.hit_rates().items())
+        return ", ".join(f"{name} {rate:.0%}" for name, rate in rates) or (
+            "no lookups yet"
         )
 
     def _route(self, path: str, **kwargs) -> URL:
@@ -63,120 +159,217 @@ class OpenWeatherMapAPI:
     async def get_current_weather(
         self, latitude: float, longitude: float
     ) -> CurrentConditionsResponse:
-        latitude = round(latitude, 3)
-        longitude = round(longitude, 3)
-        conditions = self._condition_cache.get((latitude, longitude), None)
-        if conditions:
-            return conditions
-        async with aiohttp.ClientSession() as sess:
-            async with sess.get(
-                url=self._route(
-                    "/data/2.5/weather",
-                    lat=latitude,
-                    lon=longitude,
-                    units="imperial",
-                )
-            ) as resp:
-                r = await resp.json()
-                if r["cod"] != 200:
-                    raise CityNotFoundError
-                conditions: CurrentConditionsResponse = (
-                    CurrentConditionsResponse.from_json(await resp.read())
-                )
-                self._condition_cache[(latitude, longitude)] = conditions
-        return conditions
+        return await self._cell_lookup(
+            "conditions",
+            self._condition_cache,
+            latitude,
+            longitude,
+            self._fetch_current_weather,
+        )
+
+    async def _fetch_current_weather(
+        self, latitude: float, longitude: float
+    ) -> CurrentConditionsResponse:
+        async with self.http.get(
+            url=self._route(
+                "/data/2.5/weather",
+                lat=latitude,
+                lon=longitude,
+                units="imperial",
+            )
+        ) as resp:
+            # anything but a 404 is owm having trouble, let it raise so the
+            # cache can fall back to what it has
+            if resp.status != 404:
+                resp.raise_for_status()
+            r = await resp.json()
+            if r["cod"] != 200:
+                raise CityNotFoundError
+            return CurrentConditionsResponse.from_json(await resp.read())
 
     async def get_forecast(
         self, latitude: float, longitude: float
     ) -> OneCallAPIResponse:
-        latitude = round(latitude, 3)
-        longitude = round(latitude, 3)
-        response = self._one_call_cache.get((latitude, longitude), None)
-        if response:
-            return response
-        async with aiohttp.ClientSession() as sess:
-            async with sess.get(
-                url=self._route(
-                    "/data/2.5/onecall",
-                    lat=latitude,
-                    lon=longitude,
-                    exclude="minutely",
-                    units="imperial",
-                )
-            ) as resp:
-                forecast: OneCallAPIResponse = OneCallAPIResponse.from_json(
-                    await resp.read()
-                )
-                self._one_call_cache[(latitude, longitude)] = forecast
-        return forecast
+        return await self._cell_lookup(
+            "forecast",
+            self._one_call_cache,
+            latitude,
+            longitude,
+            self._fetch_forecast,
+        )
+
+    async def _fetch_forecast(
+        self, latitude: float, longitude: float
+    ) -> OneCallAPIResponse:
+        async with self.http.get(
+            url=self._route(
+                "/data/2.5/onecall",
+                lat=latitude,
+                lon=longitude,
+                exclude="minutely",
+                units="imperial",
+            )
+        ) as resp:
+            resp.raise_for_status()
+            return OneCallAPIResponse.from_json(await resp.read())
 
     async def get_current_pollution(
         self, latitude: float, longitude: float
     ) -> CurrentPollutionIndexResponse:
-        latitude = round(latitude, 3)
-        longitude = round(longitude, 3)
-        pollution = self._pollution_cache.get((latitude, longitude), None)
-        if pollution:
-            return pollution
-        async with aiohttp.ClientSession() as sess:
-            async with sess.get(
-                url=self._route(
-                    "/data/2.5/air_pollution", lat=latitude, lon=longitude
-                )
-            ) as resp:
-                pollution: CurrentPollutionIndexResponse = (
-                    CurrentPollutionIndexResponse.from_json(await resp.read())
-                )
-            self._pollution_cache[(latitude, longitude)] = pollution
-        return pollution
+        return await self._cell_lookup(
+            "pollution",
+            self._pollution_cache,
+            latitude,
+            longitude,
+            self._fetch_current_pollution,
+        )
 
-    async def get_current_conditions(
+    async def _fetch_current_pollution(
         self, latitude: float, longitude: float
-    ) -> Tuple[CurrentConditionsResponse, CurrentPollutionIndexResponse]:
-        return await self.get_current_weather(
-            latitude, longitude
-        ), await self.get_current_pollution(latitude, longitude)
+    ) -> CurrentPollutionIndexResponse:
+        async with self.http.get(
+            url=self._route(
+                "/data/2.5/air_pollution", lat=latitude, lon=longitude
+            )
+        ) as resp:
+            resp.raise_for_status()
+            return CurrentPollutionIndexResponse.from_json(await resp.read())
 
-    async def _radar_tile(
+    async def get_current_conditions(
+        self,
+        latitude: float,
+        longitude: float,
+        weather: bool = True,
+        pollution: bool = True,
+    ) -> Tuple[
+        Optional[CurrentConditionsResponse],
+        Optional[CurrentPollutionIndexResponse],
+    ]:
+        # the two endpoints don't depend on each other, so fetch them side by
+        # side and skip whichever one the caller doesn't need
+        conditions, pollution = await asyncio.gather(
+            self.get_current_weather(latitude, longitude)
+            if weather
+            else _nothing(),
+            self.get_current_pollution(latitude, longitude)
+            if pollution
+            else _nothing(),
+        )
+        return conditions, pollution
+
+    async def _fetch_radar_tile(
         self, x: int, y: int, zoom: int, layer: str
-    ) -> Image.Image:
-        resp = self.disk_cache.get(f"/{zoom}/{x}/{y}/{layer}.png")
-        buf = BytesIO()
-        if resp is not None:
-            buf.write(resp)
-            buf.seek(0)
-        else:
-            async with aiohttp.ClientSession() as sess:
-                async with sess.get(
-                    url=URL.build(
-                        scheme="https",
-                        host="tile.openweathermap.org",
-                        path=f"/map/{layer}/{zoom}/{x}/{y}.png",
-                        query={"appid": self.token},
-                    )
-                ) as resp:
-                    buf = BytesIO()
-                    buf.write(await resp.read())
-                    buf.seek(0)
-                    self.disk_cache.put(
-                        f"/{zoom}/{x}/{y}/{layer}.png", buf.read()
-                    )
-                    buf.seek(0)
-        img: Image.Image = Image.open(buf)
-        img.load()
-        return img
-
-    async def radar_image(
-        self, latitude: float, longitude: float, zoom: int, layer: str
-    ) -> Image.Image:
-        tiles, location = get_tiles(latitude, longitude, zoom)
-        images = [
-            await self._radar_tile(tile[0], tile[1], zoom, layer)
-            for tile in [
-                (tiles[0], tiles[1]),
-                (tiles[0], tiles[3]),
-                (tiles[2], tiles[1]),
-                (tiles[2], tiles[3]),
-            ]
+    ) -> bytes:
+        async with self.http.get(
+            url=URL.build(
+                scheme="https",
+                host="tile.openweathermap.org",
+                path=f"/map/{layer}/{zoom}/{x}/{y}.png",
+                query={"appid": self.token},
+            )
+        ) as resp:
+            resp.raise_for_status()
+            return await resp.read()
+
+    async def _fetch_timed_tile(
+        self, x: int, y: int, zoom: int, layer: str, timestamp: int
+    ) -> bytes:
+        async with self.http.get(
+            url=URL.build(
+                scheme="https",
+                host="maps.openweathermap.org",
+                path=f"/maps/2.0/weather/{TIMED_LAYERS[layer]}/{zoom}/{x}/{y}",
+                query={"appid": self.token, "date": timestamp},
+            )
+        ) as resp:
+            resp.raise_for_status()
+            return await resp.read()
+
+    async def radar_frames(
+        self,
+        latitude: float,
+        longitude: float,
+        zoom: int,
+        layer: str,
+        timestamps: Sequence[int],
+        size: Tuple[int, int] = (256, 256),
+        scale: float = 1.0,
+    ) -> List[Tuple[TilePlan, List[bytes]]]:
+        # one layer per timestamp, all on the same plan, fetched together
+        plan = plan_tiles(latitude, longitude, zoom, size, scale)
+        data = await gather_bounded(
+            self._tile_cache.get_or_fetch(
+                (plan.zoom, x, y, layer, ts),
+                lambda x=x, y=y, ts=ts: self._fetch_timed_tile(
+                    x, y, plan.zoom, layer, ts
+                ),
+            )
+            for ts in timestamps
+            for x, y in plan.tiles
+        )
+        n = len(plan.tiles)
+        return [
+            (plan, data[i * n : (i + 1) * n]) for i in range(len(timestamps))
         ]
-        return assemble_mosaic(images, location)
+
+    async def radar_tiles(
+        self,
+        latitude: float,
+        longitude: float,
+        zoom: int,
+        layer: str,
+        size: Tuple[int, int] = (256, 256),
+        scale: float = 1.0,
+        supersample: int = 1,
+    ) -> Tuple[TilePlan, List[bytes]]:
+        # encoded tiles in plan order, for callers that only decode them when
+        # they have to. owm only serves 256px tiles
+        plan = plan_tiles(
+            latitude, longitude, zoom, size, scale, supersample=supersample
+        )
+        if self.prefetcher is not None:
+            self.prefetcher.claim(
+                self._tile_cache,
+                [(plan.zoom, x, y, layer) for x, y in plan.tiles],
+            )
+        return plan, await gather_bounded(
+            self._tile_cache.get_or_fetch(
+                (plan.zoom, x, y, layer),
+                # bind the loop variables, these run after the loop is done
+                lambda x=x, y=y: self._fetch_radar_tile(
+                    x, y, plan.zoom, layer
+                ),
+            )
+            for x, y in plan.tiles
+        )
+
+    def prefetch_radar(
+        self,
+        latitude: float,
+        longitude: float,
+        zoom: int,
+        layer: str,
+        size: Tuple[int, int] = (256, 256),
+        scale: float = 1.0,
+        supersample: int = 1,
+    ):
+        # queues the tiles around a radar_tiles call, newest are fetched
+        # first so the zoom levels go ahead of the ring
+        if self.prefetcher is None:
+            return
+        targets = prefetch_targets(
+            lambda z: plan_tiles(
+                latitude, longitude, z, size, scale, supersample=supersample
+            ),
+            zoom,
+        )
+        for z, tiles in targets:
+            for x, y in tiles:
+                self.prefetcher.schedule(
+                    "tile.openweathermap.org",
+                    self._tile_cache,
+                    (z, x, y, layer),
+                    lambda x=x, y=y, z=z: self._fetch_radar_tile(
+                        x, y, z, layer
+                    ),
+                )
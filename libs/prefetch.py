@@ -0,0 +1,248 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from libs.cache import CacheNamespace
+from libs.helpers import TilePlan
+
+_logger = logging.getLogger(__name__)
+
+Tile = Tuple[int, int]
+
+
+def neighbor_ring(tiles: Iterable[Tile], zoom: int) -> List[Tile]:
+    # every tile touching the area but not in it, wrapping around the
+    # antimeridian and stopping at the poles
+    n = 2 ** zoom
+    area = set(tiles)
+    ring = {
+        ((x + dx) % n, y + dy)
+        for x, y in area
+        for dx in (-1, 0, 1)
+        for dy in (-1, 0, 1)
+        if 0 <= y + dy < n
+    }
+    return sorted(ring - area)
+
+
+def prefetch_targets(
+    plan_at: Callable[[int], TilePlan], zoom: int
+) -> List[Tuple[int, List[Tile]]]:
+    """
+    The tiles a follow-up request is most likely to need, as ``(zoom,
+    tiles)`` pairs: the ring around the area ``plan_at(zoom)`` covers, then
+    the same area one zoom level out and one in.
+    """
+    plan = plan_at(zoom)
+    targets = [(plan.zoom, neighbor_ring(plan.tiles, plan.zoom))]
+    for z in (zoom - 1, zoom + 1):
+        if z >= 0:
+            other = plan_at(z)
+            targets.append((other.zoom, list(other.tiles)))
+    return targets
+
+
+@dataclass
+class PrefetchStats:
+    queued: int = 0
+    fetched: int = 0
+    # already cached by the time their turn came
+    cached: int = 0
+    over_budget: int = 0
+    # pushed out of the queue by newer requests
+    dropped: int = 0
+    failed: int = 0
+    # prefetched tiles a later map actually used
+    used: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.used / self.fetched if self.fetched else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.fetched} fetched, {self.used} used "
+            f"({self.hit_rate:.0%} hit rate), {self.cached} already cached, "
+            f"{self.failed} failed, {self.over_budget} over budget, "
+            f"{self.dropped} dropped"
+        )
+
+
+class _Budget:
+    # token bucket holding up to a minute's worth of requests
+    def __init__(self, per_minute: int):
+        self.capacity = per_minute
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity,
+            self.tokens + (now - self.updated) * self.capacity / 60,
+        )
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+@dataclass(frozen=True)
+class _Job:
+    upstream: str
+    namespace: CacheNamespace
+    fetch: Callable[[], Awaitable[bytes]]
+
+
+class TilePrefetcher:
+    """
+    Pulls the tiles around recently requested maps into the tile caches in
+    the background, so zooming in or out or looking up the next town over
+    doesn't start cold. Off unless ``PREFETCH`` is 1.
+
+    Prefetching only runs once no map has been requested for
+    ``PREFETCH_IDLE`` seconds, newest requests first, and each upstream host
+    gets at most ``PREFETCH_BUDGET`` prefetch requests a minute; tiles over
+    budget are skipped rather than queued up for later.
+    """
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        budget: Optional[int] = None,
+        idle: Optional[float] = None,
+        workers: int = 2,
+        max_queue: int = 512,
+    ):
+        self.enabled = (
+            enabled
+            if enabled is not None
+            else os.getenv("PREFETCH", "0") == "1"
+        )
+        self.budget = budget or int(os.getenv("PREFETCH_BUDGET", 120))
+        self.idle = (
+            idle if idle is not None else float(os.getenv("PREFETCH_IDLE", 1))
+        )
+        self.workers = workers
+        self.max_queue = max_queue
+        # newest at the end, that's where the workers take from
+        self._queue: "OrderedDict[Tuple[str, Hashable], _Job]" = OrderedDict()
+        self._budgets: Dict[str, _Budget] = {}
+        # recently prefetched keys not used by a request yet
+        self._prefetched: "OrderedDict[Tuple[str, Hashable], None]" = (
+            OrderedDict()
+        )
+        self._tasks: Set[asyncio.Task] = set()
+        self._last_request = 0.0
+        self.stats = PrefetchStats()
+
+    def claim(self, namespace: CacheNamespace, keys: Iterable[Hashable]):
+        """
+        Called with the tiles a request is about to look up. Pushes
+        prefetching back and counts the prefetched tiles that paid off.
+        """
+        if not self.enabled:
+            return
+        self._last_request = time.monotonic()
+        for key in keys:
+            item = (namespace.name, key)
+            self._queue.pop(item, None)
+            if item in self._prefetched:
+                del self._prefetched[item]
+                self.stats.used += 1
+
+    def schedule(
+        self,
+        upstream: str,
+        namespace: CacheNamespace,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[bytes]],
+    ):
+        if not self.enabled:
+            return
+        item = (namespace.name, key)
+        # requeueing moves it up to the newest end
+        self._queue.pop(item, None)
+        self._queue[item] = _Job(upstream, namespace, fetch)
+        self.stats.queued += 1
+        while len(self._queue) > self.max_queue:
+            self._queue.popitem(last=False)
+            self.stats.dropped += 1
+        self._ensure_workers()
+
+    def _ensure_workers(self):
+        loop = asyncio.get_running_loop()
+        while len(self._tasks) < min(self.workers, len(self._queue)):
+            task = loop.create_task(self._work())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _take_budget(self, upstream: str) -> bool:
+        budget = self._budgets.get(upstream)
+        if budget is None:
+            budget = self._budgets[upstream] = _Budget(self.budget)
+        return budget.take()
+
+    async def _work(self):
+        while self._queue:
+            # stay out of the way of anything a user is waiting on
+            wait = self._last_request + self.idle - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            (name, key), job = self._queue.popitem()
+            if await job.namespace.contains(key):
+                self.stats.cached += 1
+                continue
+            if not self._take_budget(job.upstream):
+                self.stats.over_budget += 1
+                continue
+            try:
+                await job.namespace.fetch(key, job.fetch)
+            except Exception:
+                _logger.debug(
+                    "prefetching %r into %s failed", key, name, exc_info=True
+                )
+                self.stats.failed += 1
+                continue
+            self.stats.fetched += 1
+            self._prefetched[name, key] = None
+            while len(self._prefetched) > self.max_queue * 4:
+                self._prefetched.popitem(last=False)
+
+    async def close(self):
+        self._queue.clear()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,124 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional, TypeVar
+
+_logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# the bot runs threads (the loop's executor, aiohttp's resolver) before the
+# pool starts, and forking those can leave a held lock behind in the child
+_START_METHOD = (
+    "forkserver"
+    if "forkserver" in multiprocessing.get_all_start_methods()
+    else "spawn"
+)
+
+
+class RenderQueueFullError(Exception):
+    pass
+
+
+class RenderPool:
+    """
+    Runs image work off the event loop, in worker processes (``process``) or
+    threads (``thread``), set with ``RENDER_POOL``.
+
+    At most ``RENDER_WORKERS`` jobs run at once and ``RENDER_QUEUE`` more can
+    wait; past that ``run`` raises RenderQueueFullError straight away instead
+    of letting a burst of renders pile up behind each other.
+
+    Jobs are sent to processes by pickling, so ``fn`` has to be a module level
+    function and should take and return plain bytes. Workers are started
+    fresh (forkserver, or spawn where that isn't available) rather than forked
+    from the running bot.
+    """
+
+    def __init__(
+        self,
+        kind: Optional[str] = None,
+        workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+    ):
+        self.kind = kind or os.getenv("RENDER_POOL", "process")
+        if self.kind not in ("process", "thread"):
+            raise ValueError(f"unknown render pool kind {self.kind!r}")
+        self.workers = workers or int(
+            os.getenv("RENDER_WORKERS", min(4, os.cpu_count() or 1))
+        )
+        self.queue_size = (
+            queue_size
+            if queue_size is not None
+            else int(os.getenv("RENDER_QUEUE", 16))
+        )
+        self._executor: Optional[Executor] = None
+        # submitted and not finished yet, running or queued
+        self.outstanding = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = (
+                ProcessPoolExecutor(
+                    self.workers,
+                    mp_context=multiprocessing.get_context(_START_METHOD),
+                )
+                if self.kind == "process"
+                else ThreadPoolExecutor(
+                    self.workers, thread_name_prefix="render"
+                )
+            )
+        return self._executor
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        if self.outstanding >= self.workers + self.queue_size:
+            self.rejected += 1
+            raise RenderQueueFullError
+        loop = asyncio.get_running_loop()
+        job: Future = self._get_executor().submit(fn, *args)
+        self.outstanding += 1
+        # counted down when the job is actually done, not when the caller
+        # stops waiting on it
+        job.add_done_callback(
+            lambda _: loop.call_soon_threadsafe(self._finished)
+        )
+        try:
+            return await asyncio.wrap_future(job)
+        except BrokenProcessPool:
+            # a worker died, start a fresh pool for the next job
+            _logger.error("render pool broke, restarting it")
+            self._executor = None
+            raise
+
+    def _finished(self):
+        self.outstanding -= 1
+
+    async def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,64 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+import asyncio
+from collections import Counter
+from typing import Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one in-flight request.
+
+    Keys are tuples whose first item is a namespace (``("weather", lat, lon)``)
+    so the counters can be broken down per call type.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Tuple[Hashable, ...], asyncio.Future] = {}
+        self.calls: Counter = Counter()
+        self.coalesced: Counter = Counter()
+
+    async def do(
+        self, key: Tuple[Hashable, ...], fn: Callable[[], Awaitable[T]]
+    ) -> T:
+        self.calls[key[0]] += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.coalesced[key[0]] += 1
+        # shield so one caller timing out or being cancelled doesn't take the
+        # request down for everyone else waiting on it
+        return await asyncio.shield(task)
+
+    def _done(self, key: Tuple[Hashable, ...], task: asyncio.Future):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # mark the exception as retrieved, every waiter already got it
+        if not task.cancelled():
+            task.exception()
+
+    def pending(self, key: Tuple[Hashable, ...]) -> bool:
+        return key in self._in_flight
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
@@ -0,0 +1,239 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+
+_logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SQLiteStore:
+    """
+    Persistent cache tier backed by a single SQLite file.
+
+    It has the same read/put interface as DiskCache so a cache namespace can
+    use either. Writes are buffered in memory and flushed in batches by a
+    background task (write-behind), and ``recent`` lets the owner bulk load
+    the newest rows at startup. The file is opened, and its size counted,
+    the first time it's needed (or by ``open``), which should be on the
+    executor.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        age_limit: Optional[timedelta] = None,
+        max_bytes: Optional[int] = None,
+        flush_interval: timedelta = timedelta(seconds=5),
+    ):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.age_limit = age_limit
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Tuple[bytes, float]] = {}
+        self._flusher: Optional[asyncio.Task] = None
+        self.total_bytes = 0
+
+    def open(self):
+        if self._conn is not None:
+            return
+        with self._lock:
+            if self._conn is not None:
+                return
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("pragma journal_mode=wal")
+            conn.execute(
+                "create table if not exists entries ("
+                "key text primary key, value blob not null, "
+                "stored_at real not null)"
+            )
+            conn.execute(
+                "create index if not exists entries_stored_at "
+                "on entries (stored_at)"
+            )
+            conn.commit()
+            self._conn = conn
+        self.total_bytes = self._size()
+
+    def _size(self) -> int:
+        with self._lock:
+            (size,) = self._conn.execute(
+                "select coalesce(sum(length(value)), 0) from entries"
+            ).fetchone()
+        return size
+
+    def _cutoff(self) -> float:
+        return (
+            time.time() - self.age_limit.total_seconds()
+            if self.age_limit
+            else 0
+        )
+
+    def read(self, path: str, fn: Callable[[bytes], T]) -> Optional[T]:
+        self.open()
+        with self._lock:
+            pending = self._pending.get(path)
+            if pending is not None:
+                value = pending[0]
+            else:
+                row = self._conn.execute(
+                    "select value from entries where key = ? "
+                    "and stored_at >= ?",
+                    (path, self._cutoff()),
+                ).fetchone()
+                if row is None:
+                    return None
+                value = row[0]
+        return fn(value)
+
+    def exists(self, path: str) -> bool:
+        self.open()
+        with self._lock:
+            if path in self._pending:
+                return True
+            row = self._conn.execute(
+                "select 1 from entries where key = ? and stored_at >= ?",
+                (path, self._cutoff()),
+            ).fetchone()
+            return row is not None
+
+    def delete(self, path: str):
+        self.open()
+        with self._lock:
+            self._pending.pop(path, None)
+            self._conn.execute("delete from entries where key = ?", (path,))
+            self._conn.commit()
+
+    def get(self, path: str) -> Optional[bytes]:
+        return self.read(path, bytes)
+
+    def recent(self, limit: int) -> List[Tuple[str, bytes]]:
+        # newest first, for bulk loading the hot set at startup
+        self.open()
+        with self._lock:
+            return self._conn.execute(
+                "select key, value from entries where stored_at >= ? "
+                "order by stored_at desc limit ?",
+                (self._cutoff(), limit),
+            ).fetchall()
+
+    async def exists_async(self, path: str) -> bool:
+        # waits on the lock a flush holds, so never on the loop
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.exists, path
+        )
+
+    async def get_async(self, path: str) -> Optional[bytes]:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.get, path
+        )
+
+    async def read_async(
+        self, path: str, fn: Callable[[bytes], T]
+    ) -> Optional[T]:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.read, path, fn
+        )
+
+    def put(self, path: str, buf: bytes):
+        with self._lock:
+            self._pending[path] = (buf, time.time())
+
+    async def put_async(self, path: str, buf: bytes):
+        # only a dict insert, but behind the lock a flush holds
+        await asyncio.get_running_loop().run_in_executor(
+            None, self.put, path, buf
+        )
+        self._ensure_flusher()
+
+    def flush(self) -> int:
+        self.open()
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if pending:
+                self._conn.executemany(
+                    "insert or replace into entries (key, value, stored_at) "
+                    "values (?, ?, ?)",
+                    [
+                        (key, value, stored_at)
+                        for key, (value, stored_at) in pending.items()
+                    ],
+                )
+            self._conn.execute(
+                "delete from entries where stored_at < ?", (self._cutoff(),)
+            )
+            self._conn.commit()
+        self.total_bytes = self._size()
+        if self.max_bytes is not None and self.total_bytes > self.max_bytes:
+            self._trim()
+        return len(pending)
+
+    def _trim(self):
+        # drop the oldest rows until we're back under budget
+        with self._lock:
+            rows = self._conn.execute(
+                "select key, length(value) from entries order by stored_at"
+            ).fetchall()
+            excess = self.total_bytes - self.max_bytes
+            victims = []
+            for key, size in rows:
+                if excess <= 0:
+                    break
+                victims.append((key,))
+                excess -= size
+            self._conn.executemany(
+                "delete from entries where key = ?", victims
+            )
+            self._conn.commit()
+        self.total_bytes = self._size()
+
+    def _ensure_flusher(self):
+        if self._flusher is not None and not self._flusher.done():
+            return
+        self._flusher = asyncio.get_running_loop().create_task(
+            self._flush_forever()
+        )
+
+    async def _flush_forever(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.flush_interval.total_seconds())
+            try:
+                await loop.run_in_executor(None, self.flush)
+            except Exception:
+                _logger.exception("flushing %s failed", self.path)
+
+    def close(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        if self._conn is None and not self._pending:
+            return
+        self.flush()
+        with self._lock:
+            self._conn.close()
+            self._conn = None
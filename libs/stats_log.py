@@ -0,0 +1,67 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+import asyncio
+import logging
+import os
+from typing import Callable, List, Optional, Tuple
+
+_logger = logging.getLogger(__name__)
+
+
+class StatsLog:
+    """
+    Logs what the caches, renderer and prefetcher have been up to at INFO,
+    every ``STATS_INTERVAL`` seconds (0 turns the periodic log off) and once
+    more on close. Each source is a name and a callable returning a one line
+    summary.
+    """
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = (
+            interval
+            if interval is not None
+            else float(os.getenv("STATS_INTERVAL", 900))
+        )
+        self._sources: List[Tuple[str, Callable[[], str]]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, name: str, summary: Callable[[], str]):
+        self._sources.append((name, summary))
+
+    def log(self):
+        for name, summary in self._sources:
+            try:
+                _logger.info("%s: %s", name, summary())
+            except Exception:
+                _logger.exception("summarizing %s failed", name)
+
+    def start(self):
+        if self.interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(
+                self._log_forever()
+            )
+
+    async def _log_forever(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.log()
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.log()
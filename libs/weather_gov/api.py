@@ -15,34 +15,43 @@ COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER I
 OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
 import json
+from datetime import timedelta
 
 import aiohttp
-from expiringdict import ExpiringDict
 
+from libs.cache import CacheManager
+from libs.http import HTTPClient
 from libs.weather_gov.models import WeatherGovPoint
 
 
 # noinspection PyMethodMayBeStatic
 class WeatherGovAPI:
-    def __init__(self):
-        self._cache = ExpiringDict(
-            max_len=1000, max_age_seconds=60 * 60 * 12
-        )  # expire in 12h
+    def __init__(self, http: HTTPClient, cache: CacheManager):
+        self.http = http
+        self._cache = cache.namespace("nws-points", model=WeatherGovPoint)
+        # points outside the us (404) or off the grid (400) aren't going to
+        # start working in the next few hours
+        for status in (400, 404):
+            self._cache.negative.register(
+                aiohttp.ClientResponseError, timedelta(hours=6), status=status
+            )
 
     async def lookup_point(
         self, latitude: float, longitude: float
     ) -> WeatherGovPoint:
         latitude = round(latitude, 3)
         longitude = round(longitude, 3)
-        res = self._cache.get((latitude, longitude), None)
-        if res is not None:
-            return res
-        async with aiohttp.ClientSession() as sess:
-            async with sess.get(
-                f"https://api.weather.gov/points/{latitude},{longitude}"
-            ) as resp:
-                resp.raise_for_status()  # TODO intelligent errors here
-                content = json.dumps(await resp.json())
-                res = WeatherGovPoint.from_json(content)
-                self._cache[(latitude, longitude)] = res
-                return res
+        return await self._cache.get_or_fetch(
+            (latitude, longitude),
+            lambda: self._fetch_point(latitude, longitude),
+        )
+
+    async def _fetch_point(
+        self, latitude: float, longitude: float
+    ) -> WeatherGovPoint:
+        async with self.http.get(
+            f"https://api.weather.gov/points/{latitude},{longitude}"
+        ) as resp:
+            resp.raise_for_status()  # TODO intelligent errors here
+            content = json.dumps(await resp.json())
+            return WeatherGovPoint.from_json(content)
@@ -22,9 +22,17 @@ from pathlib import Path
 import dotenv
 
 from bot import LoggingHandler
+from bot.converters import parse_datetime
 from libs.astro_data import AstronomyClient
+from libs.astro_data.snapshot import load_catalogs
 from libs.astronomy import AstronomyEventAPI
+from libs.cache import CacheManager
+from libs.http import HTTPClient
+from libs.lazy import Lazy, warmup
 from libs.nasa import NasaAPI
+from libs.prefetch import TilePrefetcher
+from libs.render_pool import RenderPool
+from libs.stats_log import StatsLog
 from module_services.geocoding import Geocoder
 
 dotenv.load_dotenv()
@@ -40,36 +48,6 @@ from bot.impl import DatabaseImpl  # noqa E402
 from module_services.bot import BotUtils  # noqa E402
 from module_services.weather import WeatherAPI  # noqa E402
 
-db = DatabaseImpl.connect()
-
-with open("data/catalog.txt") as stellarium_fp, open(
-    "data/NGC.csv"
-) as open_ngc_fp, open("data/HYG.csv") as hyg_csv, open(
-    "data/constellations.json"
-) as constellations:
-    astro_client = AstronomyClient(
-        stellarium_fp, open_ngc_fp, hyg_csv, constellations
-    )
-
-bot = hikari.GatewayBot(token=os.getenv("TOKEN"))
-client = (
-    tanjun.Client.from_gateway_bot(
-        bot,
-        declare_global_commands=int(os.getenv("GUILD"))
-        if os.getenv("GUILD")
-        else True,
-    )  # noqa E131
-    .set_type_dependency(WeatherAPI, WeatherAPI())
-    .set_type_dependency(DatabaseProto, db)
-    .set_type_dependency(AstronomyEventAPI, AstronomyEventAPI())
-    .set_type_dependency(Geocoder, Geocoder())
-    .set_type_dependency(NasaAPI, NasaAPI())
-    .set_type_dependency(BotUtils, BotUtils())
-    .set_type_dependency(AstronomyClient, astro_client)
-    .set_auto_defer_after(0.1)
-    .load_modules(*Path("./modules").glob("**/*.py"))
-)
-
 
 async def clear_commands():
     async with hikari.RESTApp().acquire(
@@ -79,7 +57,82 @@ async def clear_commands():
             await rest_client.clear_commands()
 
 
-if os.getenv("CLEAR"):
-    asyncio.run(clear_commands())
+def main():
+    # everything with side effects lives here: render pool workers import
+    # this module again when they start, and must not start a second bot
+    db = DatabaseImpl.connect()
+    http = HTTPClient()
+    cache = CacheManager()
+    render_pool = RenderPool()
+    prefetcher = TilePrefetcher()
+    stats_log = StatsLog()
+    weather = WeatherAPI(http, cache, render_pool, prefetcher)
+    stats_log.add("cache", cache.summary)
+    stats_log.add("owm cell hit rates", weather.owm_api.hit_rate_summary)
+    stats_log.add("weather maps", weather.renderer.stats.summary)
+    if prefetcher.enabled:
+        stats_log.add("tile prefetch", prefetcher.stats.summary)
+
+    # loaded in the background once connected (or by the first command that
+    # needs them), see on_started
+    astro_client = Lazy(
+        "astronomy catalogs",
+        lambda: AstronomyClient(
+            *load_catalogs(
+                "data", os.getenv("ASTRO_SNAPSHOT", "data/snapshot")
+            )
+        ),
+    )
+    astro_events = Lazy("ephemerides", AstronomyEventAPI)
+    date_parser = Lazy("dateparser", lambda: parse_datetime("today"))
+
+    bot = hikari.GatewayBot(token=os.getenv("TOKEN"))
+    (
+        tanjun.Client.from_gateway_bot(
+            bot,
+            declare_global_commands=(
+                int(os.getenv("GUILD")) if os.getenv("GUILD") else True
+            ),
+        )  # noqa E131
+        .set_type_dependency(HTTPClient, http)
+        .set_type_dependency(CacheManager, cache)
+        .set_type_dependency(RenderPool, render_pool)
+        .set_type_dependency(WeatherAPI, weather)
+        .set_type_dependency(DatabaseProto, db)
+        .set_type_dependency(Lazy[AstronomyEventAPI], astro_events)
+        .set_type_dependency(Geocoder, Geocoder(http, cache))
+        .set_type_dependency(NasaAPI, NasaAPI(http, cache))
+        .set_type_dependency(BotUtils, BotUtils())
+        .set_type_dependency(Lazy[AstronomyClient], astro_client)
+        .set_auto_defer_after(0.1)
+        .add_client_callback(
+            tanjun.ClientCallbackNames.CLOSING, prefetcher.close
+        )
+        .add_client_callback(
+            tanjun.ClientCallbackNames.CLOSING, stats_log.close
+        )
+        .add_client_callback(tanjun.ClientCallbackNames.CLOSING, http.close)
+        .add_client_callback(tanjun.ClientCallbackNames.CLOSING, cache.close)
+        .add_client_callback(
+            tanjun.ClientCallbackNames.CLOSING, render_pool.close
+        )
+        .load_modules(*Path("./modules").glob("**/*.py"))
+    )
+
+    @bot.listen(hikari.StartedEvent)
+    async def on_started(_: hikari.StartedEvent):
+        # the cache's disk index and preloads, which would otherwise be built
+        # by the first lookup in each namespace
+        await cache.warmup()
+        stats_log.start()
+        if os.getenv("WARMUP", "1") == "1":
+            await warmup(astro_client, astro_events, date_parser)
+
+    if os.getenv("CLEAR"):
+        asyncio.run(clear_commands())
+
+    bot.run()
+
 
-bot.run()
+if __name__ == "__main__":
+    main()
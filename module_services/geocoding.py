@@ -16,16 +16,27 @@ OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
 """
 import os
 import re
+import unicodedata
+from datetime import timedelta
 from typing import Tuple, Optional
 
+from libs.cache import CacheManager
 from libs.googlemaps import GoogleMapsAPI
+from libs.http import HTTPClient
 from libs.openweathermap import CityNotFoundError
 
 
 # noinspection PyMethodMayBeStatic
 class Geocoder:
-    def __init__(self):
-        self.gmaps_api = GoogleMapsAPI(os.getenv("GMAPS"))
+    def __init__(self, http: HTTPClient, cache: CacheManager):
+        self.gmaps_api = GoogleMapsAPI(os.getenv("GMAPS"), http, cache)
+        # canonical query -> (lat, lon), persisted in sqlite so a restart
+        # doesn't have to geocode everything again
+        self._places = cache.namespace("geocode-places", model=tuple)
+        # typos get retried, don't send every retry to google
+        self._places.negative.register(
+            CityNotFoundError, timedelta(minutes=30)
+        )
 
     async def parse_location(self, location) -> Tuple[float, float]:
         # try to parse lat/long first
@@ -33,7 +44,12 @@ class Geocoder:
         if res is not None:
             return res
 
-        # try to geocode with google maps
+        # then the place store, and only then google maps
+        return await self._places.get_or_fetch(
+            self.canonicalize(location), lambda: self._geocode(location)
+        )
+
+    async def _geocode(self, location: str) -> Tuple[float, float]:
         try:
             res = (
                 (await self.gmaps_api.geocode(location))
@@ -44,6 +60,12 @@ class Geocoder:
         except IndexError:
             raise CityNotFoundError
 
+    def canonicalize(self, location: str) -> str:
+        # "Chicago, IL", "chicago il" and " CHICAGO,  IL." are the same place
+        location = unicodedata.normalize("NFKC", location).casefold()
+        location = re.sub(r"[^\w\s-]", " ", location)
+        return " ".join(location.split())
+
     def try_parse_lat_long(self, value: str) -> Optional[Tuple[float, float]]:
         value = value.replace("°", "")
         value = re.sub(r"\s([news])", "$1", value.lower())
@@ -1,27 +1,60 @@
+import asyncio
+import functools
 import os
+import time
 from datetime import datetime
-from io import BytesIO
-from typing import Union
+from typing import Awaitable, Callable, Optional, Tuple, Union
 
 import aiohttp
 import hikari
 
 from bot.proto.database import UserSettings
+from libs.cache import CacheManager, Staleness, track_staleness
+from libs.encoders import extension_for
+from libs.http import HTTPClient
+from libs.map_render import MapRenderer, loop_format
 from libs.maptiler import MapTilerAPI
 from libs.openweathermap import OpenWeatherMapAPI
+from libs.prefetch import TilePrefetcher
+from libs.render_pool import RenderPool
 from libs.weather_gov import WeatherGovAPI
 from module_services.bot import BotUtils
 from module_services.geocoding import Geocoder
 
 
+def marks_staleness(
+    fn: Callable[..., Awaitable[hikari.Embed]]
+) -> Callable[..., Awaitable[hikari.Embed]]:
+    # footer note on embeds built from stale cache entries
+    @functools.wraps(fn)
+    async def wrapper(self: "WeatherAPI", *args, **kwargs) -> hikari.Embed:
+        with track_staleness() as stale:
+            embed = await fn(self, *args, **kwargs)
+        return self.mark_stale(embed, stale)
+
+    return wrapper
+
+
 # noinspection PyMethodMayBeStatic
 class WeatherAPI(BotUtils, Geocoder):
-    def __init__(self):
-        super(WeatherAPI, self).__init__()
-        self.owm_api = OpenWeatherMapAPI(os.getenv("OWM"))
-        self.weather_gov_api = WeatherGovAPI()
-        self.map_api = MapTilerAPI(os.getenv("MAPTILER"))
+    def __init__(
+        self,
+        http: HTTPClient,
+        cache: CacheManager,
+        render_pool: RenderPool,
+        prefetcher: Optional[TilePrefetcher] = None,
+    ):
+        super(WeatherAPI, self).__init__(http, cache)
+        self.owm_api = OpenWeatherMapAPI(
+            os.getenv("OWM"), http, cache, prefetcher=prefetcher
+        )
+        self.weather_gov_api = WeatherGovAPI(http, cache)
+        self.map_api = MapTilerAPI(
+            os.getenv("MAPTILER"), http, cache, prefetcher=prefetcher
+        )
+        self.renderer = MapRenderer(cache, render_pool)
 
+    @marks_staleness
     async def current_pollution(self, city: str) -> hikari.Embed:
         lat, lon = await self.parse_location(city)
         conditions, pollution = await self.owm_api.get_current_conditions(
@@ -37,6 +70,7 @@ class WeatherAPI(BotUtils, Geocoder):
             ),
         )
 
+    @marks_staleness
     async def forecast(
         self, city: str, settings: UserSettings
     ) -> hikari.Embed:
@@ -60,6 +94,7 @@ class WeatherAPI(BotUtils, Geocoder):
         )
         return embed
 
+    @marks_staleness
     async def current_conditions(
         self, city: str, settings: UserSettings
     ) -> hikari.Embed:
@@ -109,22 +144,34 @@ class WeatherAPI(BotUtils, Geocoder):
             )
         return embed
 
+    @marks_staleness
     async def radar_map(self, city: str) -> hikari.Embed:
         lat, lon = await self.parse_location(city)
+        # only the city name is needed from owm, so skip pollution and look
+        # it up alongside the nws point
+        lookup = asyncio.ensure_future(
+            self.owm_api.get_current_conditions(lat, lon, pollution=False)
+        )
         try:
-            data = (
-                await self.weather_gov_api.lookup_point(lat, lon)
-            ).properties
-        except aiohttp.ClientResponseError as e:
-            return self.error_embed(
-                title="Lookup error", description=e.message
-            )
-        except IndexError:
-            return self.error_embed(
-                title="Lookup error",
-                description="No data was available for the specified location",
-            )
-        conditions, _ = await self.owm_api.get_current_conditions(lat, lon)
+            try:
+                data = (
+                    await self.weather_gov_api.lookup_point(lat, lon)
+                ).properties
+            except aiohttp.ClientResponseError as e:
+                return self.error_embed(
+                    title="Lookup error", description=e.message
+                )
+            except IndexError:
+                return self.error_embed(
+                    title="Lookup error",
+                    description="No data was available for the specified "
+                    "location",
+                )
+            conditions, _ = await lookup
+        finally:
+            # whichever way this leaves, don't leave the owm request behind.
+            # a no-op once it's been awaited
+            lookup.cancel()
         if data.radar_station:
             embed = self.ok_embed(
                 title=f"**Radar for {conditions.city_name}, {conditions.sys.country}**",
@@ -140,6 +187,19 @@ class WeatherAPI(BotUtils, Geocoder):
             )
         return embed
 
+    def mark_stale(
+        self, embed: hikari.Embed, stale: Staleness
+    ) -> hikari.Embed:
+        if not stale:
+            return embed
+        note = (
+            f"⚠️ Upstream unavailable, data is "
+            f"{max(1, round(stale.age / 60))} min old"
+        )
+        if embed.footer and embed.footer.text:
+            note = f"{embed.footer.text} | {note}"
+        return embed.set_footer(text=note)
+
     def icon_url_for(self, icon: str) -> str:
         return f"http://openweathermap.org/img/wn/{icon}@2x.png"
 
@@ -166,6 +226,7 @@ class WeatherAPI(BotUtils, Geocoder):
         ix = round(deg / (360.0 / len(dirs)))
         return dirs[ix % len(dirs)]
 
+    @marks_staleness
     async def point_data(self, lat: float, lon: float) -> hikari.Embed:
         try:
             data = (
@@ -196,25 +257,72 @@ class WeatherAPI(BotUtils, Geocoder):
         return embed
 
     async def raw_weather_map(
-        self, city: str, zoom: int, layer: str
-    ) -> BytesIO:
+        self,
+        city: str,
+        zoom: int,
+        layer: str,
+        size: Tuple[int, int] = (256, 256),
+        scale: float = 1.0,
+    ) -> bytes:
         lat, lon = await self.parse_location(city)
-        buf = BytesIO()
-        layer_img = await self.owm_api.radar_image(lat, lon, zoom, layer)
-        # make the layer a bit more transparent so we have bounds still
-        # TODO use a vector layer to put on top maybe..?
-        alpha = layer_img.split()[3].point(lambda i: i / 1.4)
-        osm_img = await self.map_api.get_map_image(lat, lon, zoom)
-        osm_img.paste(layer_img, (0, 0), mask=alpha)
-        osm_img.save(buf, format="png")
-        buf.seek(0)
-        return buf
+        # only the encoded tiles are fetched here, the renderer skips
+        # decoding them entirely if it has already drawn this exact map
+        radar, (satellite, hillshade) = await asyncio.gather(
+            self.owm_api.radar_tiles(lat, lon, zoom, layer, size, scale),
+            self.map_api.map_tiles(lat, lon, zoom, size, scale),
+        )
+        # follow-ups at the next zoom level or a nearby town are common, get
+        # their tiles in while nobody's waiting
+        self.owm_api.prefetch_radar(lat, lon, zoom, layer, size, scale)
+        self.map_api.prefetch_map(lat, lon, zoom, size, scale)
+        return await self.renderer.render(
+            (zoom, layer), radar, satellite, hillshade
+        )
 
     async def weather_map(
-        self, city: str, zoom: int, layer: str
+        self,
+        city: str,
+        zoom: int,
+        layer: str,
+        size: Tuple[int, int] = (256, 256),
+        scale: float = 1.0,
     ) -> hikari.Embed:
+        data = await self.raw_weather_map(city, zoom, layer, size, scale)
         return hikari.Embed(title=f"{layer.title()} Map for {city}").set_image(
-            await self.raw_weather_map(city, zoom, layer)
+            hikari.Bytes(data, f"{layer}-map.{extension_for(data)}")
+        )
+
+    async def weather_loop(
+        self,
+        city: str,
+        zoom: int,
+        layer: str,
+        size: Tuple[int, int] = (256, 256),
+        scale: float = 1.0,
+        frames: int = 6,
+    ) -> hikari.Embed:
+        lat, lon = await self.parse_location(city)
+        # hourly frames, ending at the last full hour
+        now = int(time.time()) // 3600 * 3600
+        timestamps = [now - 3600 * i for i in reversed(range(frames))]
+        radar, (satellite, hillshade) = await asyncio.gather(
+            self.owm_api.radar_frames(
+                lat, lon, zoom, layer, timestamps, size, scale
+            ),
+            self.map_api.map_tiles(lat, lon, zoom, size, scale),
+        )
+        fmt = loop_format()
+        data = await self.renderer.render_loop(
+            (zoom, layer), radar, satellite, hillshade, fmt
         )
+        return hikari.Embed(
+            title=f"{layer.title()} Loop for {city}",
+            description=f"Past {frames} hours",
+        ).set_image(hikari.Bytes(data, f"{layer}-loop.{fmt}"))
 
     MAP_TYPES = {"clouds", "precipitation", "pressure", "wind", "temperature"}
+    MAP_SIZES = {
+        "Small (256x256)": "256x256",
+        "Medium (512x512)": "512x512",
+        "Wide (1024x768)": "1024x768",
+    }
@@ -17,12 +17,13 @@ OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
 from datetime import datetime
 
 import tanjun
-from skyfield.errors import EphemerisRangeError
 
 from bot.converters import parse_datetime
 from libs.astro_data import AstronomyClient
+from libs.astro_data.search import SearchHit
 from libs.astronomy import AstronomyEventAPI
 from libs.helpers import ra_to_str, dd_to_str_dms
+from libs.lazy import Lazy
 from libs.nasa import NasaAPI, APOD
 from module_services.bot import BotUtils
 
@@ -38,6 +39,9 @@ hooks = tanjun.SlashHooks()
 
 @hooks.with_on_error
 async def on_error(ctx: tanjun.SlashContext, error: Exception) -> bool:
+    # skyfield is imported on first use, see libs/astronomy/api.py
+    from skyfield.errors import EphemerisRangeError
+
     ctx.set_ephemeral_default(True)
     if isinstance(error, EphemerisRangeError):
         await ctx.respond(
@@ -53,9 +57,12 @@ async def on_error(ctx: tanjun.SlashContext, error: Exception) -> bool:
 async def seasons(
     ctx: tanjun.SlashContext,
     year: int,
-    _api: AstronomyEventAPI = tanjun.injected(type=AstronomyEventAPI),
+    _api: Lazy[AstronomyEventAPI] = tanjun.injected(
+        type=Lazy[AstronomyEventAPI]
+    ),
     _bot: BotUtils = tanjun.injected(type=BotUtils),
 ):
+    api = await _api.aget()
     await ctx.respond(
         embed=_bot.ok_embed(
             title=f"Seasons for {year}",
@@ -68,7 +75,7 @@ async def seasons(
                         "September Equinox",
                         "December Solstice",
                     ],
-                    _api.seasons(year).formatted_times,
+                    api.seasons(year).formatted_times,
                 )
             ),
         )
@@ -109,13 +116,16 @@ async def date_data(
 async def date_data(
     ctx: tanjun.SlashContext,
     date: datetime,
-    _api: AstronomyEventAPI = tanjun.injected(type=AstronomyEventAPI),
+    _api: Lazy[AstronomyEventAPI] = tanjun.injected(
+        type=Lazy[AstronomyEventAPI]
+    ),
     _bot: BotUtils = tanjun.injected(type=BotUtils),
 ):
+    api = await _api.aget()
     await ctx.respond(
         embed=_bot.ok_embed(
             title=f"Data for {date.strftime('%b %d %Y')}",
-            description=f"**Moon**: {_api.moon_phase(date.year, date.month, date.day)}",
+            description=f"**Moon**: {api.moon_phase(date.year, date.month, date.day)}",
         )
     )
 
@@ -136,10 +146,11 @@ async def constellation_orthographic(
     ctx: tanjun.SlashContext,
     constellation: str,
     type: str,
-    _dso: AstronomyClient = tanjun.injected(type=AstronomyClient),
+    _dso: Lazy[AstronomyClient] = tanjun.injected(type=Lazy[AstronomyClient]),
     _bot: BotUtils = tanjun.injected(type=BotUtils),
 ):
-    const = _dso.constellation(constellation)
+    dso = await _dso.aget()
+    const = dso.constellation(constellation)
     if type == "orthographic":
         desc = f"**{const.english_name}**\n"
         if const.named_stars:
@@ -166,17 +177,18 @@ async def constellation_orthographic(
 @tanjun.as_slash_command("list", "List all 88 constellations")
 async def constellation_list(
     ctx: tanjun.SlashContext,
-    _dso: AstronomyClient = tanjun.injected(type=AstronomyClient),
+    _dso: Lazy[AstronomyClient] = tanjun.injected(type=Lazy[AstronomyClient]),
     _bot: BotUtils = tanjun.injected(type=BotUtils),
 ):
     ctx.set_ephemeral_default(True)
+    dso = await _dso.aget()
     await ctx.respond(
         _bot.ok_embed(
             title="Constellation List",
             description="\n".join(
                 f"`{constellation.iau}` - {constellation.native_name} - "
                 f"{constellation.english_name}"
-                for constellation in _dso.constellations
+                for constellation in dso.constellations
             ),
         )
     )
@@ -187,22 +199,29 @@ async def constellation_list(
 @tanjun.with_str_slash_option(
     "catalog",
     "The type of object to look up",
-    choices={"Messier": "m", "NGC": "ngc"},
+    choices={"Messier": "m", "NGC": "ngc", "IC": "ic"},
+)
+@tanjun.as_slash_command(
+    "lookup-object", "Look up a Messier, NGC or IC object"
 )
-@tanjun.as_slash_command("lookup-object", "Look up a Messier or NGC object")
 async def lookup_object(
     ctx: tanjun.SlashContext,
     catalog: str,
     number: int,
-    _dso: AstronomyClient = tanjun.injected(type=AstronomyClient),
+    _dso: Lazy[AstronomyClient] = tanjun.injected(type=Lazy[AstronomyClient]),
     _bot: BotUtils = tanjun.injected(type=BotUtils),
 ):
-    obj = _dso.ngc(number) if catalog == "ngc" else _dso.m(number)
+    dso = await _dso.aget()
+    obj = dso.lookup(catalog, number)
     if obj:
-        other_catalog_id = obj.m if catalog == "ngc" else obj.ngc
+        other_catalog_ids = [
+            f"{other.upper()}{getattr(obj, other):>04}"
+            for other in ("m", "ngc", "ic")
+            if other != catalog and getattr(obj, other)
+        ]
         other_catalog_str = (
-            f"Also known as **{'M' if catalog == 'ngc' else 'NGC'}{other_catalog_id:>04}**\n"
-            if other_catalog_id
+            f"Also known as **{', '.join(other_catalog_ids)}**\n"
+            if other_catalog_ids
             else ""
         )
         await ctx.respond(
@@ -220,6 +239,38 @@ async def lookup_object(
         await ctx.respond(f"Object not found in {catalog.upper()} catalog")
 
 
+def _describe(hit: SearchHit) -> str:
+    if hit.kind == "star":
+        return f"**{hit.name}** - Star in {hit.item.constellation or '-'}"
+    if hit.kind == "constellation":
+        return f"**{hit.name}** - Constellation `{hit.item.iau}`"
+    return f"**{hit.name}** - {hit.item.pretty_type} `{hit.item.designation}`"
+
+
+@astro_group.with_command
+@tanjun.with_str_slash_option("query", "Name or part of a name")
+@tanjun.as_slash_command(
+    "search", "Search stars, constellations and deep sky objects by name"
+)
+async def search(
+    ctx: tanjun.SlashContext,
+    query: str,
+    _dso: Lazy[AstronomyClient] = tanjun.injected(type=Lazy[AstronomyClient]),
+    _bot: BotUtils = tanjun.injected(type=BotUtils),
+):
+    dso = await _dso.aget()
+    hits = dso.search(query)
+    if not hits:
+        await ctx.respond(f"Nothing found for `{query}`")
+        return
+    await ctx.respond(
+        embed=_bot.ok_embed(
+            title=f"Results for {query}",
+            description="\n".join(_describe(hit) for hit in hits),
+        )
+    )
+
+
 @tanjun.as_loader
 def load_component(client: tanjun.Client) -> None:
     client.add_component(component.copy())
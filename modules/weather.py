@@ -19,7 +19,9 @@ import tanjun
 from PIL import UnidentifiedImageError
 
 from bot.proto import DatabaseProto
+from libs.googlemaps import GeocodingError
 from libs.openweathermap import CityNotFoundError
+from libs.render_pool import RenderQueueFullError
 from module_services.weather import WeatherAPI
 
 component = tanjun.Component()
@@ -37,10 +39,16 @@ async def on_error(ctx: tanjun.SlashContext, error: Exception) -> bool:
     ctx.set_ephemeral_default(True)
     if isinstance(error, CityNotFoundError):
         await ctx.respond("City not found")
+    if isinstance(error, GeocodingError):
+        await ctx.respond("Geocoding is unavailable, try again later")
     if isinstance(error, UnidentifiedImageError):
         await ctx.respond(
             "This map doesn't seem to be available for this location"
         )
+    if isinstance(error, RenderQueueFullError):
+        await ctx.respond(
+            "Too many maps are being drawn right now, try again in a moment"
+        )
     return True
 
 
@@ -108,6 +116,18 @@ async def point(
     default="clouds",
     choices={typ.title(): typ for typ in WeatherAPI.MAP_TYPES},
 )
+@tanjun.with_str_slash_option(
+    "size",
+    "Image size",
+    default="256x256",
+    choices=WeatherAPI.MAP_SIZES,
+)
+@tanjun.with_bool_slash_option(
+    "hd", "Draw the map at twice the resolution", default=False
+)
+@tanjun.with_bool_slash_option(
+    "animate", "Loop the past few hours of the layer", default=False
+)
 @tanjun.with_str_slash_option("location", "Location to look up")
 @tanjun.as_slash_command(
     "weather-map", "Look up the weather map for a location", sort_options=True
@@ -117,9 +137,18 @@ async def weather_map(
     zoom: int,
     layer: str,
     location: str,
+    hd: bool,
+    size: str,
+    animate: bool,
     _service: WeatherAPI = tanjun.injected(type=WeatherAPI),
 ):
-    await ctx.respond(embed=await _service.weather_map(location, zoom, layer))
+    width, height = map(int, size.split("x"))
+    render = _service.weather_loop if animate else _service.weather_map
+    await ctx.respond(
+        embed=await render(
+            location, zoom, layer, (width, height), 2.0 if hd else 1.0
+        )
+    )
 
 
 @hooks.add_to_command
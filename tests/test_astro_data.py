@@ -0,0 +1,42 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+from libs.astro_data.api import build_dso_index
+from libs.astro_data.catalog import DsoCatalog
+
+
+def _row(id_: int, ngc: str, ic: str, m: str) -> str:
+    # stellarium catalog.txt, only the id columns filled in
+    columns = ["0"] * 19
+    columns[0], columns[5], columns[6] = str(id_), "G", ""
+    columns[16], columns[17], columns[18] = ngc, ic, m
+    return "\t".join(columns)
+
+
+def test_zero_ids_are_not_in_any_catalog():
+    dsos = DsoCatalog.from_lines(
+        [
+            _row(1, "224", "0", "31"),
+            _row(2, "0", "", "0"),
+            _row(3, "", "1", ""),
+        ]
+    )
+    index = build_dso_index(dsos)
+    assert index["m"] == {31: 0}
+    assert index["ngc"] == {224: 0}
+    assert index["ic"] == {1: 2}
+    assert (dsos[1].ngc, dsos[1].ic, dsos[1].m) == (None, None, None)
+    assert (dsos[0].ngc, dsos[0].m) == (224, 31)
@@ -0,0 +1,188 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+import asyncio
+import pickle
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+
+import aiohttp
+import pytest
+from dataclasses_json import dataclass_json
+
+from libs.cache import CacheManager, NamespaceConfig
+from libs.disk_cache import DiskCache
+
+_MB = 1024 * 1024
+
+
+@dataclass_json
+@dataclass
+class Point:
+    lat: float
+    lon: float
+
+
+def _manager(tmp_path, backend="disk") -> CacheManager:
+    config = NamespaceConfig(timedelta(hours=1), _MB, 4 * _MB, backend=backend)
+    return CacheManager(
+        str(tmp_path), {"models": config, "plain": config, "tiles": config}
+    )
+
+
+async def _reopen(tmp_path, name: str, key, **kwargs):
+    # a fresh manager only has the persisted copy to go on
+    cache = _manager(tmp_path)
+    try:
+        return await cache.namespace(name, **kwargs)._lookup(key)
+    finally:
+        await cache.close()
+
+
+def test_values_round_trip_through_disk(tmp_path):
+    async def run():
+        cache = _manager(tmp_path)
+        await cache.namespace("models", model=Point).put("a", Point(1, 2))
+        await cache.namespace("plain", model=tuple).put("b", (3.0, 4.0))
+        await cache.close()
+        models = await _reopen(tmp_path, "models", "a", model=Point)
+        plain = await _reopen(tmp_path, "plain", "b", model=tuple)
+        assert models.value == Point(1, 2)
+        assert plain.value == (3.0, 4.0)
+
+    asyncio.run(run())
+
+
+def test_raw_entries_keep_their_age(tmp_path):
+    async def run():
+        cache = _manager(tmp_path)
+        tiles = cache.namespace("tiles", raw=True)
+        await tiles.put("t", b"tile")
+        stored_at = tiles._memory["t"].stored_at
+        await cache.close()
+        time.sleep(0.01)
+        entry = await _reopen(tmp_path, "tiles", "t", raw=True)
+        assert entry.value == b"tile"
+        assert entry.stored_at == stored_at
+
+    asyncio.run(run())
+
+
+def test_disk_tiers_are_opened_on_first_use(tmp_path):
+    config = NamespaceConfig(
+        timedelta(hours=1), _MB, 4 * _MB, backend="sqlite", preload=10
+    )
+
+    async def run():
+        cache = _manager(tmp_path)
+        await cache.namespace("tiles", raw=True).put("t", b"tile")
+        places = CacheManager(str(tmp_path), {"places": config})
+        for key in ("a", "b"):
+            await places.namespace("places", model=tuple).put(key, (1, 2))
+        await cache.close()
+        await places.close()
+
+        cache = _manager(tmp_path)
+        tiles = cache.namespace("tiles", raw=True)
+        places = CacheManager(str(tmp_path), {"places": config})
+        ns = places.namespace("places", model=tuple)
+        # nothing read from disk until something asks
+        assert tiles.disk.total_bytes == 0 and not ns._memory
+        await cache.warmup()
+        assert tiles.disk.total_bytes > 0
+        # the first lookup preloads the rest along with it
+        assert await ns.get("a") == (1, 2)
+        assert "b" in ns._memory
+        await cache.close()
+        await places.close()
+
+    asyncio.run(run())
+
+
+def test_lookups_decode_from_the_mapped_file(tmp_path, monkeypatch):
+    def copy(self, path):
+        raise AssertionError("read the entry into a bytes object")
+
+    async def run():
+        cache = _manager(tmp_path)
+        await cache.namespace("tiles", raw=True).put("t", b"tile")
+        await cache.close()
+        monkeypatch.setattr(DiskCache, "get", copy)
+        return await _reopen(tmp_path, "tiles", "t", raw=True)
+
+    assert asyncio.run(run()).value == b"tile"
+
+
+def test_contains_waits_for_a_flush_off_the_loop(tmp_path):
+    config = NamespaceConfig(timedelta(hours=1), 0, _MB, backend="sqlite")
+
+    async def run():
+        cache = CacheManager(str(tmp_path), {"places": config})
+        places = cache.namespace("places", model=tuple)
+        await places.put("a", (1, 2))
+        # as if a big flush were holding the store's lock
+        places.disk._lock.acquire()
+        try:
+            check = asyncio.ensure_future(places.contains("a"))
+            await asyncio.sleep(0.05)
+            assert not check.done()
+        finally:
+            places.disk._lock.release()
+        assert await check
+        await cache.close()
+
+    asyncio.run(run())
+
+
+def test_undecodable_entries_are_misses_and_deleted(tmp_path):
+    async def run():
+        cache = _manager(tmp_path)
+        models = cache.namespace("models", model=Point)
+        # what the cache used to write
+        models.disk.put(models._path("old"), pickle.dumps((0, Point(1, 2))))
+        assert await models.get("old") is None
+        assert not models.disk.exists(models._path("old"))
+        await cache.close()
+
+    asyncio.run(run())
+
+
+def test_negative_rules_only_apply_to_their_namespace(tmp_path):
+    calls = {"models": 0, "plain": 0}
+
+    def not_found(name):
+        async def fetch():
+            calls[name] += 1
+            raise aiohttp.ClientResponseError(None, (), status=404)
+
+        return fetch
+
+    async def run():
+        cache = _manager(tmp_path)
+        models = cache.namespace("models", model=Point)
+        plain = cache.namespace("plain", model=tuple)
+        models.negative.register(
+            aiohttp.ClientResponseError, timedelta(hours=1), status=404
+        )
+        for namespace, name in ((models, "models"), (plain, "plain")):
+            for _ in range(2):
+                with pytest.raises(aiohttp.ClientResponseError):
+                    await namespace.fetch("k", not_found(name))
+        await cache.close()
+
+    asyncio.run(run())
+    assert calls == {"models": 1, "plain": 2}
@@ -0,0 +1,85 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+import asyncio
+import json
+from datetime import timedelta
+
+import pytest
+
+from libs.cache import CacheManager, NamespaceConfig
+from libs.googlemaps import GeocodingError, GoogleMapsAPI
+from libs.openweathermap.errors import CityNotFoundError
+
+
+class _Response:
+    def __init__(self, body: dict):
+        self.status = 200
+        self._body = json.dumps(body).encode()
+
+    def raise_for_status(self):
+        pass
+
+    async def read(self) -> bytes:
+        return self._body
+
+
+class _HTTP:
+    # answers every request with ``body`` and counts them
+    def __init__(self, body: dict):
+        self.body = body
+        self.calls = 0
+
+    def get(self, url=None, **kwargs):
+        http = self
+
+        class _Request:
+            async def __aenter__(self):
+                http.calls += 1
+                return _Response(http.body)
+
+            async def __aexit__(self, *exc):
+                pass
+
+        return _Request()
+
+
+def _api(tmp_path, body: dict):
+    cache = CacheManager(
+        str(tmp_path),
+        {"geocode": NamespaceConfig(timedelta(hours=12), 1024 * 1024, 0)},
+    )
+    http = _HTTP(body)
+    return GoogleMapsAPI("token", http, cache), http
+
+
+async def _geocode_twice(api: GoogleMapsAPI, error):
+    for _ in range(2):
+        with pytest.raises(error):
+            await api.geocode("nowhere")
+
+
+def test_zero_results_is_remembered_as_not_found(tmp_path):
+    api, http = _api(tmp_path, {"status": "ZERO_RESULTS", "results": []})
+    asyncio.run(_geocode_twice(api, CityNotFoundError))
+    assert http.calls == 1
+
+
+@pytest.mark.parametrize("status", ["OVER_QUERY_LIMIT", "REQUEST_DENIED"])
+def test_other_statuses_are_not_cached(tmp_path, status):
+    api, http = _api(tmp_path, {"status": status, "results": []})
+    asyncio.run(_geocode_twice(api, GeocodingError))
+    assert http.calls == 2
@@ -0,0 +1,64 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+import asyncio
+import threading
+
+import pytest
+
+from libs.lazy import Lazy
+
+
+def test_aget_loads_once_off_the_loop():
+    release = threading.Event()
+    calls = []
+
+    def factory():
+        calls.append(threading.get_ident())
+        release.wait(5)
+        return "loaded"
+
+    async def run():
+        lazy = Lazy("test", factory)
+        waiting = [asyncio.ensure_future(lazy.aget()) for _ in range(3)]
+        warmup = asyncio.ensure_future(lazy.warmup())
+        # the loop keeps running while the factory is stuck
+        await asyncio.sleep(0.05)
+        assert not any(task.done() for task in waiting)
+        release.set()
+        assert await asyncio.gather(*waiting, warmup) == ["loaded"] * 4
+        assert lazy.loaded and await lazy.aget() == "loaded"
+
+    asyncio.run(run())
+    assert len(calls) == 1 and calls[0] != threading.get_ident()
+
+
+def test_aget_retries_after_a_failed_load():
+    attempts = []
+
+    def factory():
+        attempts.append(None)
+        if len(attempts) == 1:
+            raise OSError("missing")
+        return "loaded"
+
+    async def run():
+        lazy = Lazy("test", factory)
+        with pytest.raises(OSError):
+            await lazy.aget()
+        assert await lazy.aget() == "loaded"
+
+    asyncio.run(run())
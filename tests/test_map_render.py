@@ -0,0 +1,113 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+import asyncio
+import threading
+import time
+from datetime import timedelta
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from libs.cache import CacheManager, NamespaceConfig
+from libs.helpers import TilePlan
+from libs import map_render
+from libs.map_render import MapRenderer, render_loop_base, render_loop_frame
+from libs.render_pool import RenderPool
+
+PLAN = TilePlan(
+    zoom=1,
+    tile_size=64,
+    canvas=(64, 64),
+    output=(64, 64),
+    tiles=((0, 0),),
+    offsets=((0, 0),),
+)
+
+
+def _tile(color, box=None) -> bytes:
+    img = Image.new("RGBA", (64, 64), (0, 0, 0, 0) if box else color)
+    if box:
+        img.paste(color, box)
+    buf = BytesIO()
+    img.save(buf, "PNG")
+    return buf.getvalue()
+
+
+def test_loop_palette_has_colors_from_later_frames():
+    satellite = (PLAN, [_tile((40, 90, 40, 255))])
+    hillshade = (PLAN, [_tile((0, 0, 0, 0))])
+    # the radar layer is empty in the first frame, red shows up after
+    frames = [
+        (PLAN, [_tile((0, 0, 0, 0))]),
+        (PLAN, [_tile((255, 0, 0, 255), (16, 16, 48, 48))]),
+    ]
+    basemap, palette = render_loop_base(satellite, hillshade, frames, 256)
+    first, second = (
+        np.asarray(render_loop_frame(basemap, frame, palette).convert("RGB"))
+        for frame in frames
+    )
+    assert not np.array_equal(first, second)
+    red = second[32, 32].astype(int)
+    assert red[0] > 150 and red[1] < 100 and red[2] < 100
+    # outside the red square the frames stay the same
+    assert np.array_equal(first[0:8, 0:8], second[0:8, 0:8])
+
+
+def test_a_loop_is_one_render_pool_job_with_parallel_frames(
+    tmp_path, monkeypatch
+):
+    lock = threading.Lock()
+    running = []
+    overlapped = []
+
+    def frame(*args):
+        with lock:
+            running.append(None)
+            overlapped.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.pop()
+        return render_loop_frame(*args)
+
+    monkeypatch.setattr(map_render, "render_loop_frame", frame)
+    # no queue at all, so a loop only renders if it takes a single worker
+    pool = RenderPool("thread", workers=1, queue_size=0)
+    cache = CacheManager(
+        str(tmp_path),
+        {"weather-maps": NamespaceConfig(timedelta(minutes=5), 0, 0)},
+    )
+    satellite = (PLAN, [_tile((40, 90, 40, 255))])
+    hillshade = (PLAN, [_tile((0, 0, 0, 0))])
+    frames = [
+        (PLAN, [_tile((255, 0, 0, 255), (i, i, i + 16, i + 16))])
+        for i in range(0, 48, 8)
+    ]
+
+    async def run():
+        try:
+            return await MapRenderer(cache, pool).render_loop(
+                ("test",), frames, satellite, hillshade
+            )
+        finally:
+            await pool.close()
+            await cache.close()
+
+    loop = Image.open(BytesIO(asyncio.run(run())))
+    assert loop.format == "GIF" and loop.n_frames == len(frames)
+    # the frames were drawn side by side, not one after another
+    assert max(overlapped) > 1
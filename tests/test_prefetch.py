@@ -0,0 +1,70 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+import asyncio
+from datetime import timedelta
+
+import aiohttp
+
+from libs.cache import CacheManager, NamespaceConfig
+from libs.openweathermap import OpenWeatherMapAPI
+from libs.prefetch import TilePrefetcher
+
+
+class _Response:
+    status = 429
+
+    def raise_for_status(self):
+        raise aiohttp.ClientResponseError(None, (), status=self.status)
+
+    async def read(self) -> bytes:
+        return b'{"cod": 429, "message": "slow down"}'
+
+
+class _HTTP:
+    # rate limited, whatever is asked for
+    def get(self, url=None, **kwargs):
+        class _Request:
+            async def __aenter__(self):
+                return _Response()
+
+            async def __aexit__(self, *exc):
+                pass
+
+        return _Request()
+
+
+def test_rate_limited_tiles_are_failures_not_tiles(tmp_path):
+    cache = CacheManager(
+        str(tmp_path),
+        {"owm-tiles": NamespaceConfig(timedelta(minutes=15), 0, 1024 * 1024)},
+    )
+    prefetcher = TilePrefetcher(enabled=True, budget=1000, idle=0)
+    api = OpenWeatherMapAPI("token", _HTTP(), cache, prefetcher=prefetcher)
+
+    async def run():
+        api.prefetch_radar(41.88, -87.63, 4, "precipitation_new")
+        while prefetcher._tasks:
+            await asyncio.gather(*prefetcher._tasks)
+        await prefetcher.close()
+        await cache.close()
+
+    asyncio.run(run())
+    stats = prefetcher.stats
+    assert stats.queued > 0
+    assert stats.failed == stats.queued and stats.fetched == 0
+    assert api._tile_cache.stats.memory_entries == 0
+    assert api._tile_cache.disk.total_bytes == 0
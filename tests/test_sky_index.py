@@ -0,0 +1,41 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+import numpy as np
+import pytest
+
+from libs.astro_data.sky_index import SkyIndex
+
+
+@pytest.mark.parametrize(
+    "ra, dec",
+    [
+        ((350, 10), (80, 90)),
+        # both ends fall in the same cell of the narrow bands by the pole
+        ((100, 60), (85, 90)),
+        ((20, 10), (-90, -88)),
+    ],
+)
+def test_box_wrapping_near_a_pole_matches_brute_force(ra, dec):
+    rng = np.random.default_rng(0)
+    n = 20_000
+    ras = rng.uniform(0, 360, n)
+    decs = np.degrees(np.arcsin(rng.uniform(-1, 1, n)))
+    index = SkyIndex(ras, decs, list(range(n)))
+    inside = ((ras >= ra[0]) | (ras <= ra[1])) & (
+        (decs >= dec[0]) & (decs <= dec[1])
+    )
+    assert sorted(index.box(ra, dec)) == np.flatnonzero(inside).tolist()
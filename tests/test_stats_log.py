@@ -0,0 +1,63 @@
+"""
+Copyright 2021 crazygmr101
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation the 
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit 
+persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the 
+Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE 
+WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR 
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR 
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+import asyncio
+import logging
+from datetime import timedelta
+
+from libs.cache import CacheManager, NamespaceConfig
+from libs.map_render import RenderStats
+from libs.prefetch import PrefetchStats
+from libs.stats_log import StatsLog
+
+
+def test_sources_are_logged_periodically_and_on_close(caplog):
+    stats = PrefetchStats(fetched=4, used=3)
+
+    async def run():
+        log = StatsLog(interval=0.01)
+        log.add("tile prefetch", stats.summary)
+        log.start()
+        await asyncio.sleep(0.05)
+        await log.close()
+
+    with caplog.at_level(logging.INFO, logger="libs.stats_log"):
+        asyncio.run(run())
+    lines = [r.getMessage() for r in caplog.records]
+    assert len(lines) >= 2
+    assert all("75% hit rate" in line for line in lines)
+
+
+def test_render_summary_has_hit_rate_and_time_saved():
+    stats = RenderStats(hits=3, misses=1, cpu_seconds=2, saved_seconds=6)
+    assert "75% hit rate" in stats.summary()
+    assert "6.0s saved" in stats.summary()
+
+
+def test_cache_summary_covers_every_namespace(tmp_path):
+    config = NamespaceConfig(timedelta(hours=1), 1024 * 1024, 0)
+    cache = CacheManager(str(tmp_path), {"a": config, "b": config})
+
+    async def run():
+        a = cache.namespace("a")
+        await a.put("k", 1)
+        await a.get("k")
+        await cache.namespace("b").get("k")
+
+    asyncio.run(run())
+    summary = cache.summary()
+    assert summary.startswith("a 100% hit rate")
+    assert "; b 0% hit rate" in summary